@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .columnar import COLUMNAR_DATA_DIR_ENV, convert_json_to_columnar
+from .fleetgen import add_fleet_arguments, fleet_config, generate_fleet
+from .ingest import iter_suppliers
+
+BENCHMARK_FORMAT_VERSION = 1
+
+# Change beyond which --compare reports a metric as regressed
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+# Metrics compared against a baseline, by whether lower or higher is better
+_LOWER_IS_BETTER = ("p50_ms", "p99_ms", "peak_rss_mb", "peak_rss_mb_after_processing", "peak_rss_mb_workers")
+_HIGHER_IS_BETTER = ("trips_per_second", "pings_per_second")
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _latency(samples: list) -> dict:
+    ms = np.array(samples) * 1000
+    return {
+        "samples": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3)
+    }
+
+
+def _timed(client, method: str, paths: list) -> list:
+    samples = []
+    for path in paths:
+        started = time.perf_counter()
+        response = client.request(method, path)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+    return samples
+
+
+def run_benchmark(data_path: str, fleet: dict, runs: int = 3, requests: int = 200, workers: int = 1, seed: int = 42) -> dict:
+    """
+    Times the API in this process against the fleet in data_path: full
+    processing runs, one incremental run with nothing changed, then the
+    leaderboard, dashboard-stats and trip-report endpoints (trip ids drawn
+    with `seed`). Call it before anything imports app.main elsewhere, as the
+    store and COLUMNAR_DATA_DIR are picked up when app.main is imported.
+    """
+    from fastapi.testclient import TestClient
+    from . import main as api
+
+    api.DATA_FILE_PATH = data_path
+    client = TestClient(api.app)
+    results = {}
+
+    samples = _timed(client, "POST", [f"/automation/process-all-data?full_refresh=true&workers={workers}"] * runs)
+    typical = float(np.median(samples))
+    results["processing"] = {
+        **_latency(samples),
+        "trips_per_second": round(fleet["trips"] / typical, 1),
+        "pings_per_second": round(fleet["pings"] / typical, 1)
+    }
+    samples = _timed(client, "POST", [f"/automation/process-all-data?workers={workers}"])
+    results["processing_incremental"] = {**_latency(samples), "trips_per_second": round(fleet["trips"] / samples[0], 1)}
+    peak_after_processing = _peak_rss_mb()
+
+    trip_ids = [trip_id for trip_id, _ in api.store.iter_trip_index()]
+    picks = np.random.default_rng(seed).choice(len(trip_ids), size=requests)
+    results["supplier_leaderboard"] = _latency(_timed(client, "GET", ["/intelligence/supplier-leaderboard"] * requests))
+    results["dashboard_stats"] = _latency(_timed(client, "GET", ["/intelligence/dashboard-stats"] * requests))
+    results["trip_report"] = _latency(_timed(client, "GET", [f"/audit/trip-report/{trip_ids[i]}" for i in picks]))
+
+    results["memory"] = {
+        "peak_rss_mb_after_processing": peak_after_processing,
+        "peak_rss_mb": _peak_rss_mb(),
+        # Largest worker process, when processing ran in a pool
+        "peak_rss_mb_workers": _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+    return results
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> list:
+    """
+    Rows of (metric, baseline, current, change, regressed) for every metric
+    both result files have; change is relative, and regressed means worse
+    than the baseline by more than threshold.
+    """
+    rows = []
+    for section, values in current["results"].items():
+        base_values = baseline.get("results", {}).get(section, {})
+        for key, value in values.items():
+            base = base_values.get(key)
+            if not base or (key not in _LOWER_IS_BETTER and key not in _HIGHER_IS_BETTER):
+                continue
+            change = (value - base) / base
+            worse = change if key in _LOWER_IS_BETTER else -change
+            rows.append((f"{section}.{key}", base, value, change, worse > threshold))
+    return rows
+
+
+def _print_results(report: dict):
+    fleet = report["fleet"]
+    print(f"Fleet: {fleet['suppliers']} suppliers, {fleet['vehicles']} vehicles, {fleet['trips']} trips, {fleet['pings']} pings")
+    for section, values in report["results"].items():
+        print(f"  {section:<24} " + "  ".join(f"{key}={value}" for key, value in values.items()))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark processing and read endpoints against a seeded synthetic fleet."
+    )
+    add_fleet_arguments(parser)
+    parser.add_argument("--data", help="existing fleet file to use instead of generating one")
+    parser.add_argument("--runs", type=int, default=3, help="full processing runs")
+    parser.add_argument("--requests", type=int, default=200, help="requests per read endpoint")
+    parser.add_argument("--workers", type=int, default=1, help="processing workers (0 = all cores)")
+    parser.add_argument("--store", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--columnar", action="store_true", help="convert the fleet and read pings from columns")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results file; exit status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    if args.runs < 1 or args.requests < 1:
+        parser.error("--runs and --requests must be positive")
+
+    with tempfile.TemporaryDirectory(prefix="audit-bench-") as work_dir:
+        data_path = args.data
+        if data_path is None:
+            data_path = os.path.join(work_dir, "fleet.json")
+            fleet = generate_fleet(data_path, **fleet_config(args))
+        else:
+            fleet = {"suppliers": 0, "vehicles": 0, "trips": 0, "pings": 0}
+            for supplier in iter_suppliers(data_path):
+                fleet["suppliers"] += 1
+                for vehicle in supplier["vehicles"]:
+                    fleet["vehicles"] += 1
+                    for trip in vehicle["trips"]:
+                        fleet["trips"] += 1
+                        fleet["pings"] += len(trip["gps_pings"])
+
+        # Both are read when app.main is imported by run_benchmark
+        if args.store == "sqlite":
+            os.environ["AUDIT_DB_PATH"] = os.path.join(work_dir, "audit.db")
+        else:
+            os.environ.pop("AUDIT_DB_PATH", None)
+        if args.columnar:
+            columnar_dir = os.path.join(work_dir, "columnar")
+            convert_json_to_columnar(data_path, columnar_dir)
+            os.environ[COLUMNAR_DATA_DIR_ENV] = columnar_dir
+        else:
+            os.environ.pop(COLUMNAR_DATA_DIR_ENV, None)
+
+        workers = args.workers or os.cpu_count() or 1
+        results = run_benchmark(data_path, fleet, args.runs, args.requests, workers, args.seed)
+
+    report = {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            **(fleet_config(args) if args.data is None else {"data": args.data}),
+            "runs": args.runs,
+            "requests": args.requests,
+            "workers": workers,
+            "store": args.store,
+            "columnar": args.columnar
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "fleet": fleet,
+        "results": results
+    }
+    _print_results(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != report["config"]:
+        print("Warning: the baseline was run with a different configuration")
+    rows = compare_results(baseline, report, args.threshold)
+    print(f"Compared with {args.compare} (threshold {args.threshold:.0%}):")
+    for metric, base, value, change, regressed in rows:
+        print(f"  {metric:<40} {base:>12} -> {value:<12} {change:+.1%}{'  REGRESSED' if regressed else ''}")
+    return 1 if any(row[4] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    # python -m app.benchmark --suppliers 20 --vehicles 10 --trips 50 --pings 200 --out bench.json
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import sys
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .ingest import iter_suppliers
+
+# Set to a directory written by convert_json_to_columnar to read GPS pings
+# from memory-mapped columns instead of parsing the JSON source file.
+COLUMNAR_DATA_DIR_ENV = "COLUMNAR_DATA_DIR"
+
+COLUMNAR_FORMAT_VERSION = 1
+
+# One .npy file per column, so each can be memory-mapped on its own
+# (np.load cannot memory-map members of an .npz archive).
+_COLUMN_FILES = {
+    "timestamps": "timestamps.npy",      # int64, microseconds since the epoch (UTC)
+    "latitudes": "latitudes.npy",        # float64
+    "longitudes": "longitudes.npy",      # float64
+    "trip_offsets": "trip_offsets.npy"   # int64, trip k owns pings trip_offsets[k]:trip_offsets[k+1]
+}
+_MANIFEST_FILE = "manifest.json"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_epoch_us(timestamp: str) -> int:
+    """ISO-8601 timestamp to microseconds since the epoch; naive times are taken as UTC."""
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    delta = moment - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+# Layout of "2024-07-28T08:00:00Z": digit positions, and the fixed characters elsewhere
+_ISO_UTC_WIDTH = 20
+_ISO_UTC_DIGITS = np.array([0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18])
+_ISO_UTC_SEPARATORS = np.array([4, 7, 10, 13, 16, 19])
+_ISO_UTC_SEPARATOR_CHARS = np.frombuffer(b"--T::Z", dtype=np.uint8)
+
+
+def to_epoch_us_array(timestamps: list) -> np.ndarray:
+    """
+    to_epoch_us over a list of timestamps, as an int64 array. When all of
+    them are whole-second UTC times like "2024-07-28T08:00:00Z" (the form
+    format_timestamps writes) they are decoded from their digits in one
+    vectorized pass; anything else is parsed one by one with to_epoch_us.
+    """
+    count = len(timestamps)
+    if count and set(map(len, timestamps)) == {_ISO_UTC_WIDTH}:
+        try:
+            chars = np.frombuffer("".join(timestamps).encode("ascii"), dtype=np.uint8).reshape(count, _ISO_UTC_WIDTH)
+        except (TypeError, UnicodeEncodeError):
+            chars = None
+        if chars is not None and (chars[:, _ISO_UTC_SEPARATORS] == _ISO_UTC_SEPARATOR_CHARS).all():
+            digits = chars[:, _ISO_UTC_DIGITS].astype(np.int64) - ord("0")
+            if ((digits >= 0) & (digits <= 9)).all():
+                pairs = digits[:, 0::2] * 10 + digits[:, 1::2]
+                year = pairs[:, 0] * 100 + pairs[:, 1]
+                month, day, hour, minute, second = (pairs[:, i] for i in range(2, 7))
+                if ((month >= 1) & (month <= 12) & (hour < 24) & (minute < 60) & (second < 60) & (year >= 1)).all():
+                    month_start = (year - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (month - 1)
+                    month_days = (month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")
+                    if ((day >= 1) & (day <= month_days.astype(np.int64))).all():
+                        days = month_start.astype("datetime64[D]").astype(np.int64) + day - 1
+                        return ((days * 24 + hour) * 60 + minute) * 60_000_000 + second * 1_000_000
+    return np.array([to_epoch_us(timestamp) for timestamp in timestamps], dtype=np.int64)
+
+
+def trip_columns_digest(trip: dict) -> str:
+    """sha256 of a columnar trip's date and region and the raw bytes of its timestamps, latitudes and longitudes."""
+    digest = hashlib.sha256(json.dumps([trip.get("date"), trip.get("region")]).encode("utf-8"))
+    for column in ("timestamps", "latitudes", "longitudes"):
+        digest.update(np.ascontiguousarray(trip[column]).tobytes())
+    return digest.hexdigest()
+
+
+def timestamp_unit(timestamps: np.ndarray) -> str:
+    """Coarsest unit that formats every timestamp exactly ("s" unless some have a fractional part)."""
+    return "us" if (np.asarray(timestamps, dtype=np.int64) % 1_000_000).any() else "s"
+
+
+def format_timestamps(timestamps: np.ndarray, unit: str = None) -> list:
+    """
+    Epoch microseconds back to ISO-8601 UTC strings ("2024-07-28T08:00:00Z").
+    Pass `unit` to format a slice the same way as the array it came from.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    unit = unit or timestamp_unit(timestamps)
+    return [f"{value}Z" for value in np.datetime_as_string(timestamps.astype("datetime64[us]"), unit=unit)]
+
+
+def convert_json_to_columnar(json_path: str, out_dir: str) -> dict:
+    """
+    Converts a supplier data file (synthetic_data.json layout) to the columnar
+    layout. The source is streamed one trip at a time and each trip's pings
+    are sorted by time here, once, instead of on every processing run.
+    Returns a summary with the trip and ping counts.
+    """
+    timestamps, latitudes, longitudes = array("q"), array("d"), array("d")
+    trip_offsets = array("q", [0])
+    suppliers = []
+
+    for supplier in iter_suppliers(json_path):
+        vehicles = []
+        suppliers.append({"supplier_id": supplier["supplier_id"], "name": supplier["name"], "vehicles": vehicles})
+        for vehicle in supplier["vehicles"]:
+            trips = []
+            vehicles.append({"vehicle_id": vehicle["vehicle_id"], "type": vehicle.get("type", "default"), "trips": trips})
+            for trip in vehicle["trips"]:
+                pings = sorted(
+                    ((to_epoch_us(p["timestamp"]), p["latitude"], p["longitude"]) for p in trip["gps_pings"]),
+                    key=lambda p: p[0]
+                )
+                for timestamp, latitude, longitude in pings:
+                    timestamps.append(timestamp)
+                    latitudes.append(latitude)
+                    longitudes.append(longitude)
+                trip_offsets.append(len(timestamps))
+                trips.append({"trip_id": trip["trip_id"], "date": trip.get("date"), "region": trip.get("region")})
+
+    os.makedirs(out_dir, exist_ok=True)
+    columns = {
+        "timestamps": np.frombuffer(timestamps, dtype=np.int64),
+        "latitudes": np.frombuffer(latitudes, dtype=np.float64),
+        "longitudes": np.frombuffer(longitudes, dtype=np.float64),
+        "trip_offsets": np.frombuffer(trip_offsets, dtype=np.int64)
+    }
+    # Each file is written beside its target and renamed over it, so a
+    # dataset still mapping the old files keeps reading the old data
+    for name, file_name in _COLUMN_FILES.items():
+        path = os.path.join(out_dir, file_name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, columns[name])
+        os.replace(path + ".tmp", path)
+
+    # Written last, so a directory with a manifest always has complete columns
+    manifest_path = os.path.join(out_dir, _MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"format_version": COLUMNAR_FORMAT_VERSION, "suppliers": suppliers}, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    return {"trips": len(trip_offsets) - 1, "pings": len(timestamps)}
+
+
+class ColumnarDataset:
+    """
+    Read side of the columnar layout. Ping columns are memory-mapped, so
+    opening the dataset reads only the manifest, and a trip's pings are
+    zero-copy slices that the OS pages in on first touch.
+    """
+
+    def __init__(self, data_dir: str):
+        with open(os.path.join(data_dir, _MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != COLUMNAR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version in {data_dir}: {manifest.get('format_version')}")
+
+        self.suppliers = manifest["suppliers"]
+        self.timestamps, self.latitudes, self.longitudes, self.trip_offsets = (
+            np.load(os.path.join(data_dir, _COLUMN_FILES[name]), mmap_mode="r")
+            for name in ("timestamps", "latitudes", "longitudes", "trip_offsets")
+        )
+        # Trip metadata by row, for reading a single trip back
+        self._trip_rows = [
+            trip
+            for supplier in self.suppliers
+            for vehicle in supplier["vehicles"]
+            for trip in vehicle["trips"]
+        ]
+
+    def read_trip(self, row: int) -> dict:
+        """
+        One trip in the columnar trip shape that process_trip accepts:
+        trip_id, date and region plus time-sorted timestamps/latitudes/longitudes views.
+        """
+        if not 0 <= row < len(self._trip_rows):
+            raise IndexError(f"No trip at row {row}")
+        start, end = int(self.trip_offsets[row]), int(self.trip_offsets[row + 1])
+        meta = self._trip_rows[row]
+        return {
+            "trip_id": meta["trip_id"],
+            "date": meta["date"],
+            "region": meta.get("region"),
+            "timestamps": self.timestamps[start:end],
+            "latitudes": self.latitudes[start:end],
+            "longitudes": self.longitudes[start:end]
+        }
+
+    def iter_suppliers(self, locate: bool = False):
+        """
+        Same shape as ingest.iter_suppliers, with columnar trips. With
+        locate=True each trip is yielded as (trip, (row, ping_count, digest)),
+        where row can be passed to read_trip and digest is trip_columns_digest.
+        """
+        row = 0
+        for supplier in self.suppliers:
+            vehicles = []
+            for vehicle in supplier["vehicles"]:
+                trips = []
+                for _ in vehicle["trips"]:
+                    trip = self.read_trip(row)
+                    trips.append((trip, (row, len(trip["timestamps"]), trip_columns_digest(trip))) if locate else trip)
+                    row += 1
+                vehicles.append({"vehicle_id": vehicle["vehicle_id"], "type": vehicle["type"], "trips": trips})
+            yield {"supplier_id": supplier["supplier_id"], "name": supplier["name"], "vehicles": vehicles}
+
+
+if __name__ == "__main__":
+    # python -m app.columnar app/synthetic_data.json app/synthetic_data.columnar
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.columnar <source.json> <output_dir>")
+    summary = convert_json_to_columnar(sys.argv[1], sys.argv[2])
+    print(f"Wrote {summary['trips']} trips ({summary['pings']} pings) to {sys.argv[2]}")
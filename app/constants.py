@@ -1,30 +1,19 @@
 # Emission Factors in kg CO2e per kilometer
 # These are representative values. Real-world factors are more complex.
 # Source: Simplified from GLEC Framework and other industry standards.
-# Emission Factors in kg CO2e per kilometer
-# These are representative values. Real-world factors are more complex.
-# Source: Simplified from GLEC Framework and other industry standards.
-
-EMISSION_FACTORS = {
-    "default": 0.8,  # A default value if vehicle type is unknown
-    "Light-Duty Van": 0.3,
-    "Medium-Duty Truck": 0.65,
-    "Heavy-Duty Truck": 1.2,
-    "Refrigerated Truck": 1.8, # Refrigeration unit uses extra fuel
-    "Cargo Ship": 0.02, # Per ton-km, but simplified here for demonstration
-    "Cargo Plane": 2.5,
-}
+# The factor sets are versioned files in emission_factors/, one per
+# validity period and region, resolved per trip by factors.py.
 
-# 2️⃣ Emission Factor Versioning
-EMISSION_FACTOR_METADATA = {
-    "source": "DEFRA (Department for Environment, Food & Rural Affairs)",
-    "version": "2024.1",
-    "validity_period": "2024-01-01 to 2024-12-31",
-    "unit": "kg CO2e / km",
-    "link": "https://www.gov.uk/government/collections/government-conversion-factors-for-company-reporting"
+# Where each input of an audit record comes from
+DATA_SOURCES_VERSION = "2024.1"
+DATA_SOURCES = {
+    "gps": "telemetry_api_simulated",
+    "emission_factor": "DEFRA (Department for Environment, Food & Rural Affairs)"
 }
 
 # 8️⃣ Methodology & Compliance Language
+# Bump the version whenever the text changes, so stored records keep pointing at the text they were computed under.
+METHODOLOGY_VERSION = "GHG-S3-TRANSPORT-2024.1"
 METHODOLOGY_TEXT = """
 **GHG Protocol Scope 3 Category 4 & 9 (Upstream & Downstream Transportation)**
 Calculation Method: Distance-based method using GPS-verified actual distances.
@@ -0,0 +1,100 @@
+import bisect
+import glob
+import json
+import os
+
+# Set to a directory of factor set files to replace the bundled ones.
+EMISSION_FACTORS_DIR_ENV = "EMISSION_FACTORS_DIR"
+
+DEFAULT_EMISSION_FACTORS_DIR = os.path.join(os.path.dirname(__file__), "emission_factors")
+
+# Region used for trips without one, and for regions that have no factor sets of their own
+DEFAULT_REGION = "GLOBAL"
+
+
+class FactorSet:
+    """
+    One versioned set of emission factors (kg CO2e per km by vehicle type),
+    valid for trips dated valid_from..valid_to (inclusive ISO dates) in one region.
+    """
+
+    __slots__ = ("version", "region", "valid_from", "valid_to", "factors", "metadata")
+
+    def __init__(self, data: dict):
+        self.version = data["version"]
+        self.region = data.get("region", DEFAULT_REGION)
+        self.valid_from = data["valid_from"]
+        self.valid_to = data["valid_to"]
+        self.factors = data["factors"]
+        if "default" not in self.factors:
+            raise ValueError(f"Emission factor set {self.version} has no 'default' factor")
+        # Everything but the factors themselves, as shown in audit reports
+        self.metadata = {key: value for key, value in data.items() if key != "factors"}
+        self.metadata["validity_period"] = f"{self.valid_from} to {self.valid_to}"
+
+    def factor_for(self, vehicle_type: str) -> float:
+        return self.factors.get(vehicle_type, self.factors["default"])
+
+
+class FactorRegistry:
+    """
+    All known factor sets, with a per-region interval index (sets sorted by
+    valid_from) so resolving a trip's set is one bisect.
+    """
+
+    def __init__(self, factor_sets: list):
+        self._by_version = {}
+        for factor_set in factor_sets:
+            if factor_set.version in self._by_version:
+                raise ValueError(f"Duplicate emission factor set version {factor_set.version}")
+            self._by_version[factor_set.version] = factor_set
+
+        self._by_region = {}
+        for factor_set in sorted(factor_sets, key=lambda s: s.valid_from):
+            sets = self._by_region.setdefault(factor_set.region, [])
+            if sets and sets[-1].valid_to >= factor_set.valid_from:
+                raise ValueError(
+                    f"Emission factor sets {sets[-1].version} and {factor_set.version} overlap in region {factor_set.region}"
+                )
+            sets.append(factor_set)
+        if DEFAULT_REGION not in self._by_region:
+            raise ValueError(f"No emission factor set for the {DEFAULT_REGION} region")
+        self._starts = {region: [s.valid_from for s in sets] for region, sets in self._by_region.items()}
+
+        self.latest = self._by_region[DEFAULT_REGION][-1]
+
+    def get(self, version: str):
+        return self._by_version.get(version)
+
+    def factor_sets(self) -> list:
+        return list(self._by_version.values())
+
+    def metadata_by_version(self) -> dict:
+        return {version: factor_set.metadata for version, factor_set in self._by_version.items()}
+
+    def resolve(self, trip_date: str = None, region: str = None) -> FactorSet:
+        """
+        The set whose validity period contains trip_date (an ISO date) in the
+        trip's region, falling back to the default region. Dates in a gap or
+        past the last period use the most recent set that had started; dates
+        before the first period use the first set; undated trips the latest.
+        """
+        if region not in self._by_region:
+            region = DEFAULT_REGION
+        sets = self._by_region[region]
+        if trip_date is None:
+            return sets[-1]
+        index = bisect.bisect_right(self._starts[region], trip_date[:10]) - 1
+        return sets[max(index, 0)]
+
+
+def load_factor_registry(directory: str) -> FactorRegistry:
+    """Loads every *.json factor set file in a directory."""
+    factor_sets = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            factor_sets.append(FactorSet(json.load(f)))
+    return FactorRegistry(factor_sets)
+
+
+FACTOR_REGISTRY = load_factor_registry(os.environ.get(EMISSION_FACTORS_DIR_ENV) or DEFAULT_EMISSION_FACTORS_DIR)
@@ -0,0 +1,137 @@
+import argparse
+import json
+import time
+from datetime import date
+
+import numpy as np
+
+from .columnar import format_timestamps
+
+# Cruise speed (km/h) and ping interval (seconds) of generated trips by vehicle type
+VEHICLE_PROFILES = {
+    "Light-Duty Van": (45.0, 15),
+    "Medium-Duty Truck": (55.0, 30),
+    "Heavy-Duty Truck": (65.0, 30),
+    "Refrigerated Truck": (60.0, 30),
+    "Cargo Ship": (30.0, 600),
+    "Cargo Plane": (800.0, 60)
+}
+
+REGIONS = ["GLOBAL", "EU", "NA", "APAC"]
+
+# Trip start points are spread around these (lat, lon) hubs
+_HUBS = [(51.5, -0.1), (40.7, -74.0), (12.97, 77.59), (1.35, 103.8), (-23.5, -46.6), (35.7, 139.7)]
+
+_EPOCH_DAY = date(1970, 1, 1)
+_KM_PER_DEGREE = 111.2
+
+
+def _trip_columns(rng, vehicle_type: str, ping_count: int, trip_date: date):
+    """Timestamps (epoch us), latitudes and longitudes of one trip as a heading random walk with stops."""
+    speed_kmh, interval_s = VEHICLE_PROFILES[vehicle_type]
+    start = ((trip_date - _EPOCH_DAY).days * 86400 + int(rng.integers(5 * 3600, 12 * 3600))) * 1_000_000
+    intervals = rng.uniform(0.8, 1.2, ping_count - 1) * interval_s
+    timestamps = start + np.concatenate(([0], np.round(np.cumsum(intervals)))).astype(np.int64) * 1_000_000
+
+    # About 5% of segments are spent stopped; the rest vary around cruise speed
+    speeds = speed_kmh * rng.uniform(0.6, 1.1, ping_count - 1)
+    speeds[rng.random(ping_count - 1) < 0.05] = 0.0
+    steps_km = speeds * intervals / 3600
+    headings = rng.uniform(0, 2 * np.pi) + np.cumsum(rng.normal(0, 0.15, ping_count - 1))
+
+    hub_lat, hub_lon = _HUBS[int(rng.integers(len(_HUBS)))]
+    lat0 = hub_lat + rng.normal(0, 0.5)
+    lon0 = hub_lon + rng.normal(0, 0.5)
+    latitudes = lat0 + np.concatenate(([0.0], np.cumsum(steps_km * np.cos(headings)))) / _KM_PER_DEGREE
+    longitudes = lon0 + np.concatenate(([0.0], np.cumsum(steps_km * np.sin(headings)))) / (
+        _KM_PER_DEGREE * np.cos(np.radians(lat0))
+    )
+    return timestamps, np.clip(latitudes, -90, 90), (longitudes + 180) % 360 - 180
+
+
+def generate_fleet(
+    out_path: str,
+    suppliers: int = 10,
+    vehicles_per_supplier: int = 5,
+    trips_per_vehicle: int = 20,
+    pings_per_trip: int = 100,
+    seed: int = 42,
+    start_date: str = "2024-01-01",
+    days: int = 365
+) -> dict:
+    """
+    Writes a synthetic fleet in the synthetic_data.json layout. The same
+    arguments always produce the same file. Ping counts vary by up to 50%
+    around pings_per_trip (at least 2). Trips are written one at a time,
+    so fleets larger than memory can be generated. Returns the supplier,
+    vehicle, trip and ping counts.
+    """
+    rng = np.random.default_rng(seed)
+    vehicle_types = list(VEHICLE_PROFILES)
+    first_day = date.fromisoformat(start_date)
+    trip_count = ping_count = 0
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write('{"suppliers": [')
+        for s in range(suppliers):
+            supplier_id = f"SUPPLIER_{s + 1:05d}"
+            f.write(("," if s else "") + json.dumps({"supplier_id": supplier_id, "name": f"Supplier {s + 1}"})[:-1])
+            f.write(', "vehicles": [')
+            for v in range(vehicles_per_supplier):
+                vehicle_type = vehicle_types[int(rng.integers(len(vehicle_types)))]
+                vehicle_id = f"{supplier_id}_V{v + 1:04d}"
+                f.write(("," if v else "") + json.dumps({"vehicle_id": vehicle_id, "type": vehicle_type})[:-1])
+                f.write(', "trips": [')
+                for t in range(trips_per_vehicle):
+                    pings = max(2, int(pings_per_trip * rng.uniform(0.5, 1.5)))
+                    trip_date = date.fromordinal(first_day.toordinal() + int(rng.integers(days)))
+                    timestamps, latitudes, longitudes = _trip_columns(rng, vehicle_type, pings, trip_date)
+                    trip = {
+                        "trip_id": f"{vehicle_id}_T{t + 1:05d}",
+                        "date": trip_date.isoformat(),
+                        "region": REGIONS[int(rng.integers(len(REGIONS)))],
+                        "gps_pings": [
+                            {"timestamp": timestamp, "latitude": round(latitude, 6), "longitude": round(longitude, 6)}
+                            for timestamp, latitude, longitude in zip(
+                                format_timestamps(timestamps), latitudes.tolist(), longitudes.tolist()
+                            )
+                        ]
+                    }
+                    f.write(("," if t else "") + json.dumps(trip, separators=(",", ":")))
+                    trip_count += 1
+                    ping_count += pings
+                f.write("]}")
+            f.write("]}")
+        f.write("]}\n")
+
+    return {"suppliers": suppliers, "vehicles": suppliers * vehicles_per_supplier, "trips": trip_count, "pings": ping_count}
+
+
+def add_fleet_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--suppliers", type=int, default=10)
+    parser.add_argument("--vehicles", type=int, default=5, help="vehicles per supplier")
+    parser.add_argument("--trips", type=int, default=20, help="trips per vehicle")
+    parser.add_argument("--pings", type=int, default=100, help="average pings per trip")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def fleet_config(args) -> dict:
+    return {
+        "suppliers": args.suppliers,
+        "vehicles_per_supplier": args.vehicles,
+        "trips_per_vehicle": args.trips,
+        "pings_per_trip": args.pings,
+        "seed": args.seed
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.fleetgen fleet.json --suppliers 50 --vehicles 20 --trips 100 --pings 200
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic fleet in the synthetic_data.json layout.")
+    parser.add_argument("out_path")
+    add_fleet_arguments(parser)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    summary = generate_fleet(args.out_path, **fleet_config(args))
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {summary['trips']} trips ({summary['pings']} pings) to {args.out_path} in {elapsed:.1f}s")
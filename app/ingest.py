@@ -0,0 +1,257 @@
+import hashlib
+import json
+
+# Bytes read from the source file per refill. The buffer grows past this
+# only while a single value (e.g. one trip) is larger than the chunk.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+
+class _JSONStream:
+    """
+    Minimal pull parser over a text file positioned at byte `offset`.
+    Structural characters of the outer containers are consumed one by one,
+    while leaf values are decoded whole with json.JSONDecoder.raw_decode,
+    so only the value currently being read has to fit in memory.
+    """
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE, offset: int = 0):
+        self._f = f
+        self.chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+        # Byte offset in the file of self._buf[self._mark], advanced lazily
+        self._mark = 0
+        self._mark_bytes = offset
+
+    def _fill(self, size: int = 0) -> bool:
+        chunk = self._f.read(max(size, self.chunk_size))
+        if not chunk:
+            return False
+        self.tell_bytes()
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        self._mark = 0
+        return True
+
+    def tell_bytes(self) -> int:
+        """UTF-8 byte offset of the current position, for seeking back to it later."""
+        self._mark_bytes += len(self._buf[self._mark:self._pos].encode("utf-8"))
+        self._mark = self._pos
+        return self._mark_bytes
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found}'")
+        self._pos += 1
+
+    def value(self, with_text: bool = False):
+        """Decodes the next complete JSON value; with_text=True returns (value, its source text)."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Incomplete value: double the buffer so retries stay amortized O(n)
+                if not self._fill(len(self._buf) - self._pos):
+                    raise
+                continue
+            if end == len(self._buf) and self._fill():
+                # A number at the very end of the buffer may have been cut short
+                continue
+            start, self._pos = self._pos, end
+            return (value, self._buf[start:end]) if with_text else value
+
+    def iter_array(self):
+        """Yields once per element; the consumer must read the element before resuming."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            separator = self.peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found '{separator}'")
+
+    def iter_object_keys(self):
+        """Yields each key; the consumer must read the value before resuming."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        key = self.value()
+        self.expect(":")
+        yield key
+        yield from self.iter_remaining_keys()
+
+    def iter_remaining_keys(self):
+        """Same as iter_object_keys, from just after a value inside an object."""
+        while True:
+            separator = self.peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON object, found '{separator}'")
+            key = self.value()
+            self.expect(":")
+            yield key
+
+
+class _StreamedObject(dict):
+    """
+    An object yielded while its nested array is still being streamed, so
+    the keys after that array have not been read yet. Looking up a key it
+    does not have reads them ahead with read_trailing() (from a second
+    handle on the file), so a key is found wherever it sits in the object.
+    """
+
+    def __init__(self, read_trailing):
+        super().__init__()
+        self._read_trailing = read_trailing
+
+    def complete(self, trailing: dict):
+        """Adds the keys after the nested array; the object is whole from then on."""
+        for key, value in trailing.items():
+            self.setdefault(key, value)
+        self._read_trailing = None
+
+    def _read_ahead(self):
+        if self._read_trailing is not None:
+            self.complete(self._read_trailing())
+
+    def __missing__(self, key):
+        if self._read_trailing is None:
+            raise KeyError(key)
+        self._read_ahead()
+        return self[key]
+
+    def __contains__(self, key) -> bool:
+        if not dict.__contains__(self, key):
+            self._read_ahead()
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+def _read_trailing_keys(file_path: str, offset: int, nested_keys: tuple, chunk_size: int) -> dict:
+    """
+    Decodes the keys of an object that follow its nested array, which
+    starts at byte offset. The array is walked the same way as the main
+    stream walks it, so this holds no more of it in memory at once.
+    """
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        f.seek(offset)
+        stream = _JSONStream(f, chunk_size, offset)
+        for _ in _iter_streamed_objects(stream, nested_keys, file_path):
+            pass
+        return {key: stream.value() for key in stream.iter_remaining_keys()}
+
+
+def _iter_streamed_objects(stream: _JSONStream, nested_keys: tuple, file_path: str, locate: bool = False):
+    """
+    Yields each object of the array at the current stream position.
+    The key nested_keys[0] is not decoded but replaced by a lazy iterator
+    over its own array (streamed with nested_keys[1:]); everything else is
+    decoded normally. Keys that come before the nested array are available
+    as soon as the object is yielded; looking up one that comes after it
+    reads ahead in file_path (see _StreamedObject), which costs a second
+    pass over the array, so sources should put nested arrays last.
+    With locate=True, innermost objects are yielded as
+    (obj, (offset, length, digest)): their byte span in the file and the
+    source_digest of those bytes.
+    """
+    for _ in stream.iter_array():
+        if not nested_keys:
+            if locate:
+                stream.peek()
+                offset = stream.tell_bytes()
+                value, text = stream.value(with_text=True)
+                raw = text.encode("utf-8")
+                yield value, (offset, len(raw), source_digest(raw))
+            else:
+                yield stream.value()
+            continue
+
+        leading = {}
+        keys = stream.iter_object_keys()
+        children = None
+        for key in keys:
+            if key == nested_keys[0]:
+                stream.peek()
+                offset = stream.tell_bytes()
+                children = _iter_streamed_objects(stream, nested_keys[1:], file_path, locate)
+                break
+            leading[key] = stream.value()
+
+        if children is None:
+            yield leading
+            continue
+
+        obj = _StreamedObject(
+            lambda offset=offset: _read_trailing_keys(file_path, offset, nested_keys[1:], stream.chunk_size)
+        )
+        obj.update(leading)
+        obj[nested_keys[0]] = children
+        yield obj
+
+        # Skip whatever the consumer left unread, then finish the object
+        for _ in children:
+            pass
+        obj.complete({key: stream.value() for key in keys})
+
+
+def iter_suppliers(file_path: str, chunk_size: int = STREAM_CHUNK_SIZE, locate: bool = False):
+    """
+    Incrementally parses a supplier data file with the same layout as
+    synthetic_data.json. Each supplier's "vehicles" and each vehicle's
+    "trips" are lazy iterators, so the usual nested loop over
+    suppliers -> vehicles -> trips only ever holds one trip in memory.
+    With locate=True each trip is yielded as (trip, (offset, length, digest)):
+    read_trip_at can later use the span to load just that trip, and the
+    digest identifies its exact source bytes without re-serializing it.
+    """
+    # No newline translation, so character positions map back to file bytes
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        stream = _JSONStream(f, chunk_size)
+        for key in stream.iter_object_keys():
+            if key == "suppliers":
+                yield from _iter_streamed_objects(stream, ("vehicles", "trips"), file_path, locate)
+            else:
+                stream.value()
+
+
+def source_digest(raw: bytes) -> str:
+    """sha256 of a trip's raw source bytes (its span in a data file, or an uploaded line)."""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def read_trip_at(file_path: str, offset: int, length: int, with_digest: bool = False):
+    """
+    Loads a single trip from its byte span as reported by
+    iter_suppliers(locate=True), without parsing the rest of the file.
+    With with_digest=True returns (trip, source_digest of the span).
+    """
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        raw = f.read(length)
+    trip = json.loads(raw.decode("utf-8"))
+    return (trip, source_digest(raw)) if with_digest else trip
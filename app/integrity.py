@@ -0,0 +1,80 @@
+from datetime import datetime
+from itertools import islice
+
+from .utils import generate_field_hash, generate_merkle_root_hash
+
+INTEGRITY_CHECKED_FIELDS = [
+    "total_trip_distance_km",
+    "total_trip_emissions_kg_co2e",
+    "confidence_score",
+    "vehicle_id"
+]
+
+# Records verified between progress reports (and tamper log commits) during a sweep
+SWEEP_CHUNK_SIZE = 512
+
+
+def find_integrity_violations(trip_id: str, audit_record: dict) -> list:
+    """
+    Re-calculates the field hashes and the Merkle root of an audit record
+    and returns one violation entry per field whose stored hash no longer
+    matches ("data_hash" if the root itself does not match the field hashes).
+    """
+    violations = []
+    detected_at = datetime.now().isoformat()
+
+    def violation(field, stored_hash, recalc_hash):
+        return {
+            "audit_id": audit_record["audit_id"],
+            "trip_id": trip_id,
+            "field": field,
+            "severity": "CRITICAL",
+            "message": f"Integrity Hash Mismatch for {field}",
+            "stored_hash": stored_hash,
+            "recalculated_hash": recalc_hash,
+            "detected_at": detected_at
+        }
+
+    for field in INTEGRITY_CHECKED_FIELDS:
+        stored_hash = audit_record["field_hashes"].get(field)
+        current_val = audit_record.get(field)
+
+        # We need the original context (audit_id + time) to reconstruct hash
+        # In a real DB, we'd store these meta-fields with the hash
+        # Here we re-use the record's main metadata
+        recalc_hash = generate_field_hash(
+            current_val,
+            audit_record["audit_id"],
+            audit_record["calculated_at"]
+        )
+
+        if stored_hash != recalc_hash:
+            violations.append(violation(field, stored_hash, recalc_hash))
+
+    # The root catches edits to the stored field hashes themselves
+    recalc_root = generate_merkle_root_hash(audit_record["field_hashes"])
+    if audit_record.get("data_hash") != recalc_root:
+        violations.append(violation("data_hash", audit_record.get("data_hash"), recalc_root))
+
+    return violations
+
+
+def sweep_integrity(records):
+    """
+    Verifies (trip_id, audit_record) pairs chunk by chunk and yields
+    (records_checked, violations) per chunk, in input order. Records are
+    pulled from the input a chunk at a time, so a streamed store cursor is
+    never fully materialized.
+
+    Runs on the calling thread: each hash covers a few bytes, too little for
+    hashlib to release the GIL, so a thread pool measured no faster.
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, SWEEP_CHUNK_SIZE))
+        if not chunk:
+            return
+        violations = []
+        for trip_id, audit_record in chunk:
+            violations.extend(find_integrity_violations(trip_id, audit_record))
+        yield len(chunk), violations
@@ -0,0 +1,252 @@
+import heapq
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .columnar import format_timestamps, to_epoch_us
+from .constants import DATA_SOURCES_VERSION, METHODOLOGY_VERSION
+from .factors import FACTOR_REGISTRY
+from .processing import sign_audit_record
+from .segments import SegmentLog
+from .utils import TripQuality, calculate_distance_km, calculate_segment_distances_km, generate_audit_id
+
+# Pings held back per open trip so slightly late pings can still be put in
+# time order. A ping is committed once this many newer ones have arrived.
+LIVE_REORDER_BUFFER_PINGS = 32
+
+# Initial column capacity of an open trip; columns double when full
+_INITIAL_CAPACITY = 256
+
+
+class LivePing(BaseModel):
+    timestamp: str
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
+
+class LivePingBatch(BaseModel):
+    """
+    Pings for an open trip. The trip's identity (supplier_id, vehicle_id,
+    vehicle_type, date, region) is taken from the first batch; later
+    batches may leave it out.
+    """
+    pings: List[LivePing] = Field(min_length=1)
+    supplier_id: Optional[str] = None
+    supplier_name: Optional[str] = None
+    vehicle_id: Optional[str] = None
+    vehicle_type: Optional[str] = None
+    date: Optional[str] = None
+    region: Optional[str] = None
+
+
+class LiveTrip:
+    """
+    A trip still receiving pings. Committed pings sit in time order in
+    growable columns next to their segment distances and emissions, and
+    the trip totals are running sums, so appending k pings costs O(k)
+    however long the trip already is.
+
+    Pings arrive through a min-heap of LIVE_REORDER_BUFFER_PINGS entries:
+    the earliest buffered ping is committed once the buffer overflows. A
+    ping older than the last committed one is too late to place and is
+    dropped, as is a second ping with an already-seen timestamp.
+    """
+
+    __slots__ = (
+        "trip_id", "supplier_id", "supplier_name", "vehicle_id", "vehicle_type", "trip_date", "region",
+        "audit_id", "opened_at", "factor_set", "emission_factor",
+        "_timestamps", "_latitudes", "_longitudes", "_distances", "_emissions", "_count",
+        "_buffer", "_buffered_timestamps", "_reorder_window", "_quality",
+        "distance_km", "emissions_kg_co2e", "late_pings_dropped", "duplicate_pings_dropped",
+        "_record"
+    )
+
+    def __init__(
+        self,
+        trip_id: str,
+        supplier_id: str,
+        vehicle_id: str,
+        vehicle_type: str = "default",
+        trip_date: str = None,
+        region: str = None,
+        reorder_window: int = LIVE_REORDER_BUFFER_PINGS
+    ):
+        self.trip_id = trip_id
+        self.supplier_id = supplier_id
+        # Set by callers that know it; stored with the trip on close
+        self.supplier_name = None
+        self.vehicle_id = vehicle_id
+        self.vehicle_type = vehicle_type
+        self.trip_date = trip_date
+        self.region = region
+        self.audit_id = generate_audit_id(trip_id)
+        self.opened_at = datetime.now().isoformat()
+        # Resolved on the first commit when the trip has no date of its own
+        self.factor_set = None
+        self.emission_factor = None
+
+        self._timestamps = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self._latitudes = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._longitudes = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        # Segment i ends at ping i + 1
+        self._distances = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._emissions = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._count = 0
+
+        self._buffer = []
+        self._buffered_timestamps = set()
+        self._reorder_window = reorder_window
+
+        self.distance_km = 0.0
+        self.emissions_kg_co2e = 0.0
+        self.late_pings_dropped = 0
+        self.duplicate_pings_dropped = 0
+        self._quality = TripQuality(vehicle_type)
+        self._record = None
+
+    @property
+    def pings_committed(self) -> int:
+        return self._count
+
+    @property
+    def pings_buffered(self) -> int:
+        return len(self._buffer)
+
+    def append(self, pings) -> int:
+        """
+        Adds (timestamp, latitude, longitude) pings, timestamps as ISO-8601
+        strings, in any order. Returns how many were accepted. Raises
+        ValueError (before adding any) for an unparseable timestamp.
+        """
+        parsed = []
+        for index, (timestamp, latitude, longitude) in enumerate(pings):
+            try:
+                parsed.append((to_epoch_us(timestamp), latitude, longitude))
+            except (TypeError, ValueError):
+                raise ValueError(f"pings[{index}].timestamp must be an ISO-8601 timestamp")
+
+        last_committed = int(self._timestamps[self._count - 1]) if self._count else None
+        accepted = 0
+        released = []
+        for ping in parsed:
+            timestamp = ping[0]
+            if timestamp in self._buffered_timestamps or timestamp == last_committed:
+                self.duplicate_pings_dropped += 1
+                continue
+            if last_committed is not None and timestamp < last_committed:
+                self.late_pings_dropped += 1
+                continue
+            heapq.heappush(self._buffer, ping)
+            self._buffered_timestamps.add(timestamp)
+            accepted += 1
+            if len(self._buffer) > self._reorder_window:
+                released.append(self._release())
+                last_committed = released[-1][0]
+
+        self._commit(released)
+        return accepted
+
+    def flush(self):
+        """Commits every buffered ping, e.g. before the trip is closed."""
+        self._commit([self._release() for _ in range(len(self._buffer))])
+
+    def _release(self) -> tuple:
+        ping = heapq.heappop(self._buffer)
+        self._buffered_timestamps.discard(ping[0])
+        return ping
+
+    def _reserve(self, size: int):
+        capacity = len(self._timestamps)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        # Views handed out earlier keep the old arrays, so they stay valid
+        for name in ("_timestamps", "_latitudes", "_longitudes", "_distances", "_emissions"):
+            old = getattr(self, name)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self._count] = old[:self._count]
+            setattr(self, name, grown)
+
+    def _commit(self, released: list):
+        """Appends time-ordered pings to the columns and extends segments and totals by them."""
+        if not released:
+            return
+        start, end = self._count, self._count + len(released)
+        self._reserve(end)
+        timestamps, latitudes, longitudes = zip(*released)
+        self._timestamps[start:end] = timestamps
+        self._latitudes[start:end] = latitudes
+        self._longitudes[start:end] = longitudes
+
+        if self.factor_set is None:
+            if self.trip_date is None:
+                self.trip_date = format_timestamps(self._timestamps[:1])[0][:10]
+            self.factor_set = FACTOR_REGISTRY.resolve(self.trip_date, self.region)
+            self.emission_factor = self.factor_set.factor_for(self.vehicle_type)
+
+        # Same haversine as the batch pass, over the new pings plus the last committed one
+        first = max(start - 1, 0)
+        distances = calculate_segment_distances_km(self._latitudes[first:end], self._longitudes[first:end])
+        emissions = distances * self.emission_factor
+        self._distances[first:end - 1] = distances
+        self._emissions[first:end - 1] = emissions
+        self.distance_km += float(distances.sum())
+        self.emissions_kg_co2e += float(emissions.sum())
+        self._quality.add_segments(self._timestamps[first:end], distances)
+        self._count = end
+        self._record = None
+
+    def to_trip(self) -> dict:
+        """Committed pings in the columnar trip shape that process_trip accepts."""
+        return {
+            "trip_id": self.trip_id,
+            "date": self.trip_date,
+            "region": self.region,
+            "timestamps": self._timestamps[:self._count].copy(),
+            "latitudes": self._latitudes[:self._count].copy(),
+            "longitudes": self._longitudes[:self._count].copy()
+        }
+
+    def audit_record(self) -> dict:
+        """
+        Provisional, signed audit record of the committed pings. Segments are
+        views of the live columns and quality signals are running, so this
+        is O(1) per call.
+        """
+        if self._record is None:
+            count = self._count
+            segment_count = max(count - 1, 0)
+            displacement = calculate_distance_km(
+                self._latitudes[0], self._longitudes[0], self._latitudes[count - 1], self._longitudes[count - 1]
+            ) if count else 0.0
+            record = {
+                "audit_id": self.audit_id,
+                "supplier_id": self.supplier_id,
+                "vehicle_id": self.vehicle_id,
+                "vehicle_type": self.vehicle_type,
+                "region": self.region,
+                "trip_date": self.trip_date,
+                "emission_factor_per_km": self.emission_factor,
+                "emission_factor_source_version": self.factor_set.version if self.factor_set else None,
+                "ingested_at": self.opened_at,
+                "data_sources_version": DATA_SOURCES_VERSION,
+                "methodology_version": METHODOLOGY_VERSION,
+                # Views of the live columns: this record is never stored, closing reprocesses the trip
+                "segments": SegmentLog.view(
+                    self._timestamps[:count],
+                    self._distances[:segment_count],
+                    self._emissions[:segment_count]
+                ),
+                "total_trip_distance_km": round(self.distance_km, 2),
+                "total_trip_emissions_kg_co2e": round(self.emissions_kg_co2e, 2),
+                "confidence_score": self._quality.confidence_score(count),
+                "flags": self._quality.flags(count, self.distance_km, displacement),
+                "quality_metrics": self._quality.metrics(),
+                "recommendations": None
+            }
+            sign_audit_record(record, datetime.now().isoformat())
+            self._record = record
+        return self._record
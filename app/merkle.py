@@ -0,0 +1,66 @@
+from .utils import hash_merkle_pair, merkle_level_sizes, generate_merkle_proof
+
+
+def get_merkle_root(store):
+    """Global root over every stored trip's data hash, or None if there are no trips."""
+    sizes = merkle_level_sizes(store.merkle_leaf_count())
+    if not sizes[0]:
+        return None
+    return store.get_merkle_node(len(sizes) - 1, 0)
+
+
+def update_merkle_tree(store, leaf_hashes: dict, removed_trips=()):
+    """
+    Applies leaf changes to the global tree ({trip_id: data_hash} to add or
+    replace, plus trips to drop) and rehashes only the nodes above them.
+    One changed trip costs O(log n); a batch of k shares the upper levels,
+    so a full rebuild is O(n). Returns the new root.
+    """
+    dirty = set()
+    shrunk = False
+    for trip_id in removed_trips:
+        position = store.remove_merkle_leaf(trip_id)
+        if position is not None:
+            dirty.add(position)
+            shrunk = True
+    for trip_id, leaf_hash in leaf_hashes.items():
+        dirty.add(store.set_merkle_leaf(trip_id, leaf_hash))
+
+    sizes = merkle_level_sizes(store.merkle_leaf_count())
+    if shrunk and sizes[0]:
+        # The old last leaf is gone, so the new last one may have lost its sibling
+        dirty.add(sizes[0] - 1)
+    dirty = {index for index in dirty if index < sizes[0]}
+
+    for level, size in enumerate(sizes[:-1]):
+        parents = {}
+        for parent in sorted({index // 2 for index in dirty}):
+            left = store.get_merkle_node(level, 2 * parent)
+            if 2 * parent + 1 < size:
+                parents[parent] = hash_merkle_pair(left, store.get_merkle_node(level, 2 * parent + 1))
+            else:
+                parents[parent] = left
+        store.put_merkle_nodes(level + 1, parents)
+        dirty = parents.keys()
+
+    if shrunk:
+        store.prune_merkle_nodes(sizes)
+    return get_merkle_root(store)
+
+
+def get_trip_inclusion_proof(store, trip_id: str):
+    """
+    O(log n) proof that a trip's data hash is part of the global root,
+    or None if the trip is not in the tree.
+    """
+    position = store.get_merkle_position(trip_id)
+    if position is None:
+        return None
+    leaf_count = store.merkle_leaf_count()
+    return {
+        "leaf_index": position,
+        "leaf_count": leaf_count,
+        "leaf_hash": store.get_merkle_node(0, position),
+        "proof": generate_merkle_proof(store.get_merkle_node, leaf_count, position),
+        "merkle_root": get_merkle_root(store)
+    }
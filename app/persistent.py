@@ -0,0 +1,378 @@
+"""
+Containers for the in-memory store's copy-on-write snapshots (see
+storage._MemoryState). copy.copy of one is cheap and shares its data with
+the original; writes to the copy duplicate only the small part they change,
+so they never show through the original, which is not written again.
+"""
+import bisect
+import math
+from collections.abc import MutableMapping
+
+# Smallest change layer a LayeredDict folds into a new base when copied
+LAYER_COMPACT_MIN_KEYS = 1024
+
+# Items per ChunkedList chunk; SortedChunkedList splits chunks at twice this
+LIST_CHUNK_SIZE = 512
+
+
+class _Marker:
+    """A named sentinel that copy and deepcopy keep as the same object."""
+
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __repr__(self):
+        return self._name
+
+    def __reduce__(self):
+        return self._name
+
+
+_MISSING = _Marker("_MISSING")
+_REMOVED = _Marker("_REMOVED")
+
+
+class LayeredDict(MutableMapping):
+    """
+    Dict made of a base dict shared between copies plus a private layer of
+    the keys changed since. A copy costs the size of the layer, which is
+    folded into a new base once it outgrows LAYER_COMPACT_MIN_KEYS and the
+    square root of the base, so writing k keys costs O(k + sqrt(n))
+    amortized. Iterates in the order a plain dict would.
+    """
+
+    __slots__ = ("_base", "_layer", "_moved", "_len")
+
+    def __init__(self, items=()):
+        self._base = dict(items)
+        self._layer = {}
+        # Base keys deleted and set again: like in a dict, they now iterate last
+        self._moved = set()
+        self._len = len(self._base)
+
+    def __copy__(self):
+        clone = LayeredDict.__new__(LayeredDict)
+        if len(self._layer) > max(LAYER_COMPACT_MIN_KEYS, math.isqrt(len(self._base))):
+            clone._base = dict(self.items())
+            clone._layer = {}
+            clone._moved = set()
+        else:
+            clone._base = self._base
+            clone._layer = dict(self._layer)
+            clone._moved = set(self._moved)
+        clone._len = self._len
+        return clone
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, key):
+        value = self._layer.get(key, _MISSING)
+        if value is _MISSING:
+            return self._base[key]
+        if value is _REMOVED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._layer.get(key, _MISSING)
+        if value is _MISSING:
+            return self._base.get(key, default)
+        return default if value is _REMOVED else value
+
+    def __contains__(self, key):
+        value = self._layer.get(key, _MISSING)
+        if value is _MISSING:
+            return key in self._base
+        return value is not _REMOVED
+
+    def __setitem__(self, key, value):
+        current = self._layer.get(key, _MISSING)
+        if current is _REMOVED:
+            del self._layer[key]
+            self._moved.add(key)
+            self._len += 1
+        elif current is _MISSING and key not in self._base:
+            self._len += 1
+        self._layer[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._base:
+            self._layer[key] = _REMOVED
+        else:
+            del self._layer[key]
+        self._len -= 1
+
+    def __iter__(self):
+        layer = self._layer
+        if not layer:
+            yield from self._base
+            return
+        moved = self._moved
+        for key in self._base:
+            if key not in moved and layer.get(key) is not _REMOVED:
+                yield key
+        for key, value in layer.items():
+            if value is not _REMOVED and (key in moved or key not in self._base):
+                yield key
+
+    def items(self):
+        """(key, value) pairs in iteration order; an iterator rather than a view."""
+        if not self._layer:
+            return iter(self._base.items())
+        return self._iter_layered_items()
+
+    def _iter_layered_items(self):
+        layer, moved, base = self._layer, self._moved, self._base
+        for key, value in base.items():
+            current = layer.get(key, _MISSING)
+            if current is _MISSING:
+                yield key, value
+            elif current is not _REMOVED and key not in moved:
+                yield key, current
+        for key, value in layer.items():
+            if value is not _REMOVED and (key in moved or key not in base):
+                yield key, value
+
+    def values(self):
+        """Values in iteration order; an iterator rather than a view."""
+        return (value for _, value in self.items())
+
+    def __repr__(self):
+        return f"LayeredDict({dict(self.items())!r})"
+
+
+class ChunkedList:
+    """
+    List kept as LIST_CHUNK_SIZE-item chunks shared between copies: a copy
+    costs O(n / LIST_CHUNK_SIZE) and writing an item copies only its chunk.
+    Supports indexing, slice reads, iteration, append/extend, pop from the
+    end and truncate.
+    """
+
+    __slots__ = ("_chunks", "_owned", "_len")
+
+    def __init__(self, items=()):
+        self._chunks = []
+        self._owned = set()
+        self._len = 0
+        self.extend(items)
+
+    def __copy__(self):
+        clone = ChunkedList.__new__(ChunkedList)
+        clone._chunks = list(self._chunks)
+        clone._owned = set()
+        clone._len = self._len
+        # Every chunk is shared from now on, on both sides
+        self._owned = set()
+        return clone
+
+    def _own_chunk(self, i: int) -> list:
+        chunk = self._chunks[i]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[i] = list(chunk)
+            self._owned.add(id(chunk))
+        return chunk
+
+    def __len__(self):
+        return self._len
+
+    def _position(self, index: int) -> tuple:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("ChunkedList index out of range")
+        return divmod(index, LIST_CHUNK_SIZE)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            items = []
+            while start < stop:
+                i, offset = divmod(start, LIST_CHUNK_SIZE)
+                part = self._chunks[i][offset:offset + stop - start]
+                items.extend(part)
+                start += len(part)
+            return items
+        i, offset = self._position(index)
+        return self._chunks[i][offset]
+
+    def __setitem__(self, index: int, value):
+        i, offset = self._position(index)
+        self._own_chunk(i)[offset] = value
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def append(self, value):
+        if not self._chunks or len(self._chunks[-1]) == LIST_CHUNK_SIZE:
+            chunk = []
+            self._chunks.append(chunk)
+            self._owned.add(id(chunk))
+        self._own_chunk(len(self._chunks) - 1).append(value)
+        self._len += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def pop(self):
+        """Removes and returns the last item."""
+        if not self._len:
+            raise IndexError("pop from empty ChunkedList")
+        chunk = self._own_chunk(len(self._chunks) - 1)
+        value = chunk.pop()
+        if not chunk:
+            self._owned.discard(id(self._chunks.pop()))
+        self._len -= 1
+        return value
+
+    def truncate(self, size: int):
+        """Drops every item from position size on."""
+        if size >= self._len:
+            return
+        full, rest = divmod(size, LIST_CHUNK_SIZE)
+        for chunk in self._chunks[full + (1 if rest else 0):]:
+            self._owned.discard(id(chunk))
+        del self._chunks[full + (1 if rest else 0):]
+        if rest:
+            del self._own_chunk(full)[rest:]
+        self._len = size
+
+    def __eq__(self, other):
+        if not isinstance(other, (ChunkedList, list)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"ChunkedList({list(self)!r})"
+
+
+class SortedChunkedList:
+    """
+    Sorted list kept as sorted chunks of up to 2 * LIST_CHUNK_SIZE items,
+    shared between copies like ChunkedList's. add and discard copy one
+    chunk; iter_from walks the items from a value on in order.
+    """
+
+    __slots__ = ("_chunks", "_maxes", "_owned", "_len")
+
+    def __init__(self, items=()):
+        self._chunks = []
+        # Last (largest) item of each chunk, to find the chunk of a value
+        self._maxes = []
+        self._owned = set()
+        self._len = 0
+        for value in items:
+            self.add(value)
+
+    def __copy__(self):
+        clone = SortedChunkedList.__new__(SortedChunkedList)
+        clone._chunks = list(self._chunks)
+        clone._maxes = list(self._maxes)
+        clone._owned = set()
+        clone._len = self._len
+        self._owned = set()
+        return clone
+
+    def _own_chunk(self, i: int) -> list:
+        chunk = self._chunks[i]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[i] = list(chunk)
+            self._owned.add(id(chunk))
+        return chunk
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value):
+        if not self._chunks:
+            chunk = [value]
+            self._chunks.append(chunk)
+            self._maxes.append(value)
+            self._owned.add(id(chunk))
+            self._len = 1
+            return
+        maxes = self._maxes
+        # Growing keys (new trips) land at the end without a search
+        i = len(maxes) - 1 if value >= maxes[-1] else bisect.bisect_left(maxes, value)
+        chunk = self._chunks[i]
+        if id(chunk) not in self._owned:
+            chunk = self._own_chunk(i)
+        if value >= chunk[-1]:
+            chunk.append(value)
+            maxes[i] = value
+        else:
+            bisect.insort(chunk, value)
+        self._len += 1
+        if len(chunk) > 2 * LIST_CHUNK_SIZE:
+            upper = chunk[LIST_CHUNK_SIZE:]
+            del chunk[LIST_CHUNK_SIZE:]
+            self._chunks.insert(i + 1, upper)
+            self._maxes.insert(i + 1, upper[-1])
+            self._maxes[i] = chunk[-1]
+            self._owned.add(id(upper))
+
+    def discard(self, value):
+        """Removes one occurrence of value, if there is one."""
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._chunks):
+            return
+        j = bisect.bisect_left(self._chunks[i], value)
+        if self._chunks[i][j] != value:
+            return
+        chunk = self._own_chunk(i)
+        del chunk[j]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            self._owned.discard(id(self._chunks.pop(i)))
+            del self._maxes[i]
+
+    def iter_from(self, value, inclusive: bool = True):
+        """Items from value on (>= value, or > value if not inclusive), in order."""
+        find = bisect.bisect_left if inclusive else bisect.bisect_right
+        i = find(self._maxes, value)
+        if i == len(self._chunks):
+            return
+        chunk = self._chunks[i]
+        yield from chunk[find(chunk, value):]
+        for chunk in self._chunks[i + 1:]:
+            yield from chunk
+
+    def __getitem__(self, index: slice) -> list:
+        """Slice reads (e.g. one page of a ranking)."""
+        start, stop, step = index.indices(self._len)
+        if step != 1:
+            return list(self)[index]
+        items = []
+        for chunk in self._chunks:
+            if start >= stop:
+                break
+            if start < len(chunk):
+                items.extend(chunk[start:stop])
+                start = 0
+            else:
+                start -= len(chunk)
+            stop -= len(chunk)
+        return items
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __eq__(self, other):
+        if not isinstance(other, (SortedChunkedList, list)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"SortedChunkedList({list(self)!r})"
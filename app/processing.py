@@ -0,0 +1,266 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from .utils import (
+    TripQuality,
+    calculate_distance_km,
+    calculate_fleet_segment_distances_km,
+    calculate_fleet_segment_seconds,
+    calculate_segment_distances_km,
+    generate_recommendations,
+    generate_audit_id,
+    generate_field_hash,
+    generate_merkle_root_hash
+)
+from .constants import DATA_SOURCES_VERSION, METHODOLOGY_VERSION
+from .factors import FACTOR_REGISTRY
+from .columnar import format_timestamps, to_epoch_us_array
+from .segments import SegmentLog
+from .simplify import TRACK_SIMPLIFY_TOLERANCE_M, simplify_track
+
+# Trips sent to a worker process per task. Large enough to amortize
+# pickling overhead, small enough to keep the pool evenly loaded.
+TRIP_BATCH_SIZE = 256
+
+# Batches queued per worker, bounding how much of the stream is in flight.
+BATCHES_IN_FLIGHT_PER_WORKER = 2
+
+
+def sign_audit_record(audit_record: dict, calculated_at: str):
+    """Stamps the calculation time and (re)generates the field hashes and Merkle root."""
+    audit_record["calculated_at"] = calculated_at
+
+    # 1️⃣ GENERATE FIELD-LEVEL HASHES (The "Ledger")
+    fields_to_hash = {
+        "total_trip_distance_km": audit_record["total_trip_distance_km"],
+        "total_trip_emissions_kg_co2e": audit_record["total_trip_emissions_kg_co2e"],
+        "confidence_score": audit_record["confidence_score"],
+        "vehicle_id": audit_record["vehicle_id"],
+        "calculated_at": calculated_at
+    }
+
+    audit_record["field_hashes"] = {
+        field: generate_field_hash(value, audit_record["audit_id"], calculated_at)
+        for field, value in fields_to_hash.items()
+    }
+
+    # 2️⃣ Merkle Root Hash
+    audit_record["data_hash"] = generate_merkle_root_hash(audit_record["field_hashes"])
+
+
+def price_audit_record(audit_record: dict, factor_set, calculated_at: str = None) -> float:
+    """
+    Applies a factor set to the segment distances stored in an audit record:
+    segment and trip emissions, recommendations, then a new calculation time
+    and integrity hashes. Only arithmetic on stored distances, so re-pricing
+    after a new factor version ships never touches GPS data. Updates the
+    record in place and returns the unrounded trip emissions.
+    """
+    vehicle_type = audit_record["vehicle_type"]
+    emission_factor = factor_set.factor_for(vehicle_type)
+    segments = audit_record["segments"]
+    segment_emissions = segments.distances_km * emission_factor
+    trip_emissions = float(segment_emissions.sum())
+
+    audit_record["emission_factor_per_km"] = emission_factor
+    audit_record["emission_factor_source_version"] = factor_set.version
+    audit_record["segments"] = SegmentLog(segments.timestamps, segments.distances_km, segment_emissions)
+    audit_record["total_trip_emissions_kg_co2e"] = round(trip_emissions, 2)
+
+    # 6️⃣ Recommendations
+    audit_record["recommendations"] = generate_recommendations(vehicle_type, trip_emissions)
+
+    sign_audit_record(audit_record, calculated_at or datetime.now().isoformat())
+    return trip_emissions
+
+
+def process_trip(
+    trip: dict, supplier_id: str, vehicle_id: str, vehicle_type: str,
+    simplify_tolerance_m: float = TRACK_SIMPLIFY_TOLERANCE_M
+):
+    """
+    Calculates emissions, quality signals and integrity hashes for one trip.
+    Only depends on its arguments, so it can run in any worker process.
+    Returns (trip_id, audit_record, trip_distance) with the unrounded
+    distance for supplier aggregation.
+
+    The trip is either a JSON trip with a "gps_pings" list, or a columnar
+    trip (see columnar.ColumnarDataset.read_trip) whose time-sorted ping
+    columns are used for the distance pass without copying. Its emission
+    factors come from the factor set valid for its date and region.
+
+    With simplify_tolerance_m (TRACK_SIMPLIFY_TOLERANCE_M by default) the
+    track is simplified with simplify.simplify_track before segments and
+    distance are computed; quality signals still see every ping, and the
+    record's track_simplification reports the pings removed and the error.
+    """
+    return process_trip_batch([(trip, supplier_id, vehicle_id, vehicle_type)], simplify_tolerance_m)[0]
+
+
+def process_trip_batch(jobs: list, simplify_tolerance_m: float = TRACK_SIMPLIFY_TOLERANCE_M) -> list:
+    """
+    process_trip over a list of (trip, supplier_id, vehicle_id, vehicle_type)
+    jobs. The JSON trips' timestamps are parsed in one pass, and every
+    trip's segment distances and quality signals come from one
+    calculate_fleet_segment_distances_km / TripQuality.for_trips pass over
+    the whole batch, so short trips do not each pay the fixed cost of the
+    NumPy calls.
+    """
+    if not jobs:
+        return []
+    pings = [job[0]["gps_pings"] for job in jobs if "gps_pings" in job[0]]
+    all_timestamps = to_epoch_us_array([p["timestamp"] for trip_pings in pings for p in trip_pings])
+    all_latitudes = np.array([p["latitude"] for trip_pings in pings for p in trip_pings], dtype=np.float64)
+    all_longitudes = np.array([p["longitude"] for trip_pings in pings for p in trip_pings], dtype=np.float64)
+
+    columns = []
+    start = 0
+    for trip, *_ in jobs:
+        if "gps_pings" not in trip:
+            # Columnar trips are already time sorted
+            columns.append((trip["timestamps"], trip["latitudes"], trip["longitudes"]))
+            continue
+        end = start + len(trip["gps_pings"])
+        timestamps = all_timestamps[start:end]
+        order = np.argsort(timestamps, kind="stable")
+        columns.append((timestamps[order], all_latitudes[start:end][order], all_longitudes[start:end][order]))
+        start = end
+
+    trip_offsets = np.cumsum([0] + [len(timestamps) for timestamps, _, _ in columns])
+    timestamps, latitudes, longitudes = (np.concatenate(column) for column in zip(*columns))
+    distances, segment_offsets = calculate_fleet_segment_distances_km(latitudes, longitudes, trip_offsets)
+    qualities = TripQuality.for_trips(
+        [job[3] for job in jobs], calculate_fleet_segment_seconds(timestamps, trip_offsets),
+        distances, segment_offsets
+    )
+    return [
+        _audit_trip(
+            *job, *columns[k], distances[segment_offsets[k]:segment_offsets[k + 1]], qualities[k],
+            simplify_tolerance_m
+        )
+        for k, job in enumerate(jobs)
+    ]
+
+
+def _audit_trip(
+    trip: dict, supplier_id: str, vehicle_id: str, vehicle_type: str,
+    timestamps, latitudes, longitudes, segment_distances, quality: TripQuality, simplify_tolerance_m: float
+):
+    """process_trip once the trip's time-sorted columns, segment distances and quality are known."""
+    trip_id = trip["trip_id"]
+
+    # Initialize audit log for this trip with PROVENANCE METADATA
+    audit_id = generate_audit_id(trip_id)
+    processing_time = datetime.now()
+    processing_time_iso = processing_time.isoformat()
+
+    # Emission fields, calculated_at and the hashes are filled in by price_audit_record
+    audit_record = {
+        "audit_id": audit_id,
+        "supplier_id": supplier_id,
+        "vehicle_id": vehicle_id,
+        "vehicle_type": vehicle_type,
+        "region": trip.get("region"),
+        "emission_factor_per_km": None,
+        # 2️⃣ Attach Versioning: shared objects are referenced by version (see references.py)
+        "emission_factor_source_version": None,
+        "calculated_at": None,
+        "ingested_at": processing_time_iso, # Simulated same time
+        "data_sources_version": DATA_SOURCES_VERSION,
+        "segments": None,
+        # 1️⃣ Field-Level Hashes Storage
+        "field_hashes": {}
+    }
+
+    ping_count = len(timestamps)
+    trip_date = trip.get("date")
+    if not trip_date and ping_count:
+        # The first ping's date as the source wrote it
+        if "gps_pings" in trip:
+            trip_date = min(p["timestamp"] for p in trip["gps_pings"])[:10]
+        else:
+            trip_date = format_timestamps(timestamps[:1])[0][:10]
+    audit_record["trip_date"] = trip_date or None
+
+    trip_distance = float(segment_distances.sum())
+
+    # 3️⃣ Confidence & Anomalies, from the segments' time deltas and distances
+    displacement = calculate_distance_km(latitudes[0], longitudes[0], latitudes[-1], longitudes[-1]) if ping_count else 0.0
+    audit_record["confidence_score"] = quality.confidence_score(ping_count)
+    audit_record["flags"] = quality.flags(ping_count, trip_distance, displacement)
+    audit_record["quality_metrics"] = quality.metrics()
+    audit_record["recommendations"] = None
+
+    # Optional track simplification: scored above on every ping, priced on the kept ones
+    if simplify_tolerance_m is not None and ping_count > 2:
+        kept, simplification = simplify_track(timestamps, latitudes, longitudes, simplify_tolerance_m)
+        if len(kept) < ping_count:
+            timestamps = np.asarray(timestamps, dtype=np.int64)[kept]
+            segment_distances = calculate_segment_distances_km(
+                np.asarray(latitudes, dtype=np.float64)[kept], np.asarray(longitudes, dtype=np.float64)[kept]
+            )
+            simplified_distance = float(segment_distances.sum())
+            simplification["distance_removed_km"] = round(trip_distance - simplified_distance, 4)
+            trip_distance = simplified_distance
+        else:
+            simplification["distance_removed_km"] = 0.0
+        audit_record["track_simplification"] = simplification
+
+    # Add detailed segment data to the audit log, kept compact until a report is serialized
+    audit_record["segments"] = SegmentLog(timestamps, segment_distances, np.zeros_like(segment_distances))
+
+    # Update totals for the trip in the audit log
+    audit_record["total_trip_distance_km"] = round(trip_distance, 2)
+    audit_record["total_trip_emissions_kg_co2e"] = None
+
+    # 8️⃣ Methodology
+    audit_record["methodology_version"] = METHODOLOGY_VERSION
+
+    factor_set = FACTOR_REGISTRY.resolve(audit_record["trip_date"], audit_record["region"])
+    price_audit_record(audit_record, factor_set, calculated_at=processing_time_iso)
+
+    return trip_id, audit_record, trip_distance
+
+
+def _process_trip_batch(batch: list) -> list:
+    """Worker entry point: processes a list of (trip, supplier_id, vehicle_id, vehicle_type) jobs."""
+    return process_trip_batch(batch)
+
+
+def process_trips(jobs, workers: int = 1):
+    """
+    Processes (trip, supplier_id, vehicle_id, vehicle_type) jobs and yields
+    (trip_id, audit_record, trip_distance) in the same order as the input.
+
+    With workers > 1 the jobs are sharded in batches across a process pool.
+    Only a bounded number of batches is in flight at once, so a streamed
+    input is never fully materialized, and results are yielded strictly in
+    submission order so the merged output is deterministic.
+    """
+    jobs = iter(jobs)
+    if workers <= 1:
+        while True:
+            batch = list(islice(jobs, TRIP_BATCH_SIZE))
+            if not batch:
+                return
+            yield from process_trip_batch(batch)
+
+    max_in_flight = workers * BATCHES_IN_FLIGHT_PER_WORKER
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < max_in_flight:
+                batch = list(islice(jobs, TRIP_BATCH_SIZE))
+                if not batch:
+                    break
+                pending.append(executor.submit(_process_trip_batch, batch))
+
+            if not pending:
+                return
+
+            yield from pending.popleft().result()
@@ -0,0 +1,27 @@
+from .constants import DATA_SOURCES, DATA_SOURCES_VERSION, METHODOLOGY_TEXT, METHODOLOGY_VERSION
+from .factors import FACTOR_REGISTRY
+
+# Shared objects that audit records point to by version instead of embedding
+# a copy: record["<kind>_version"] names an entry of REFERENCE_REGISTRY[kind].
+# Old versions must stay registered so records computed under them still expand.
+REFERENCE_REGISTRY = {
+    "emission_factor_source": FACTOR_REGISTRY.metadata_by_version(),
+    "data_sources": {DATA_SOURCES_VERSION: DATA_SOURCES},
+    "methodology": {METHODOLOGY_VERSION: METHODOLOGY_TEXT}
+}
+
+# Versions stamped on newly processed records. The factor set actually used
+# depends on each trip's date and region; this is the latest default one.
+CURRENT_REFERENCE_VERSIONS = {
+    "emission_factor_source": FACTOR_REGISTRY.latest.version,
+    "data_sources": DATA_SOURCES_VERSION,
+    "methodology": METHODOLOGY_VERSION
+}
+
+
+def expand_references(record: dict):
+    """Adds the referenced objects to a record (a copy), under their kind names."""
+    for kind, versions in REFERENCE_REGISTRY.items():
+        version = record.get(f"{kind}_version")
+        if version is not None:
+            record[kind] = versions.get(version)
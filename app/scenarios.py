@@ -0,0 +1,175 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+
+class VehicleSwap(BaseModel):
+    """Moves every trip of one vehicle type to another, for one supplier or (supplier_id None) the whole fleet."""
+    from_vehicle_type: str
+    to_vehicle_type: str
+    supplier_id: Optional[str] = None
+
+
+class Scenario(BaseModel):
+    """
+    A what-if: factor_overrides replaces the kg CO2e per km of vehicle types
+    in every factor set ("default" replaces the fallback for types a set has
+    no factor for), and vehicle_swaps re-assigns trips to other vehicle types.
+    Swaps all match the trips' actual vehicle types, so they do not chain.
+    """
+    factor_overrides: Dict[str, float] = Field(default_factory=dict)
+    vehicle_swaps: List[VehicleSwap] = Field(default_factory=list)
+
+
+class FleetModel:
+    """
+    Every stored trip as parallel arrays: its distance plus integer codes
+    for its supplier, vehicle type and factor set. Emissions are distance
+    times factor, so any factor map is priced for the whole fleet with one
+    gather and one multiply, without touching records or GPS data.
+    """
+
+    __slots__ = (
+        "supplier_ids", "vehicle_types", "factor_sets",
+        "distances_km", "supplier_codes", "vehicle_type_codes", "factor_set_codes"
+    )
+
+    def __init__(self, trip_index, factor_registry):
+        self.factor_sets = factor_registry.factor_sets()
+        set_codes = {factor_set.version: code for code, factor_set in enumerate(self.factor_sets)}
+        supplier_codes, vehicle_type_codes = {}, {}
+        distances, suppliers, vehicle_types, factor_sets = [], [], [], []
+
+        for _, entry in trip_index:
+            set_code = set_codes.get(entry["factor_set_version"])
+            if set_code is None:
+                # Priced with a set that is no longer shipped: use the one it would get now
+                set_code = set_codes[factor_registry.resolve(entry["trip_date"], entry["region"]).version]
+            distances.append(entry["distance_km"])
+            suppliers.append(supplier_codes.setdefault(entry["supplier_id"], len(supplier_codes)))
+            vehicle_types.append(vehicle_type_codes.setdefault(entry["vehicle_type"], len(vehicle_type_codes)))
+            factor_sets.append(set_code)
+
+        self.supplier_ids = list(supplier_codes)
+        self.vehicle_types = list(vehicle_type_codes)
+        self.distances_km = np.array(distances, dtype=np.float64)
+        self.supplier_codes = np.array(suppliers, dtype=np.int64)
+        self.vehicle_type_codes = np.array(vehicle_types, dtype=np.int64)
+        self.factor_set_codes = np.array(factor_sets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.distances_km)
+
+    def factor_matrix(self, vehicle_types: list, overrides: dict = None) -> np.ndarray:
+        """factors[set_code, type_code] for the given vehicle type order, with overrides applied."""
+        overrides = overrides or {}
+        fallback_override = overrides.get("default")
+        factors = np.empty((len(self.factor_sets), len(vehicle_types)), dtype=np.float64)
+        for row, factor_set in enumerate(self.factor_sets):
+            for column, vehicle_type in enumerate(vehicle_types):
+                if vehicle_type in overrides:
+                    factors[row, column] = overrides[vehicle_type]
+                elif vehicle_type in factor_set.factors or fallback_override is None:
+                    factors[row, column] = factor_set.factor_for(vehicle_type)
+                else:
+                    factors[row, column] = fallback_override
+        return factors
+
+
+def _known_vehicle_types(fleet: FleetModel, overrides: dict) -> set:
+    known = set(fleet.vehicle_types) | set(overrides)
+    for factor_set in fleet.factor_sets:
+        known.update(factor_set.factors)
+    return known
+
+
+def evaluate_scenario(fleet: FleetModel, scenario: Scenario, supplier_names: dict = None) -> dict:
+    """
+    Prices the fleet as stored (baseline) and under the scenario, and returns
+    fleet totals plus every supplier ranked by scenario emissions (lowest
+    first) with its delta and rank change. Both sides use the same unrounded
+    distance * factor arithmetic, so deltas only reflect the scenario.
+    Raises ValueError for negative or non-finite factors, unknown swap
+    suppliers, or swap targets that no factor set or override prices.
+    """
+    supplier_names = supplier_names or {}
+    overrides = scenario.factor_overrides
+    for vehicle_type, factor in overrides.items():
+        if not math.isfinite(factor) or factor < 0:
+            raise ValueError(f"Emission factor for {vehicle_type} must be a finite, non-negative number")
+
+    known_types = _known_vehicle_types(fleet, overrides)
+    supplier_codes = {supplier_id: code for code, supplier_id in enumerate(fleet.supplier_ids)}
+    for swap in scenario.vehicle_swaps:
+        if swap.to_vehicle_type not in known_types:
+            raise ValueError(f"Unknown vehicle type {swap.to_vehicle_type}: add it to factor_overrides")
+        if swap.supplier_id is not None and swap.supplier_id not in supplier_codes:
+            raise ValueError(f"Supplier {swap.supplier_id} has no stored trips")
+
+    # Swap targets the fleet does not use yet get codes past the fleet's own types
+    vehicle_types = list(fleet.vehicle_types)
+    type_codes = {vehicle_type: code for code, vehicle_type in enumerate(vehicle_types)}
+    for swap in scenario.vehicle_swaps:
+        if swap.to_vehicle_type not in type_codes:
+            type_codes[swap.to_vehicle_type] = len(vehicle_types)
+            vehicle_types.append(swap.to_vehicle_type)
+
+    scenario_type_codes = fleet.vehicle_type_codes.copy()
+    trips_swapped = []
+    for swap in scenario.vehicle_swaps:
+        from_code = type_codes.get(swap.from_vehicle_type)
+        if from_code is None:
+            trips_swapped.append(0)
+            continue
+        mask = fleet.vehicle_type_codes == from_code
+        if swap.supplier_id is not None:
+            mask &= fleet.supplier_codes == supplier_codes[swap.supplier_id]
+        scenario_type_codes[mask] = type_codes[swap.to_vehicle_type]
+        trips_swapped.append(int(mask.sum()))
+
+    baseline_factors = fleet.factor_matrix(vehicle_types)
+    scenario_factors = fleet.factor_matrix(vehicle_types, overrides)
+    baseline = fleet.distances_km * baseline_factors[fleet.factor_set_codes, fleet.vehicle_type_codes]
+    projected = fleet.distances_km * scenario_factors[fleet.factor_set_codes, scenario_type_codes]
+
+    supplier_count = len(fleet.supplier_ids)
+    baseline_by_supplier = np.bincount(fleet.supplier_codes, weights=baseline, minlength=supplier_count)
+    scenario_by_supplier = np.bincount(fleet.supplier_codes, weights=projected, minlength=supplier_count)
+    distance_by_supplier = np.bincount(fleet.supplier_codes, weights=fleet.distances_km, minlength=supplier_count)
+
+    baseline_order = np.argsort(baseline_by_supplier, kind="stable")
+    scenario_order = np.argsort(scenario_by_supplier, kind="stable")
+    baseline_rank = np.empty(supplier_count, dtype=np.int64)
+    baseline_rank[baseline_order] = np.arange(1, supplier_count + 1)
+
+    leaderboard = []
+    for rank, code in enumerate(scenario_order.tolist(), start=1):
+        before, after = float(baseline_by_supplier[code]), float(scenario_by_supplier[code])
+        supplier_id = fleet.supplier_ids[code]
+        leaderboard.append({
+            "rank": rank,
+            "supplier_id": supplier_id,
+            "name": supplier_names.get(supplier_id, supplier_id),
+            "total_distance_km": round(float(distance_by_supplier[code]), 2),
+            "baseline_emissions_kg_co2e": round(before, 2),
+            "scenario_emissions_kg_co2e": round(after, 2),
+            "delta_kg_co2e": round(after - before, 2),
+            "delta_pct": round((after - before) / before * 100, 2) if before > 0 else None,
+            "baseline_rank": int(baseline_rank[code]),
+            "rank_change": int(baseline_rank[code]) - rank
+        })
+
+    fleet_before, fleet_after = float(baseline.sum()), float(projected.sum())
+    return {
+        "trips_evaluated": len(fleet),
+        "trips_swapped": trips_swapped,
+        "fleet": {
+            "baseline_emissions_kg_co2e": round(fleet_before, 2),
+            "scenario_emissions_kg_co2e": round(fleet_after, 2),
+            "delta_kg_co2e": round(fleet_after - fleet_before, 2),
+            "delta_pct": round((fleet_after - fleet_before) / fleet_before * 100, 2) if fleet_before > 0 else None
+        },
+        "leaderboard": leaderboard
+    }
@@ -0,0 +1,97 @@
+import base64
+
+import numpy as np
+
+from .columnar import format_timestamps, timestamp_unit
+
+# Key marking an encoded SegmentLog inside a JSON-serialized audit record
+SEGMENT_LOG_JSON_KEY = "__segment_log__"
+
+# Fixed byte order, so encoded logs read back the same on any machine
+_JSON_COLUMN_DTYPES = {"timestamps": "<i8", "distances_km": "<f8", "emissions_kg_co2e": "<f8"}
+
+
+def _owned(values, dtype) -> np.ndarray:
+    array = np.asarray(values, dtype=dtype)
+    # Arrays computed here own their memory; ones decoded by from_json sit on immutable bytes
+    return array if array.base is None or isinstance(array.base, bytes) else array.copy()
+
+
+class SegmentLog:
+    """
+    Per-segment calculation log of a trip as parallel arrays instead of one
+    dict per segment: 24 bytes per segment rather than a dict with two ISO
+    timestamp strings. Segment i runs from timestamps[i] to timestamps[i + 1]
+    (epoch microseconds, UTC). It is only expanded to the report's dict form
+    when serialized, see to_dicts.
+
+    The log owns its arrays: views (such as slices of memory-mapped
+    columnar files, which are rewritten when the source is re-converted)
+    are copied, so a stored record never changes under its hashes.
+    """
+
+    __slots__ = ("timestamps", "distances_km", "emissions_kg_co2e")
+
+    def __init__(self, timestamps, distances_km, emissions_kg_co2e):
+        self.timestamps = _owned(timestamps, np.int64)
+        self.distances_km = _owned(distances_km, np.float64)
+        self.emissions_kg_co2e = _owned(emissions_kg_co2e, np.float64)
+
+    @classmethod
+    def view(cls, timestamps, distances_km, emissions_kg_co2e) -> "SegmentLog":
+        """A log over the given arrays without copying them, for records that are never stored."""
+        log = cls.__new__(cls)
+        log.timestamps = np.asarray(timestamps, dtype=np.int64)
+        log.distances_km = np.asarray(distances_km, dtype=np.float64)
+        log.emissions_kg_co2e = np.asarray(emissions_kg_co2e, dtype=np.float64)
+        return log
+
+    def __len__(self) -> int:
+        return len(self.distances_km)
+
+    def to_dicts(self, offset: int = 0, limit: int = None) -> list:
+        """Expands segments [offset, offset + limit) to the audit report's segment dicts."""
+        stop = None if limit is None else offset + limit
+        distances = self.distances_km[offset:stop].tolist()
+        emissions = self.emissions_kg_co2e[offset:stop].tolist()
+        # Format the slice like the whole trip, so pages agree with each other
+        timestamps = format_timestamps(
+            self.timestamps[offset:offset + len(distances) + 1], unit=timestamp_unit(self.timestamps)
+        )
+        return [
+            {
+                "from_timestamp": timestamps[i],
+                "to_timestamp": timestamps[i + 1],
+                "distance_km": round(distance, 4),
+                "emissions_kg_co2e": round(emission, 4)
+            }
+            for i, (distance, emission) in enumerate(zip(distances, emissions))
+        ]
+
+    def to_json(self) -> dict:
+        """JSON-safe form (base64 of the raw little-endian columns) for stores that persist records as JSON."""
+        return {
+            name: base64.b64encode(getattr(self, name).astype(dtype).tobytes()).decode("ascii")
+            for name, dtype in _JSON_COLUMN_DTYPES.items()
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SegmentLog":
+        return cls(**{
+            name: np.frombuffer(base64.b64decode(data[name]), dtype=dtype)
+            for name, dtype in _JSON_COLUMN_DTYPES.items()
+        })
+
+
+def encode_json_value(value):
+    """json.dumps default= hook for audit records holding a SegmentLog."""
+    if isinstance(value, SegmentLog):
+        return {SEGMENT_LOG_JSON_KEY: value.to_json()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def decode_json_object(obj: dict):
+    """json.loads object_hook= counterpart of encode_json_value."""
+    if SEGMENT_LOG_JSON_KEY in obj:
+        return SegmentLog.from_json(obj[SEGMENT_LOG_JSON_KEY])
+    return obj
@@ -0,0 +1,146 @@
+import os
+from math import cos, radians
+
+import numpy as np
+
+from .utils import EARTH_RADIUS_KM
+
+# Set to a distance in metres to simplify GPS tracks before the distance
+# pass; unset (the default) keeps every ping.
+TRACK_SIMPLIFY_TOLERANCE_ENV = "TRACK_SIMPLIFY_TOLERANCE_M"
+
+TRACK_SIMPLIFY_TOLERANCE_M = float(os.environ[TRACK_SIMPLIFY_TOLERANCE_ENV]) if os.environ.get(TRACK_SIMPLIFY_TOLERANCE_ENV) else None
+
+_EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+
+def _offsets_m(lat0, lon0, latitudes, longitudes):
+    """Local east/north offsets in metres from (lat0, lon0), equirectangular."""
+    dlon = (longitudes - lon0 + 180.0) % 360.0 - 180.0
+    x = np.radians(dlon) * _EARTH_RADIUS_M * np.cos(np.radians(lat0))
+    y = np.radians(latitudes - lat0) * _EARTH_RADIUS_M
+    return x, y
+
+
+def _cross_track_m(a_lat, a_lon, b_lat, b_lon, latitudes, longitudes):
+    """Distance in metres from each point to the segment A-B (A-B may be arrays too)."""
+    bx, by = _offsets_m(a_lat, a_lon, b_lat, b_lon)
+    px, py = _offsets_m(a_lat, a_lon, latitudes, longitudes)
+    length_sq = bx * bx + by * by
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(length_sq > 0, (px * bx + py * by) / length_sq, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - t * bx, py - t * by)
+
+
+def _collapse_duplicates(timestamps: np.ndarray) -> np.ndarray:
+    """Indices of the first ping of each timestamp (timestamps are sorted)."""
+    keep = np.ones(len(timestamps), dtype=bool)
+    keep[1:] = timestamps[1:] != timestamps[:-1]
+    return np.flatnonzero(keep)
+
+
+def _suppress_jitter(latitudes: list, longitudes: list, radius_m: float) -> list:
+    """
+    Positions (into the given lists) that survive stationary jitter
+    suppression: while pings stay within radius_m of the last kept ping
+    they are dropped, except the last one before the vehicle moves off,
+    so the stop keeps its start and end time.
+    """
+    count = len(latitudes)
+    keep = [0]
+    anchor_lat, anchor_lon = latitudes[0], longitudes[0]
+    scale = cos(radians(anchor_lat))
+    radius_sq = (radius_m / _EARTH_RADIUS_M) ** 2
+    pending = None
+    for i in range(1, count):
+        dlat = radians(latitudes[i] - anchor_lat)
+        dlon = radians((longitudes[i] - anchor_lon + 180.0) % 360.0 - 180.0) * scale
+        if dlat * dlat + dlon * dlon <= radius_sq and i < count - 1:
+            pending = i
+            continue
+        if pending is not None:
+            keep.append(pending)
+            pending = None
+        keep.append(i)
+        anchor_lat, anchor_lon = latitudes[i], longitudes[i]
+        scale = cos(radians(anchor_lat))
+    return keep
+
+
+def _douglas_peucker(latitudes: np.ndarray, longitudes: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """Positions kept by Douglas-Peucker; iterative, each range measured in one vectorized step."""
+    count = len(latitudes)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    ranges = [(0, count - 1)]
+    while ranges:
+        start, end = ranges.pop()
+        if end - start < 2:
+            continue
+        distances = _cross_track_m(
+            latitudes[start], longitudes[start], latitudes[end], longitudes[end],
+            latitudes[start + 1:end], longitudes[start + 1:end]
+        )
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            ranges.append((start, split))
+            ranges.append((split, end))
+    return np.flatnonzero(keep)
+
+
+def simplify_track(timestamps, latitudes, longitudes, tolerance_m: float):
+    """
+    Picks the pings of a time-sorted track to keep: one ping per timestamp,
+    stationary jitter within tolerance_m of a stop dropped, then
+    Douglas-Peucker with tolerance_m. The first ping and the last timestamp
+    are always kept. Returns (kept_indices, summary), where the summary
+    counts the pings each stage removed and gives max_deviation_m, the
+    largest distance of any removed ping from the simplified track, measured.
+    It is at most 2 * tolerance_m: a stop's jitter is within tolerance_m of
+    a ping that Douglas-Peucker may in turn drop within tolerance_m.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    count = len(timestamps)
+    summary = {
+        "tolerance_m": tolerance_m,
+        "pings_in": count,
+        "pings_kept": count,
+        "duplicates_removed": 0,
+        "stationary_removed": 0,
+        "simplified_removed": 0,
+        "max_deviation_m": 0.0
+    }
+    if count < 3:
+        return np.arange(count), summary
+
+    kept = _collapse_duplicates(timestamps)
+    summary["duplicates_removed"] = count - len(kept)
+
+    if len(kept) >= 3:
+        stationary_kept = kept[_suppress_jitter(latitudes[kept].tolist(), longitudes[kept].tolist(), tolerance_m)]
+        summary["stationary_removed"] = len(kept) - len(stationary_kept)
+        kept = stationary_kept
+
+    if len(kept) >= 3:
+        simplified = kept[_douglas_peucker(latitudes[kept], longitudes[kept], tolerance_m)]
+        summary["simplified_removed"] = len(kept) - len(simplified)
+        kept = simplified
+
+    if len(kept) < count:
+        # Every ping against the kept segment spanning it (kept pings measure 0)
+        if len(kept) == 1:
+            start = end = np.full(count, kept[0])
+        else:
+            segment = np.clip(np.searchsorted(kept, np.arange(count), side="right") - 1, 0, len(kept) - 2)
+            start, end = kept[segment], kept[segment + 1]
+        deviations = _cross_track_m(
+            latitudes[start], longitudes[start], latitudes[end], longitudes[end], latitudes, longitudes
+        )
+        summary["max_deviation_m"] = round(float(deviations.max()), 2)
+    summary["pings_kept"] = len(kept)
+    return kept, summary
@@ -0,0 +1,1152 @@
+import copy
+import heapq
+import itertools
+import json
+import os
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .persistent import ChunkedList, LayeredDict, SortedChunkedList
+from .segments import decode_json_object, encode_json_value
+
+# Set to a file path to keep audit state in SQLite instead of process memory.
+AUDIT_DB_PATH_ENV = "AUDIT_DB_PATH"
+
+# Bumped whenever the SQLite layout changes. Everything but the tamper log is
+# derived from source data, so an outdated file just has those tables rebuilt
+# and the next processing run refills them.
+SQLITE_SCHEMA_VERSION = 12
+
+# Rows fetched per query when scanning whole tables
+SQLITE_SCAN_PAGE_SIZE = 500
+
+# How long a SQLite writer waits for another one before giving up
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+# Orders the supplier leaderboard can be served in, each kept as a sorted index
+SUPPLIER_RANKING_METRICS = ("emissions", "distance", "intensity")
+
+
+class StoreBusyError(Exception):
+    """Raised by transaction(wait=False) when another writer holds the store."""
+
+
+def _ranking_values(supplier: dict) -> dict:
+    distance = supplier["total_distance_km"]
+    emissions = supplier["total_emissions_kg_co2e"]
+    return {
+        "emissions": emissions,
+        "distance": distance,
+        # kg CO2e per km; suppliers without distance rank as zero
+        "intensity": emissions / distance if distance > 0 else 0.0
+    }
+
+
+def _empty_fleet_totals() -> dict:
+    return {
+        "total_emissions_kg_co2e": 0.0,
+        "total_distance_km": 0.0,
+        "confidence_sum": 0.0,
+        "trip_count": 0
+    }
+
+
+# Index entry fields the trip listing filters by range; their distinct values are kept sorted
+_LISTING_RANGE_FIELDS = ("trip_date", "confidence_score")
+
+# Most per-value index lists a range filter merges to drive a listing page;
+# ranges over more distinct values are checked trip by trip instead
+LISTING_RANGE_MAX_VALUES = 512
+
+
+def _listing_keys(index_entry: dict) -> list:
+    """The (field, value) keys a trip is filed under in the listing indexes."""
+    keys = [("supplier_id", index_entry["supplier_id"]), ("vehicle_type", index_entry["vehicle_type"])]
+    keys.extend(("flag", flag) for flag in index_entry["flags"])
+    keys.extend((field, index_entry[field]) for field in _LISTING_RANGE_FIELDS if index_entry[field] is not None)
+    return keys
+
+
+def _matches_trip_filters(index_entry: dict, filters: dict) -> bool:
+    """
+    Applies trip listing filters: supplier_id, vehicle_type and flag must match
+    exactly, date_from/date_to bound trip_date (inclusive, ISO strings) and
+    confidence_below is a strict upper bound on confidence_score.
+    """
+    if filters.get("supplier_id") is not None and index_entry["supplier_id"] != filters["supplier_id"]:
+        return False
+    if filters.get("vehicle_type") is not None and index_entry["vehicle_type"] != filters["vehicle_type"]:
+        return False
+    if filters.get("flag") is not None and filters["flag"] not in index_entry["flags"]:
+        return False
+    trip_date = index_entry["trip_date"]
+    if filters.get("date_from") is not None and (trip_date is None or trip_date < filters["date_from"]):
+        return False
+    if filters.get("date_to") is not None and (trip_date is None or trip_date > filters["date_to"]):
+        return False
+    if filters.get("confidence_below") is not None and not index_entry["confidence_score"] < filters["confidence_below"]:
+        return False
+    return True
+
+
+# Store methods that modify state; MemoryAuditStore runs them on a writer's private copy
+_MEMORY_WRITE_METHODS = frozenset({
+    "clear", "upsert_supplier", "add_supplier_totals", "add_fleet_totals", "delete_supplier",
+    "put_trip", "delete_trip", "update_trip_field", "replace_trip_locations", "set_trip_location",
+    "set_merkle_leaf", "remove_merkle_leaf", "put_merkle_nodes", "prune_merkle_nodes",
+    "record_tamper_event"
+})
+
+
+class _MemoryState:
+    """
+    One generation of the in-memory store's data, with the store API on top.
+    Once published by MemoryAuditStore it is never modified again; writers
+    change a copy instead. The copy shares every container with its parent
+    and write methods take their own copy of a container (see _own and
+    _own_list) the first time they change it. Containers that grow with the
+    data are the persistent ones from persistent.py, whose copies share all
+    but the parts written afterwards, so a transaction costs about the size
+    of what it changes rather than of the whole store.
+    """
+
+    def __init__(self):
+        # Containers (attribute names, or (name, key) for nested lists) this
+        # state no longer shares with the one it was copied from
+        self._owned = set()
+        # Id of this snapshot, one higher for every published write
+        self.generation = 0
+        # Supplier totals, keyed by supplier_id
+        self.suppliers = LayeredDict()
+        # Full audit record per trip_id
+        self.trips = LayeredDict()
+        # Revision token per trip_id, replaced on every write to the record
+        self._revisions = LayeredDict()
+        self._revision_counter = itertools.count(1)
+        # Bumped whenever any trip's index entry is written or removed, so
+        # fleet-wide caches know when to rebuild. Never reset, not even by clear.
+        self._trips_generation = 0
+        # Per-trip bookkeeping for incremental runs: the source fingerprint and
+        # the exact amounts each trip contributed to its supplier's totals.
+        self.trip_index = LayeredDict()
+        # Where each trip lives in the source file, so one trip can be re-read
+        # alone (offset and length are None for trips pushed over HTTP)
+        self.trip_locations = LayeredDict()
+        # 4️⃣ Immutable Tamper Log (Write-Only), with a keyed index from
+        # (audit_id, field) to the log position so deduplicating a violation is O(1)
+        self.tamper_log = ChunkedList()
+        self._tamper_keys = LayeredDict()
+        # Running fleet-wide totals for the dashboard
+        self.fleet_totals = _empty_fleet_totals()
+        # One sorted list of (value, supplier_id) per ranking metric, plus the
+        # key each supplier currently has in them so it can be moved on update.
+        self._rankings = {metric: SortedChunkedList() for metric in SUPPLIER_RANKING_METRICS}
+        self._ranking_keys = LayeredDict()
+        self._reset_trip_listing()
+        self._reset_merkle_tree()
+
+    def _reset_trip_listing(self):
+        # Every trip gets a stable sequence number, which is its cursor position
+        # in the trip listing; numbers of deleted trips are never reused.
+        # _trip_seqs is the ascending list of live ones. Each secondary index
+        # maps a (field, value) key to an ascending list of sequence numbers,
+        # and _listing_values holds the sorted distinct values of each range
+        # field (see _LISTING_RANGE_FIELDS). Deleting or re-filing a trip
+        # removes its entries, and keys left without trips.
+        self._next_seq = 0
+        self._trip_seq = LayeredDict()
+        self._seq_trips = LayeredDict()
+        self._trip_seqs = SortedChunkedList()
+        self._trip_listing_index = LayeredDict()
+        self._listing_values = {field: SortedChunkedList() for field in _LISTING_RANGE_FIELDS}
+
+    def _reset_merkle_tree(self):
+        # Global Merkle tree over trip data hashes. Each trip owns one leaf
+        # position; _merkle_levels[k][i] is node i of level k (0 = leaves).
+        self._merkle_positions = LayeredDict()
+        self._merkle_trips = ChunkedList()
+        self._merkle_levels = [ChunkedList()]
+
+    def copy(self) -> "_MemoryState":
+        """
+        Copy for a writer to modify, in O(1): every container is shared until
+        a write method takes its own copy. Objects that are replaced rather
+        than modified in place (audit records, index entries, supplier
+        totals) are never copied at all.
+        """
+        clone = _MemoryState.__new__(_MemoryState)
+        clone.__dict__.update(self.__dict__)
+        clone._owned = set()
+        return clone
+
+    def _own(self, name: str):
+        """The named container, copied first if it is still shared with the parent state."""
+        if name not in self._owned:
+            setattr(self, name, copy.copy(getattr(self, name)))
+            self._owned.add(name)
+        return getattr(self, name)
+
+    def _own_list(self, name: str, key):
+        """A list inside the named container (a new sorted one if missing), copied first if still shared."""
+        container = self._own(name)
+        if (name, key) not in self._owned:
+            current = container[key] if isinstance(container, list) else container.get(key)
+            container[key] = SortedChunkedList() if current is None else copy.copy(current)
+            self._owned.add((name, key))
+        return container[key]
+
+    def clear(self, include_tamper_log: bool = False):
+        self.suppliers = LayeredDict()
+        self.trips = LayeredDict()
+        self._revisions = LayeredDict()
+        self.trip_index = LayeredDict()
+        self.trip_locations = LayeredDict()
+        self._trips_generation += 1
+        self.fleet_totals = _empty_fleet_totals()
+        self._rankings = {metric: SortedChunkedList() for metric in SUPPLIER_RANKING_METRICS}
+        self._ranking_keys = LayeredDict()
+        self._reset_trip_listing()
+        self._reset_merkle_tree()
+        if include_tamper_log:
+            self.tamper_log = ChunkedList()
+            self._tamper_keys = LayeredDict()
+
+    # --- Suppliers ---
+    def upsert_supplier(self, supplier_id: str, name: str):
+        """Adds a supplier, keeping its totals if it is already known."""
+        suppliers = self._own("suppliers")
+        if supplier_id in suppliers:
+            suppliers[supplier_id] = {**suppliers[supplier_id], "name": name}
+        else:
+            suppliers[supplier_id] = {
+                "name": name,
+                "total_emissions_kg_co2e": 0,
+                "total_distance_km": 0
+            }
+            self._reindex_supplier(supplier_id)
+
+    def add_supplier_totals(self, supplier_id: str, distance_km: float, emissions_kg_co2e: float):
+        supplier = self.suppliers.get(supplier_id)
+        if supplier is not None:
+            self._own("suppliers")[supplier_id] = {
+                **supplier,
+                "total_distance_km": supplier["total_distance_km"] + distance_km,
+                "total_emissions_kg_co2e": supplier["total_emissions_kg_co2e"] + emissions_kg_co2e
+            }
+            self._reindex_supplier(supplier_id)
+
+    def _unindex_supplier(self, supplier_id: str):
+        if supplier_id not in self._ranking_keys:
+            return
+        keys = self._own("_ranking_keys").pop(supplier_id)
+        for metric, key in keys.items():
+            self._own_list("_rankings", metric).discard(key)
+
+    def _reindex_supplier(self, supplier_id: str):
+        self._unindex_supplier(supplier_id)
+        keys = {
+            metric: (value, supplier_id)
+            for metric, value in _ranking_values(self.suppliers[supplier_id]).items()
+        }
+        for metric, key in keys.items():
+            self._own_list("_rankings", metric).add(key)
+        self._own("_ranking_keys")[supplier_id] = keys
+
+    def rank_suppliers(self, metric: str = "emissions", descending: bool = False, offset: int = 0, limit: int = None) -> list:
+        """
+        Returns one page of (supplier_id, supplier) ordered by metric, straight
+        from the maintained index, so the cost is O(limit) rather than a sort.
+        """
+        ranking = self._rankings[metric]
+        size = len(ranking)
+        if limit is None:
+            limit = size
+        if descending:
+            page = ranking[max(size - offset - limit, 0):max(size - offset, 0)][::-1]
+        else:
+            page = ranking[offset:offset + limit]
+        return [(supplier_id, self.suppliers[supplier_id]) for _, supplier_id in page]
+
+    def top_emitting_supplier(self):
+        """Returns (supplier_id, supplier) with the highest emissions, or None."""
+        top = self.rank_suppliers("emissions", descending=True, limit=1)
+        return top[0] if top else None
+
+    def add_fleet_totals(self, distance_km: float, emissions_kg_co2e: float, confidence: float, trip_count: int):
+        totals = self._own("fleet_totals")
+        totals["total_distance_km"] += distance_km
+        totals["total_emissions_kg_co2e"] += emissions_kg_co2e
+        totals["confidence_sum"] += confidence
+        totals["trip_count"] += trip_count
+
+    def get_fleet_totals(self) -> dict:
+        return dict(self.fleet_totals)
+
+    def delete_supplier(self, supplier_id: str):
+        self._unindex_supplier(supplier_id)
+        if supplier_id in self.suppliers:
+            del self._own("suppliers")[supplier_id]
+
+    def iter_suppliers(self):
+        """Yields (supplier_id, {"name", "total_emissions_kg_co2e", "total_distance_km"})."""
+        return iter(list(self.suppliers.items()))
+
+    def supplier_count(self) -> int:
+        return len(self.suppliers)
+
+    # --- Audit records ---
+    def get_trip(self, trip_id: str):
+        return self.trips.get(trip_id)
+
+    def get_trip_revision(self, trip_id: str):
+        """Opaque token that changes whenever the trip's record is written, or None if unknown."""
+        return self._revisions.get(trip_id)
+
+    def get_trip_index(self, trip_id: str):
+        return self.trip_index.get(trip_id)
+
+    def iter_trip_index(self):
+        """Yields (trip_id, index_entry) for every stored trip."""
+        return iter(list(self.trip_index.items()))
+
+    def trips_generation(self) -> int:
+        """Token that changes whenever any trip is stored or removed."""
+        return self._trips_generation
+
+    def put_trip(self, trip_id: str, audit_record: dict, index_entry: dict):
+        previous = self.trip_index.get(trip_id)
+        self._own("trips")[trip_id] = audit_record
+        self._own("trip_index")[trip_id] = index_entry
+        self._own("_revisions")[trip_id] = next(self._revision_counter)
+        self._trips_generation += 1
+
+        seq = self._trip_seq.get(trip_id)
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._own("_seq_trips")[seq] = trip_id
+            self._own("_trip_seq")[trip_id] = seq
+            self._own("_trip_seqs").add(seq)
+        self._refile_trip(seq, previous, index_entry)
+
+    def _refile_trip(self, seq: int, previous, index_entry):
+        """Moves a trip's listing index entries from the previous index entry's values to the new one's."""
+        previous_keys = set(_listing_keys(previous)) if previous else set()
+        keys = set(_listing_keys(index_entry)) if index_entry else set()
+        for key in previous_keys - keys:
+            seqs = self._own_list("_trip_listing_index", key)
+            seqs.discard(seq)
+            if not seqs:
+                del self._trip_listing_index[key]
+                self._owned.discard(("_trip_listing_index", key))
+                if key[0] in self._listing_values:
+                    self._own_list("_listing_values", key[0]).discard(key[1])
+        for key in keys - previous_keys:
+            seqs = self._own_list("_trip_listing_index", key)
+            if not seqs and key[0] in self._listing_values:
+                self._own_list("_listing_values", key[0]).add(key[1])
+            seqs.add(seq)
+
+    def delete_trip(self, trip_id: str):
+        self._trips_generation += 1
+        if trip_id not in self.trip_index and trip_id not in self.trips:
+            return
+        self._own("trips").pop(trip_id, None)
+        self._own("_revisions").pop(trip_id, None)
+        previous = self._own("trip_index").pop(trip_id, None)
+        seq = self._own("_trip_seq").pop(trip_id, None)
+        if seq is not None:
+            del self._own("_seq_trips")[seq]
+            self._own("_trip_seqs").discard(seq)
+            self._refile_trip(seq, previous, None)
+
+    def list_trips(self, after: int = -1, limit: int = 100, **filters) -> list:
+        """
+        Returns up to `limit` (cursor, trip_id) pairs past the `after` cursor
+        that match the filters (see _matches_trip_filters). The scan walks
+        the fewest candidates from the cursor on: the smallest exact-match
+        index, or the index lists of every value in a date or confidence
+        range merged in cursor order; never the whole range at once.
+        """
+        index = self._trip_listing_index
+        exact = [
+            index.get((field, filters[field]))
+            for field in ("supplier_id", "vehicle_type", "flag") if filters.get(field) is not None
+        ]
+        if any(seqs is None for seqs in exact):
+            return []
+        driver = min(exact, key=len, default=self._trip_seqs)
+        driver_size = len(driver)
+        candidates = None
+
+        ranges = []
+        if filters.get("date_from") is not None or filters.get("date_to") is not None:
+            ranges.append(("trip_date", filters.get("date_from"), filters.get("date_to"), True))
+        if filters.get("confidence_below") is not None:
+            ranges.append(("confidence_score", None, filters["confidence_below"], False))
+        for field, low, high, high_inclusive in ranges:
+            values = self._listing_values[field]
+            values = iter(values) if low is None else values.iter_from(low)
+            if high is not None:
+                values = itertools.takewhile(
+                    (lambda value: value <= high) if high_inclusive else (lambda value: value < high), values
+                )
+            runs = [index[(field, value)] for value in itertools.islice(values, LISTING_RANGE_MAX_VALUES + 1)]
+            size = sum(map(len, runs))
+            if len(runs) <= LISTING_RANGE_MAX_VALUES and size < driver_size:
+                driver_size = size
+                # Each value's list is in cursor order, so merging them keeps it
+                candidates = heapq.merge(*(seqs.iter_from(after, inclusive=False) for seqs in runs))
+        if candidates is None:
+            candidates = driver.iter_from(after, inclusive=False)
+
+        page = []
+        for seq in candidates:
+            trip_id = self._seq_trips[seq]
+            if not _matches_trip_filters(self.trip_index[trip_id], filters):
+                continue
+            page.append((seq, trip_id))
+            if len(page) == limit:
+                break
+        return page
+
+    def update_trip_field(self, trip_id: str, field: str, value):
+        # A new dict, as the record may be shared with published snapshots
+        self._own("trips")[trip_id] = {**self.trips[trip_id], field: value}
+        self._own("_revisions")[trip_id] = next(self._revision_counter)
+
+    def iter_trip_ids(self):
+        return iter(list(self.trips))
+
+    def iter_trips(self):
+        """Yields (trip_id, audit_record)."""
+        return iter(list(self.trips.items()))
+
+    def trip_count(self) -> int:
+        return len(self.trips)
+
+    # --- Source locations ---
+    def get_trip_location(self, trip_id: str):
+        return self.trip_locations.get(trip_id)
+
+    def replace_trip_locations(self, locations: dict):
+        self.trip_locations = LayeredDict(locations)
+        self._owned.add("trip_locations")
+
+    def set_trip_location(self, trip_id: str, location: dict):
+        self._own("trip_locations")[trip_id] = location
+
+    # --- Merkle tree ---
+    def merkle_leaf_count(self) -> int:
+        return len(self._merkle_trips)
+
+    def get_merkle_position(self, trip_id: str):
+        return self._merkle_positions.get(trip_id)
+
+    def set_merkle_leaf(self, trip_id: str, leaf_hash: str) -> int:
+        """Sets a trip's leaf, appending a new position for unknown trips. Returns the position."""
+        position = self._merkle_positions.get(trip_id)
+        leaves = self._own_list("_merkle_levels", 0)
+        if position is None:
+            position = len(self._merkle_trips)
+            self._own("_merkle_positions")[trip_id] = position
+            self._own("_merkle_trips").append(trip_id)
+            leaves.append(leaf_hash)
+        else:
+            leaves[position] = leaf_hash
+        return position
+
+    def remove_merkle_leaf(self, trip_id: str):
+        """
+        Removes a trip's leaf by moving the last leaf into its position, so
+        positions stay dense. Returns the vacated position (None if unknown).
+        """
+        if trip_id not in self._merkle_positions:
+            return None
+        positions = self._own("_merkle_positions")
+        trips = self._own("_merkle_trips")
+        leaves = self._own_list("_merkle_levels", 0)
+        position = positions.pop(trip_id)
+        last_trip = trips.pop()
+        last_hash = leaves.pop()
+        if position < len(trips):
+            trips[position] = last_trip
+            leaves[position] = last_hash
+            positions[last_trip] = position
+        return position
+
+    def get_merkle_node(self, level: int, index: int) -> str:
+        return self._merkle_levels[level][index]
+
+    def put_merkle_nodes(self, level: int, nodes: dict):
+        """Stores internal nodes {index: hash} of one level (level >= 1)."""
+        if len(self._merkle_levels) <= level:
+            levels = self._own("_merkle_levels")
+            while len(levels) <= level:
+                levels.append(ChunkedList())
+        row = self._own_list("_merkle_levels", level)
+        for index in sorted(nodes):
+            if index >= len(row):
+                row.extend([None] * (index + 1 - len(row)))
+            row[index] = nodes[index]
+
+    def prune_merkle_nodes(self, level_sizes: list):
+        """Drops nodes outside a tree with the given level sizes, after leaves were removed."""
+        if len(self._merkle_levels) > len(level_sizes):
+            del self._own("_merkle_levels")[len(level_sizes):]
+        for level, size in enumerate(level_sizes):
+            if len(self._merkle_levels[level]) > size:
+                self._own_list("_merkle_levels", level).truncate(size)
+
+    # --- Tamper log ---
+    def record_tamper_event(self, event: dict) -> bool:
+        """Appends a violation unless one for the same (audit_id, field) is already logged."""
+        key = (event["audit_id"], event["field"])
+        if key in self._tamper_keys:
+            return False
+        self._own("_tamper_keys")[key] = len(self.tamper_log)
+        self._own("tamper_log").append(event)
+        return True
+
+    def has_tamper_event(self, audit_id: str, field: str) -> bool:
+        return (audit_id, field) in self._tamper_keys
+
+    def tamper_events(self, offset: int = 0, limit: int = None) -> list:
+        """Returns one page of the tamper log, oldest first."""
+        end = None if limit is None else offset + limit
+        return self.tamper_log[offset:end]
+
+    def tamper_event_count(self) -> int:
+        return len(self.tamper_log)
+
+
+class MemoryAuditStore:
+    """
+    Process-local storage (the original hackathon behaviour).
+    Fast, but state is lost on restart and every uvicorn worker has its own copy.
+
+    Readers never lock: all data lives in one _MemoryState that is never
+    modified once published. Writers are serialized and work on a private
+    copy (one per transaction, or per call outside one), which is published
+    with a single reference swap, so readers see a whole run or none of it.
+    The copy shares everything a transaction does not change, down to the
+    untouched keys and chunks of the large containers, so a single-trip
+    write costs O(what it changes) (plus O(sqrt n) amortized), not
+    O(stored data).
+    """
+
+    def __init__(self):
+        self._state = _MemoryState()
+        self._write_lock = threading.Lock()
+        # Per thread: "working" is the copy of an open transaction, "pinned"
+        # the state an open snapshot() reads from
+        self._local = threading.local()
+
+    def _view(self) -> _MemoryState:
+        """The state this thread reads: its transaction's copy, its pinned snapshot, or the latest."""
+        working = getattr(self._local, "working", None)
+        if working is not None:
+            return working
+        pinned = getattr(self._local, "pinned", None)
+        return pinned if pinned is not None else self._state
+
+    def __getattr__(self, name):
+        # Every other store method runs against _view(); writes outside a
+        # transaction get one of their own
+        if name.startswith("_"):
+            raise AttributeError(name)
+        working = getattr(self._local, "working", None)
+        if working is not None:
+            return getattr(working, name)
+        if name in _MEMORY_WRITE_METHODS:
+            def write(*args, **kwargs):
+                with self.transaction():
+                    return getattr(self._local.working, name)(*args, **kwargs)
+            return write
+        return getattr(self._view(), name)
+
+    @contextmanager
+    def transaction(self, wait: bool = True):
+        """
+        Collects every write made on this thread into one new snapshot; nests
+        freely. With wait=False, raises StoreBusyError rather than queue
+        behind another thread's transaction.
+        """
+        if getattr(self._local, "working", None) is not None:
+            yield
+            return
+        if not self._write_lock.acquire(blocking=wait):
+            raise StoreBusyError("another transaction is writing")
+        try:
+            working = self._state.copy()
+            working.generation += 1
+            self._local.working = working
+            try:
+                yield
+            finally:
+                self._local.working = None
+            self._state = working
+        finally:
+            self._write_lock.release()
+
+    @contextmanager
+    def snapshot(self):
+        """Pins this thread's reads to the current snapshot for the block; yields its generation."""
+        if getattr(self._local, "working", None) is not None or getattr(self._local, "pinned", None) is not None:
+            yield self._view().generation
+            return
+        self._local.pinned = self._state
+        try:
+            yield self._local.pinned.generation
+        finally:
+            self._local.pinned = None
+
+    def generation(self) -> int:
+        """Id of the snapshot this thread reads; changes with every committed write."""
+        return self._view().generation
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppliers (
+    supplier_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    total_emissions_kg_co2e REAL NOT NULL DEFAULT 0,
+    total_distance_km REAL NOT NULL DEFAULT 0,
+    emissions_intensity REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS audit_records (
+    trip_id TEXT PRIMARY KEY,
+    audit_id TEXT NOT NULL,
+    supplier_id TEXT NOT NULL,
+    record TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    distance_km REAL NOT NULL,
+    emissions_kg_co2e REAL NOT NULL,
+    confidence_score REAL NOT NULL,
+    vehicle_type TEXT NOT NULL,
+    trip_date TEXT,
+    region TEXT,
+    factor_set_version TEXT NOT NULL,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_suppliers_emissions ON suppliers (total_emissions_kg_co2e, supplier_id);
+CREATE INDEX IF NOT EXISTS idx_suppliers_distance ON suppliers (total_distance_km, supplier_id);
+CREATE INDEX IF NOT EXISTS idx_suppliers_intensity ON suppliers (emissions_intensity, supplier_id);
+CREATE INDEX IF NOT EXISTS idx_audit_records_supplier_id ON audit_records (supplier_id);
+CREATE INDEX IF NOT EXISTS idx_audit_records_audit_id ON audit_records (audit_id);
+CREATE INDEX IF NOT EXISTS idx_audit_records_vehicle_type ON audit_records (vehicle_type);
+CREATE INDEX IF NOT EXISTS idx_audit_records_trip_date ON audit_records (trip_date);
+CREATE INDEX IF NOT EXISTS idx_audit_records_confidence ON audit_records (confidence_score);
+CREATE TABLE IF NOT EXISTS trip_flags (
+    trip_id TEXT NOT NULL,
+    flag TEXT NOT NULL,
+    PRIMARY KEY (flag, trip_id)
+);
+CREATE INDEX IF NOT EXISTS idx_trip_flags_trip_id ON trip_flags (trip_id);
+CREATE TABLE IF NOT EXISTS trip_locations (
+    trip_id TEXT PRIMARY KEY,
+    supplier_id TEXT NOT NULL,
+    vehicle_id TEXT NOT NULL,
+    vehicle_type TEXT NOT NULL,
+    byte_offset INTEGER,
+    byte_length INTEGER
+);
+CREATE TABLE IF NOT EXISTS tamper_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    audit_id TEXT NOT NULL,
+    trip_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tamper_log_audit_id_field ON tamper_log (audit_id, field);
+CREATE INDEX IF NOT EXISTS idx_tamper_log_trip_id ON tamper_log (trip_id);
+CREATE TABLE IF NOT EXISTS fleet_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_emissions_kg_co2e REAL NOT NULL DEFAULT 0,
+    total_distance_km REAL NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    trip_count INTEGER NOT NULL DEFAULT 0,
+    trips_generation INTEGER NOT NULL DEFAULT 0,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO fleet_totals (id) VALUES (1);
+CREATE TABLE IF NOT EXISTS merkle_leaves (
+    position INTEGER PRIMARY KEY,
+    trip_id TEXT NOT NULL UNIQUE,
+    leaf_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS merkle_nodes (
+    level INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (level, idx)
+) WITHOUT ROWID;
+"""
+
+_SQLITE_RANKING_COLUMNS = {
+    "emissions": "total_emissions_kg_co2e",
+    "distance": "total_distance_km",
+    "intensity": "emissions_intensity"
+}
+
+# Tables holding data derived from the source file (safe to rebuild)
+_SQLITE_DERIVED_TABLES = (
+    "suppliers", "audit_records", "trip_flags", "trip_locations", "fleet_totals", "merkle_leaves", "merkle_nodes"
+)
+
+
+# audit_records columns making up a trip's index entry (minus flags), named like its keys
+_SQLITE_INDEX_COLUMNS = (
+    "fingerprint", "supplier_id", "vehicle_type", "trip_date", "region", "factor_set_version",
+    "distance_km", "emissions_kg_co2e", "confidence_score"
+)
+
+
+def _dump_record(audit_record: dict) -> str:
+    return json.dumps(audit_record, default=encode_json_value)
+
+
+def _load_record(data: str) -> dict:
+    return json.loads(data, object_hook=decode_json_object)
+
+
+def _new_revision() -> int:
+    # Random rather than sequential so writers in separate worker processes
+    # never hand out the same token without having to coordinate.
+    return random.getrandbits(62)
+
+
+class SQLiteAuditStore:
+    """
+    Durable storage shared by every worker process pointing at the same file.
+    WAL mode lets readers keep serving the last committed run while a new
+    run writes, and a processing run is committed as a single transaction.
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._local = threading.local()
+        conn = self._connection()
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SQLITE_SCHEMA_VERSION:
+            for table in _SQLITE_DERIVED_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+        conn.executescript(_SQLITE_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads, and FastAPI
+        # runs sync handlers in a threadpool, so keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._db_path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self, wait: bool = True):
+        """
+        Groups every write made on this thread into one commit; nests freely.
+        With wait=False, raises StoreBusyError rather than wait out the busy
+        timeout while another connection writes.
+        """
+        conn = self._connection()
+        if self._local.depth == 0:
+            if wait:
+                conn.execute("BEGIN IMMEDIATE")
+            else:
+                self._begin_immediate_or_raise(conn)
+            conn.execute("UPDATE fleet_totals SET generation = generation + 1")
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _begin_immediate_or_raise(conn: sqlite3.Connection):
+        conn.execute("PRAGMA busy_timeout=0")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            raise StoreBusyError(str(exc)) from exc
+        finally:
+            conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Runs this thread's reads for the block in one read transaction, so they
+        all see the same commit while writers carry on (WAL); yields its
+        generation. Do not write inside one: a read transaction cannot be
+        upgraded once another writer has committed.
+        """
+        conn = self._connection()
+        if conn.in_transaction:
+            yield self.generation()
+            return
+        conn.execute("BEGIN")
+        try:
+            yield self.generation()
+        finally:
+            conn.execute("COMMIT")
+
+    def generation(self) -> int:
+        """Id of the committed state this thread reads; advances with every write transaction."""
+        return self._connection().execute("SELECT generation FROM fleet_totals").fetchone()[0]
+
+    def clear(self, include_tamper_log: bool = False):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM suppliers")
+            conn.execute("DELETE FROM audit_records")
+            conn.execute("DELETE FROM trip_flags")
+            conn.execute("DELETE FROM trip_locations")
+            conn.execute(
+                "UPDATE fleet_totals SET total_emissions_kg_co2e = 0, total_distance_km = 0, "
+                "confidence_sum = 0, trip_count = 0, trips_generation = ?",
+                (_new_revision(),)
+            )
+            conn.execute("DELETE FROM merkle_leaves")
+            conn.execute("DELETE FROM merkle_nodes")
+            if include_tamper_log:
+                conn.execute("DELETE FROM tamper_log")
+
+    # --- Suppliers ---
+    def upsert_supplier(self, supplier_id: str, name: str):
+        self._connection().execute(
+            "INSERT INTO suppliers (supplier_id, name) VALUES (?, ?) "
+            "ON CONFLICT (supplier_id) DO UPDATE SET name = excluded.name",
+            (supplier_id, name)
+        )
+
+    def add_supplier_totals(self, supplier_id: str, distance_km: float, emissions_kg_co2e: float):
+        self._connection().execute(
+            "UPDATE suppliers SET total_distance_km = total_distance_km + :distance, "
+            "total_emissions_kg_co2e = total_emissions_kg_co2e + :emissions, "
+            "emissions_intensity = CASE WHEN total_distance_km + :distance > 0 "
+            "THEN (total_emissions_kg_co2e + :emissions) / (total_distance_km + :distance) ELSE 0 END "
+            "WHERE supplier_id = :supplier_id",
+            {"distance": distance_km, "emissions": emissions_kg_co2e, "supplier_id": supplier_id}
+        )
+
+    def delete_supplier(self, supplier_id: str):
+        self._connection().execute("DELETE FROM suppliers WHERE supplier_id = ?", (supplier_id,))
+
+    def rank_suppliers(self, metric: str = "emissions", descending: bool = False, offset: int = 0, limit: int = None) -> list:
+        column = _SQLITE_RANKING_COLUMNS[metric]
+        direction = "DESC" if descending else "ASC"
+        rows = self._connection().execute(
+            "SELECT supplier_id, name, total_emissions_kg_co2e, total_distance_km FROM suppliers "
+            f"ORDER BY {column} {direction}, supplier_id {direction} LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        ).fetchall()
+        return [
+            (supplier_id, {"name": name, "total_emissions_kg_co2e": emissions, "total_distance_km": distance})
+            for supplier_id, name, emissions, distance in rows
+        ]
+
+    def top_emitting_supplier(self):
+        top = self.rank_suppliers("emissions", descending=True, limit=1)
+        return top[0] if top else None
+
+    def add_fleet_totals(self, distance_km: float, emissions_kg_co2e: float, confidence: float, trip_count: int):
+        self._connection().execute(
+            "UPDATE fleet_totals SET total_distance_km = total_distance_km + ?, "
+            "total_emissions_kg_co2e = total_emissions_kg_co2e + ?, "
+            "confidence_sum = confidence_sum + ?, trip_count = trip_count + ?",
+            (distance_km, emissions_kg_co2e, confidence, trip_count)
+        )
+
+    def get_fleet_totals(self) -> dict:
+        row = self._connection().execute(
+            "SELECT total_emissions_kg_co2e, total_distance_km, confidence_sum, trip_count FROM fleet_totals"
+        ).fetchone()
+        return dict(zip(("total_emissions_kg_co2e", "total_distance_km", "confidence_sum", "trip_count"), row))
+
+    def iter_suppliers(self):
+        rows = self._connection().execute(
+            "SELECT supplier_id, name, total_emissions_kg_co2e, total_distance_km FROM suppliers"
+        ).fetchall()
+        for supplier_id, name, emissions, distance in rows:
+            yield supplier_id, {
+                "name": name,
+                "total_emissions_kg_co2e": emissions,
+                "total_distance_km": distance
+            }
+
+    def supplier_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM suppliers").fetchone()[0]
+
+    # --- Audit records ---
+    def get_trip(self, trip_id: str):
+        row = self._connection().execute(
+            "SELECT record FROM audit_records WHERE trip_id = ?", (trip_id,)
+        ).fetchone()
+        return _load_record(row[0]) if row else None
+
+    def get_trip_revision(self, trip_id: str):
+        row = self._connection().execute(
+            "SELECT revision FROM audit_records WHERE trip_id = ?", (trip_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_trip_index(self, trip_id: str):
+        """The trip's index entry, without "flags" (those are only kept for listing)."""
+        row = self._connection().execute(
+            f"SELECT {', '.join(_SQLITE_INDEX_COLUMNS)} FROM audit_records WHERE trip_id = ?",
+            (trip_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(_SQLITE_INDEX_COLUMNS, row))
+
+    def iter_trip_index(self):
+        last_rowid = 0
+        while True:
+            rows = self._connection().execute(
+                f"SELECT rowid, trip_id, {', '.join(_SQLITE_INDEX_COLUMNS)} FROM audit_records "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, SQLITE_SCAN_PAGE_SIZE)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                last_rowid = row[0]
+                yield row[1], dict(zip(_SQLITE_INDEX_COLUMNS, row[2:]))
+
+    def trips_generation(self) -> int:
+        return self._connection().execute("SELECT trips_generation FROM fleet_totals").fetchone()[0]
+
+    def _bump_trips_generation(self):
+        self._connection().execute("UPDATE fleet_totals SET trips_generation = ?", (_new_revision(),))
+
+    def put_trip(self, trip_id: str, audit_record: dict, index_entry: dict):
+        self._connection().execute(
+            "INSERT INTO audit_records "
+            "(trip_id, audit_id, supplier_id, record, fingerprint, distance_km, emissions_kg_co2e, "
+            "confidence_score, vehicle_type, trip_date, region, factor_set_version, revision) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (trip_id) DO UPDATE SET audit_id = excluded.audit_id, "
+            "supplier_id = excluded.supplier_id, record = excluded.record, fingerprint = excluded.fingerprint, "
+            "distance_km = excluded.distance_km, emissions_kg_co2e = excluded.emissions_kg_co2e, "
+            "confidence_score = excluded.confidence_score, vehicle_type = excluded.vehicle_type, "
+            "trip_date = excluded.trip_date, region = excluded.region, "
+            "factor_set_version = excluded.factor_set_version, revision = excluded.revision",
+            (
+                trip_id,
+                audit_record["audit_id"],
+                audit_record["supplier_id"],
+                _dump_record(audit_record),
+                index_entry["fingerprint"],
+                index_entry["distance_km"],
+                index_entry["emissions_kg_co2e"],
+                index_entry["confidence_score"],
+                index_entry["vehicle_type"],
+                index_entry["trip_date"],
+                index_entry["region"],
+                index_entry["factor_set_version"],
+                _new_revision()
+            )
+        )
+        self._connection().execute("DELETE FROM trip_flags WHERE trip_id = ?", (trip_id,))
+        self._connection().executemany(
+            "INSERT OR IGNORE INTO trip_flags (trip_id, flag) VALUES (?, ?)",
+            ((trip_id, flag) for flag in index_entry["flags"])
+        )
+        self._bump_trips_generation()
+
+    def delete_trip(self, trip_id: str):
+        self._connection().execute("DELETE FROM audit_records WHERE trip_id = ?", (trip_id,))
+        self._connection().execute("DELETE FROM trip_flags WHERE trip_id = ?", (trip_id,))
+        self._bump_trips_generation()
+
+    def list_trips(self, after: int = -1, limit: int = 100, **filters) -> list:
+        # The rowid is stable across in-place updates, so it serves as the cursor
+        clauses = ["rowid > ?"]
+        params = [after]
+        for field, clause in (
+            ("supplier_id", "supplier_id = ?"),
+            ("vehicle_type", "vehicle_type = ?"),
+            ("date_from", "trip_date >= ?"),
+            ("date_to", "trip_date <= ?"),
+            ("confidence_below", "confidence_score < ?"),
+            ("flag", "trip_id IN (SELECT trip_id FROM trip_flags WHERE flag = ?)")
+        ):
+            if filters.get(field) is not None:
+                clauses.append(clause)
+                params.append(filters[field])
+        params.append(limit)
+        rows = self._connection().execute(
+            f"SELECT rowid, trip_id FROM audit_records WHERE {' AND '.join(clauses)} ORDER BY rowid LIMIT ?",
+            params
+        ).fetchall()
+        return [(seq, trip_id) for seq, trip_id in rows]
+
+    def update_trip_field(self, trip_id: str, field: str, value):
+        with self.transaction() as conn:
+            record = self.get_trip(trip_id)
+            record[field] = value
+            conn.execute(
+                "UPDATE audit_records SET record = ?, revision = ? WHERE trip_id = ?",
+                (_dump_record(record), _new_revision(), trip_id)
+            )
+
+    def iter_trip_ids(self):
+        rows = self._connection().execute("SELECT trip_id FROM audit_records ORDER BY rowid").fetchall()
+        return (row[0] for row in rows)
+
+    def iter_trips(self):
+        # Read in rowid pages rather than through one open cursor, so the
+        # consumer can write between pages without holding a stale snapshot
+        last_rowid = 0
+        while True:
+            rows = self._connection().execute(
+                "SELECT rowid, trip_id, record FROM audit_records WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, SQLITE_SCAN_PAGE_SIZE)
+            ).fetchall()
+            if not rows:
+                return
+            for last_rowid, trip_id, record in rows:
+                yield trip_id, _load_record(record)
+
+    def trip_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM audit_records").fetchone()[0]
+
+    # --- Source locations ---
+    def get_trip_location(self, trip_id: str):
+        row = self._connection().execute(
+            "SELECT supplier_id, vehicle_id, vehicle_type, byte_offset, byte_length FROM trip_locations WHERE trip_id = ?",
+            (trip_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("supplier_id", "vehicle_id", "vehicle_type", "offset", "length"), row))
+
+    def replace_trip_locations(self, locations: dict):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM trip_locations")
+            conn.executemany(
+                "INSERT INTO trip_locations (trip_id, supplier_id, vehicle_id, vehicle_type, byte_offset, byte_length) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (trip_id, loc["supplier_id"], loc["vehicle_id"], loc["vehicle_type"], loc["offset"], loc["length"])
+                    for trip_id, loc in locations.items()
+                )
+            )
+
+    def set_trip_location(self, trip_id: str, location: dict):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO trip_locations (trip_id, supplier_id, vehicle_id, vehicle_type, byte_offset, byte_length) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (trip_id, location["supplier_id"], location["vehicle_id"], location["vehicle_type"], location["offset"], location["length"])
+        )
+
+    # --- Merkle tree ---
+    def merkle_leaf_count(self) -> int:
+        # Positions are dense, so the count is the largest rowid + 1 (an O(1) lookup)
+        row = self._connection().execute("SELECT MAX(position) FROM merkle_leaves").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def get_merkle_position(self, trip_id: str):
+        row = self._connection().execute(
+            "SELECT position FROM merkle_leaves WHERE trip_id = ?", (trip_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_merkle_leaf(self, trip_id: str, leaf_hash: str) -> int:
+        with self.transaction() as conn:
+            position = self.get_merkle_position(trip_id)
+            if position is None:
+                position = self.merkle_leaf_count()
+                conn.execute(
+                    "INSERT INTO merkle_leaves (position, trip_id, leaf_hash) VALUES (?, ?, ?)",
+                    (position, trip_id, leaf_hash)
+                )
+            else:
+                conn.execute("UPDATE merkle_leaves SET leaf_hash = ? WHERE position = ?", (leaf_hash, position))
+        return position
+
+    def remove_merkle_leaf(self, trip_id: str):
+        with self.transaction() as conn:
+            position = self.get_merkle_position(trip_id)
+            if position is None:
+                return None
+            last = self.merkle_leaf_count() - 1
+            conn.execute("DELETE FROM merkle_leaves WHERE position = ?", (position,))
+            if position != last:
+                conn.execute("UPDATE merkle_leaves SET position = ? WHERE position = ?", (position, last))
+        return position
+
+    def get_merkle_node(self, level: int, index: int) -> str:
+        if level == 0:
+            row = self._connection().execute(
+                "SELECT leaf_hash FROM merkle_leaves WHERE position = ?", (index,)
+            ).fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT hash FROM merkle_nodes WHERE level = ? AND idx = ?", (level, index)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_merkle_nodes(self, level: int, nodes: dict):
+        self._connection().executemany(
+            "INSERT INTO merkle_nodes (level, idx, hash) VALUES (?, ?, ?) "
+            "ON CONFLICT (level, idx) DO UPDATE SET hash = excluded.hash",
+            ((level, index, node_hash) for index, node_hash in nodes.items())
+        )
+
+    def prune_merkle_nodes(self, level_sizes: list):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM merkle_nodes WHERE level >= ?", (len(level_sizes),))
+            conn.executemany(
+                "DELETE FROM merkle_nodes WHERE level = ? AND idx >= ?",
+                ((level, size) for level, size in enumerate(level_sizes) if level > 0)
+            )
+
+    # --- Tamper log ---
+    def record_tamper_event(self, event: dict) -> bool:
+        # Check and insert in one statement, against the (audit_id, field) index
+        cursor = self._connection().execute(
+            "INSERT INTO tamper_log (audit_id, trip_id, field, event) "
+            "SELECT :audit_id, :trip_id, :field, :event WHERE NOT EXISTS "
+            "(SELECT 1 FROM tamper_log WHERE audit_id = :audit_id AND field = :field)",
+            {"audit_id": event["audit_id"], "trip_id": event["trip_id"], "field": event["field"], "event": json.dumps(event)}
+        )
+        return cursor.rowcount > 0
+
+    def has_tamper_event(self, audit_id: str, field: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM tamper_log WHERE audit_id = ? AND field = ? LIMIT 1", (audit_id, field)
+        ).fetchone()
+        return row is not None
+
+    def tamper_events(self, offset: int = 0, limit: int = None) -> list:
+        rows = self._connection().execute(
+            "SELECT event FROM tamper_log ORDER BY seq LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def tamper_event_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tamper_log").fetchone()[0]
+
+
+def create_store():
+    """Picks the storage backend from the environment (SQLite if AUDIT_DB_PATH is set)."""
+    db_path = os.environ.get(AUDIT_DB_PATH_ENV)
+    if db_path:
+        return SQLiteAuditStore(db_path)
+    return MemoryAuditStore()
@@ -0,0 +1,169 @@
+import json
+import math
+import zlib
+from datetime import date
+
+from .columnar import to_epoch_us
+
+# Longest single NDJSON line (one trip) accepted in an upload
+NDJSON_MAX_LINE_BYTES = 16 * 1024 * 1024
+
+# Decompressed bytes produced per inflate step, so a small gzip body
+# cannot expand into memory all at once
+_INFLATE_STEP = 1024 * 1024
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class MalformedBodyError(ValueError):
+    """The upload body itself cannot be read (bad gzip, oversized line), as opposed to one bad trip."""
+
+
+def _gunzip(chunks):
+    inflater = zlib.decompressobj(_GZIP_WBITS)
+    for chunk in chunks:
+        pending = chunk
+        while pending:
+            try:
+                out = inflater.decompress(pending, _INFLATE_STEP)
+            except zlib.error as exc:
+                raise MalformedBodyError(f"Invalid gzip body: {exc}")
+            if inflater.eof:
+                # Concatenated gzip members are one stream (as written by gzip -c a b)
+                pending = inflater.unused_data
+                if pending:
+                    inflater = zlib.decompressobj(_GZIP_WBITS)
+            else:
+                pending = inflater.unconsumed_tail
+            if out:
+                yield out
+    if not inflater.eof:
+        raise MalformedBodyError("Truncated gzip body")
+
+
+def decode_body(chunks):
+    """
+    Passes request body chunks through, gunzipping them on the fly when the
+    body starts with the gzip magic bytes, so no Content-Encoding is needed.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= len(_GZIP_MAGIC):
+            break
+    if not head:
+        return
+    if head.startswith(_GZIP_MAGIC):
+        yield from _gunzip(_prepend(head, chunks))
+    else:
+        yield from _prepend(head, chunks)
+
+
+def _prepend(first: bytes, chunks):
+    yield first
+    yield from chunks
+
+
+def iter_ndjson_lines(chunks, max_line_bytes: int = NDJSON_MAX_LINE_BYTES):
+    """
+    Splits a stream of byte chunks into (line_number, line) pairs, skipping
+    blank lines. Only the current partial line is buffered; a line longer
+    than max_line_bytes raises MalformedBodyError.
+    """
+    buf = bytearray()
+    line_number = 0
+    for chunk in chunks:
+        # Only the new bytes can hold the next newline
+        search_from = len(buf)
+        buf += chunk
+        start = 0
+        while True:
+            end = buf.find(b"\n", search_from)
+            if end < 0:
+                break
+            line_number += 1
+            if end - start > max_line_bytes:
+                raise MalformedBodyError(f"Line {line_number} is longer than {max_line_bytes} bytes")
+            line = bytes(buf[start:end]).strip()
+            if line:
+                yield line_number, line
+            start = search_from = end + 1
+        del buf[:start]
+        if len(buf) > max_line_bytes:
+            raise MalformedBodyError(f"Line {line_number + 1} is longer than {max_line_bytes} bytes")
+    line = bytes(buf).strip()
+    if line:
+        yield line_number + 1, line
+
+
+def _require_text(obj: dict, key: str, optional: bool = False):
+    value = obj.get(key)
+    if value is None and optional:
+        return None
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"'{key}' must be a non-empty string")
+    return value
+
+
+def _require_coordinate(ping: dict, key: str, bound: float) -> float:
+    value = ping.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or abs(value) > bound:
+        raise ValueError(f"'{key}' must be a number between -{bound:g} and {bound:g}")
+    return value
+
+
+def parse_pushed_trip(line: bytes) -> dict:
+    """
+    Decodes and validates one uploaded trip, a JSON object with supplier_id,
+    vehicle_id, trip_id and gps_pings (timestamp, latitude, longitude) plus
+    optional supplier_name, vehicle_type, date and region. Returns it as
+    {"supplier_id", "supplier_name", "vehicle_id", "vehicle_type", "trip"},
+    where trip is in the source file's trip shape. Raises ValueError.
+    """
+    try:
+        obj = json.loads(line)
+    except ValueError as exc:
+        raise ValueError(f"Invalid JSON: {exc}")
+    if not isinstance(obj, dict):
+        raise ValueError("Each line must be a JSON object")
+
+    trip_date = _require_text(obj, "date", optional=True)
+    if trip_date is not None:
+        try:
+            date.fromisoformat(trip_date[:10])
+        except ValueError:
+            raise ValueError("'date' must be an ISO date")
+
+    pings = obj.get("gps_pings")
+    if not isinstance(pings, list) or not pings:
+        raise ValueError("'gps_pings' must be a non-empty list")
+    for index, ping in enumerate(pings):
+        if not isinstance(ping, dict):
+            raise ValueError(f"gps_pings[{index}] must be an object")
+        try:
+            to_epoch_us(_require_text(ping, "timestamp"))
+        except (TypeError, ValueError):
+            raise ValueError(f"gps_pings[{index}].timestamp must be an ISO-8601 timestamp")
+        try:
+            _require_coordinate(ping, "latitude", 90)
+            _require_coordinate(ping, "longitude", 180)
+        except ValueError as exc:
+            raise ValueError(f"gps_pings[{index}]: {exc}")
+
+    return {
+        "supplier_id": _require_text(obj, "supplier_id"),
+        "supplier_name": _require_text(obj, "supplier_name", optional=True),
+        "vehicle_id": _require_text(obj, "vehicle_id"),
+        "vehicle_type": _require_text(obj, "vehicle_type", optional=True) or "default",
+        "trip": {
+            "trip_id": _require_text(obj, "trip_id"),
+            "date": trip_date,
+            "region": _require_text(obj, "region", optional=True),
+            "gps_pings": [
+                {"timestamp": p["timestamp"], "latitude": p["latitude"], "longitude": p["longitude"]}
+                for p in pings
+            ]
+        }
+    }
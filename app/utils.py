@@ -4,12 +4,18 @@ import random
 from datetime import datetime
 from math import radians, sin, cos, sqrt, atan2
 
+import numpy as np
+
+from .columnar import trip_columns_digest
+
+EARTH_RADIUS_KM = 6371.0
+
 def calculate_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculates the distance in kilometers between two GPS coordinates
     using the Haversine formula.
     """
-    R = 6371.0  # Radius of Earth in kilometers
+    R = EARTH_RADIUS_KM  # Radius of Earth in kilometers
 
     lat1_rad = radians(lat1)
     lon1_rad = radians(lon1)
@@ -26,54 +32,224 @@ def calculate_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) ->
     distance = R * c
     return distance
 
-# --- 3️⃣ Confidence Scoring & Anomaly Flags ---
-def calculate_confidence_score(gps_pings: list, total_distance: float) -> float:
+def calculate_segment_distances_km(latitudes, longitudes) -> np.ndarray:
     """
-    Calculates a confidence score (0-1) based on data quality.
+    Vectorized Haversine over an ordered track of GPS points.
+    Returns one distance per consecutive pair (len(points) - 1 values),
+    matching calculate_distance_km for each pair.
     """
-    score = 1.0
-    
-    if not gps_pings:
-        return 0.0
-
-    # Penalize for low ping frequency (simplified)
-    # Ideally we'd check time gaps, but here we just check raw count vs distance
-    # Expecting at least 1 ping per 100km effectively? Or 10km?
-    # Let's say we expect 1 ping every hour. 
-    # For now, just a dummy check:
-    if len(gps_pings) < 5:
-        score -= 0.1
-    
-    # Penalize for massive jumps (teleportation) implying missing data
-    # (This would be done during the loop usually, but estimating here)
-    average_segment = total_distance / len(gps_pings) if len(gps_pings) > 0 else 0
-    if average_segment > 500: # gap > 500km
-        score -= 0.3
-        
-    return max(0.0, min(score, 1.0))
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
 
-def detect_anomalies(gps_pings: list, total_distance: float, vehicle_type: str) -> list:
+    if lat.size < 2:
+        return np.empty(0, dtype=np.float64)
+
+    dlat = lat[1:] - lat[:-1]
+    dlon = lon[1:] - lon[:-1]
+
+    a = np.sin(dlat / 2)**2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS_KM * c
+
+def _fleet_segments(trip_offsets):
     """
-    Returns a list of string flags for any data anomalies.
+    For trips concatenated into flat arrays: the mask of consecutive point
+    pairs that are real segments (both points in the same trip) and the
+    segment offsets of each trip.
     """
-    flags = []
-    
-    # Check for excessive idle (simulated)
-    # If we had time deltas, we'd check for 0 movement over long time.
-    # Randomly simulating for demo purposes if not implementing full logic
-    if len(gps_pings) > 2 and total_distance < 1.0:
-        flags.append("excessive_idle_time")
-        
-    # Check for route deviation logic (simplified placeholder)
-    # e.g., if distance is > 1.5x displacement
-    if len(gps_pings) >= 2:
-        start = gps_pings[0]
-        end = gps_pings[-1]
-        displacement = calculate_distance_km(start["latitude"], start["longitude"], end["latitude"], end["longitude"])
-        if total_distance > displacement * 1.5:
+    offsets = np.asarray(trip_offsets, dtype=np.int64)
+    points_per_trip = np.diff(offsets)
+
+    # A pair is a real segment only if both points belong to the same trip
+    point_trip = np.repeat(np.arange(points_per_trip.size), points_per_trip)
+    same_trip = point_trip[:-1] == point_trip[1:]
+
+    segments_per_trip = np.maximum(points_per_trip - 1, 0)
+    segment_offsets = np.concatenate(([0], np.cumsum(segments_per_trip)))
+    return same_trip, segment_offsets
+
+def calculate_fleet_segment_distances_km(latitudes, longitudes, trip_offsets):
+    """
+    Vectorized Haversine over many trips concatenated into flat arrays.
+    trip_offsets has one entry per trip plus a final end marker, so trip k
+    owns points trip_offsets[k]:trip_offsets[k+1].
+
+    Returns (distances, segment_offsets) where trip k's segments are
+    distances[segment_offsets[k]:segment_offsets[k+1]]. Pairs that would
+    span two trips are dropped.
+    """
+    offsets = np.asarray(trip_offsets, dtype=np.int64)
+    same_trip, segment_offsets = _fleet_segments(offsets)
+
+    all_distances = calculate_segment_distances_km(
+        latitudes[offsets[0]:offsets[-1]], longitudes[offsets[0]:offsets[-1]]
+    )
+    return all_distances[same_trip], segment_offsets
+
+def calculate_fleet_segment_seconds(timestamps, trip_offsets) -> np.ndarray:
+    """
+    Segment durations in seconds for trips concatenated like in
+    calculate_fleet_segment_distances_km, from epoch-microsecond timestamps,
+    in the same order as its distances.
+    """
+    offsets = np.asarray(trip_offsets, dtype=np.int64)
+    same_trip, _ = _fleet_segments(offsets)
+    deltas = np.diff(np.asarray(timestamps[offsets[0]:offsets[-1]], dtype=np.int64))
+    return deltas[same_trip] / 1_000_000
+
+# --- 3️⃣ Confidence Scoring & Anomaly Flags ---
+# Part of every trip fingerprint: bump it when scoring changes so stored trips are re-scored
+QUALITY_MODEL_VERSION = 3
+# Time without a ping after which a segment counts as a data gap
+GPS_GAP_SECONDS = 15 * 60
+# Below this implied speed a segment counts as idling
+IDLE_SPEED_KMH = 2.0
+EXCESSIVE_IDLE_SECONDS = 30 * 60
+# Shorter segments are too exposed to GPS jitter to judge speed from
+SPEED_MIN_SEGMENT_KM = 0.2
+# Top plausible speed by vehicle type; faster segments are flagged
+MAX_PLAUSIBLE_SPEED_KMH = {"Cargo Plane": 1000.0, "Cargo Ship": 70.0, "default": 150.0}
+# Faster than any freight moves: the position jumped rather than travelled
+TELEPORT_SPEED_KMH = 1200.0
+TELEPORT_MIN_KM = 1.0
+
+class TripQuality:
+    """
+    Data quality signals of a trip, accumulated from its segments' time
+    deltas and distances in the same pass that computes the distances:
+    time gaps, implied speeds, idle time and teleport jumps. Segments can
+    be added in several calls (e.g. as a live trip grows), so the trip
+    never has to be re-read to score it.
+    """
+
+    __slots__ = (
+        "max_speed_kmh", "duration_seconds", "gap_count", "gap_seconds", "max_gap_seconds",
+        "idle_seconds", "max_implied_speed_kmh", "speeding_segments", "teleport_segments"
+    )
+
+    def __init__(self, vehicle_type: str):
+        self.max_speed_kmh = MAX_PLAUSIBLE_SPEED_KMH.get(vehicle_type, MAX_PLAUSIBLE_SPEED_KMH["default"])
+        self.duration_seconds = 0.0
+        self.gap_count = 0
+        self.gap_seconds = 0.0
+        self.max_gap_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.max_implied_speed_kmh = 0.0
+        self.speeding_segments = 0
+        self.teleport_segments = 0
+
+    def add_segments(self, timestamps, distances_km):
+        """
+        Adds consecutive segments: timestamps are their len(distances_km) + 1
+        time-sorted endpoints in epoch microseconds, so a later call passes
+        the previous call's last timestamp first.
+        """
+        distances = np.asarray(distances_km, dtype=np.float64)
+        if not distances.size:
+            return
+        seconds = np.diff(np.asarray(timestamps, dtype=np.int64)) / 1_000_000
+        TripQuality._accumulate([self], seconds, distances, [0, distances.size])
+
+    @classmethod
+    def for_trips(cls, vehicle_types: list, seconds, distances_km, segment_offsets) -> list:
+        """
+        One TripQuality per trip, for many trips in one vectorized pass.
+        seconds and distances_km hold every trip's segments back to back
+        (see calculate_fleet_segment_seconds), trip k owning positions
+        segment_offsets[k]:segment_offsets[k+1].
+        """
+        qualities = [cls(vehicle_type) for vehicle_type in vehicle_types]
+        cls._accumulate(qualities, seconds, distances_km, segment_offsets)
+        return qualities
+
+    @staticmethod
+    def _accumulate(qualities: list, seconds, distances_km, segment_offsets):
+        """Adds each trip's segments (laid out as in for_trips) to its TripQuality in qualities."""
+        segment_counts = np.diff(np.asarray(segment_offsets, dtype=np.int64))
+        trips = np.flatnonzero(segment_counts)
+        if not trips.size:
+            return
+        seconds = np.asarray(seconds, dtype=np.float64)
+        distances = np.asarray(distances_km, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # A move between two pings with the same timestamp is infinitely fast
+            speeds = np.where(seconds > 0, distances / (seconds / 3600), np.where(distances > 0, np.inf, 0.0))
+
+        gaps = seconds > GPS_GAP_SECONDS
+        # A gap is missing data, not idling
+        idle = (speeds < IDLE_SPEED_KMH) & ~gaps
+        judged = distances >= SPEED_MIN_SEGMENT_KM
+        teleports = judged & (distances >= TELEPORT_MIN_KM) & (speeds > TELEPORT_SPEED_KMH)
+        speed_limits = np.repeat([quality.max_speed_kmh for quality in qualities], segment_counts)
+        speeding = judged & ~teleports & (speeds > speed_limits)
+
+        starts = np.asarray(segment_offsets, dtype=np.int64)[trips]
+        columns = zip(
+            trips.tolist(),
+            np.add.reduceat(seconds, starts).tolist(),
+            np.add.reduceat(gaps, starts, dtype=np.int64).tolist(),
+            np.add.reduceat(np.where(gaps, seconds, 0.0), starts).tolist(),
+            np.maximum.reduceat(seconds, starts).tolist(),
+            np.add.reduceat(np.where(idle, seconds, 0.0), starts).tolist(),
+            # Same-timestamp moves are counted as speeding but have no speed to report
+            np.maximum.reduceat(np.where(judged & ~teleports & np.isfinite(speeds), speeds, 0.0), starts).tolist(),
+            np.add.reduceat(speeding, starts, dtype=np.int64).tolist(),
+            np.add.reduceat(teleports, starts, dtype=np.int64).tolist()
+        )
+        for trip, duration, gap_count, gap_seconds, max_gap, idle_seconds, max_speed, speeding_count, teleport_count in columns:
+            quality = qualities[trip]
+            quality.duration_seconds += duration
+            quality.gap_count += gap_count
+            quality.gap_seconds += gap_seconds
+            quality.max_gap_seconds = max(quality.max_gap_seconds, max_gap)
+            quality.idle_seconds += idle_seconds
+            quality.max_implied_speed_kmh = max(quality.max_implied_speed_kmh, max_speed)
+            quality.speeding_segments += speeding_count
+            quality.teleport_segments += teleport_count
+
+    def confidence_score(self, ping_count: int) -> float:
+        """0-1: lowered for sparse pings, time not covered by pings, and implausible movement."""
+        if not ping_count:
+            return 0.0
+        score = 1.0
+        if ping_count < 5:
+            score -= 0.1
+        if self.duration_seconds > 0:
+            score -= 0.4 * self.gap_seconds / self.duration_seconds
+        if self.teleport_segments:
+            score -= 0.3
+        if self.speeding_segments:
+            score -= 0.1
+        return round(max(0.0, min(score, 1.0)), 4)
+
+    def flags(self, ping_count: int, total_distance: float, displacement_km: float) -> list:
+        """String flags for the trip's anomalies; displacement_km is first to last ping."""
+        flags = []
+        if self.idle_seconds >= EXCESSIVE_IDLE_SECONDS:
+            flags.append("excessive_idle_time")
+        # Distance driven well beyond the straight line between the endpoints
+        if ping_count >= 2 and total_distance > displacement_km * 1.5:
             flags.append("route_deviation")
-            
-    return flags
+        if self.gap_count:
+            flags.append("data_gap")
+        if self.speeding_segments:
+            flags.append("implausible_speed")
+        if self.teleport_segments:
+            flags.append("teleport_jump")
+        return flags
+
+    def metrics(self) -> dict:
+        return {
+            "duration_seconds": round(self.duration_seconds, 1),
+            "gap_count": self.gap_count,
+            "gap_seconds": round(self.gap_seconds, 1),
+            "max_gap_seconds": round(self.max_gap_seconds, 1),
+            "idle_seconds": round(self.idle_seconds, 1),
+            "max_implied_speed_kmh": round(self.max_implied_speed_kmh, 1),
+            "speeding_segments": self.speeding_segments,
+            "teleport_segments": self.teleport_segments
+        }
 
 # --- 6️⃣ Actionable Reduction Recommendations ---
 def generate_recommendations(vehicle_type: str, total_emissions: float) -> list:
@@ -115,18 +291,100 @@ def generate_field_hash(value, audit_id: str, timestamp: str) -> str:
     payload = f"{str(value)}|{audit_id}|{timestamp}"
     return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
+def hash_merkle_pair(left: str, right: str) -> str:
+    """Parent node of two Merkle tree nodes."""
+    return hashlib.sha256((left + right).encode('utf-8')).hexdigest()
+
+def merkle_level_sizes(leaf_count: int) -> list:
+    """
+    Node count of each level of a Merkle tree over leaf_count leaves, from the
+    leaves up to the root. A node without a right sibling is promoted as is.
+    """
+    sizes = [leaf_count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+def build_merkle_levels(leaves: list) -> list:
+    """Every level of the Merkle tree over leaves, from the leaves up to [root]."""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        below = levels[-1]
+        levels.append([
+            hash_merkle_pair(below[i], below[i + 1]) if i + 1 < len(below) else below[i]
+            for i in range(0, len(below), 2)
+        ])
+    return levels
+
+def generate_merkle_proof(get_node, leaf_count: int, index: int) -> list:
+    """
+    Inclusion proof for leaf `index`: the sibling of each node on its path to
+    the root, as {"side", "hash"} entries from the bottom up. get_node(level, i)
+    returns a stored node, so the proof costs O(log n) lookups.
+    """
+    proof = []
+    for level, size in enumerate(merkle_level_sizes(leaf_count)[:-1]):
+        sibling = index ^ 1
+        if sibling < size:
+            proof.append({
+                "side": "left" if sibling < index else "right",
+                "hash": get_node(level, sibling)
+            })
+        index //= 2
+    return proof
+
+def verify_merkle_proof(leaf_hash: str, proof: list, root_hash: str) -> bool:
+    """Folds a proof from generate_merkle_proof back up and compares it to the root."""
+    node = leaf_hash
+    for step in proof:
+        node = hash_merkle_pair(step["hash"], node) if step["side"] == "left" else hash_merkle_pair(node, step["hash"])
+    return node == root_hash
+
 def generate_merkle_root_hash(field_hashes: dict) -> str:
     """
-    Generates a Merkle-style root hash from all field hashes.
-    Sorts keys to ensure determinism.
+    Generates the Merkle root hash of a trip from its field hashes.
+    Leaves are ordered by field name to ensure determinism, so a single
+    field can be proven against the root with generate_merkle_proof.
     """
     # Sort by key to ensure order doesn't affect hash
-    sorted_hashes = sorted(field_hashes.items())
+    sorted_hashes = [h for k, h in sorted(field_hashes.items())]
+    if not sorted_hashes:
+        return hashlib.sha256(b"").hexdigest()
     
-    # Concatenate all hashes
-    combined_payload = "".join([h for k, h in sorted_hashes])
-    
-    return hashlib.sha256(combined_payload.encode('utf-8')).hexdigest()
+    return build_merkle_levels(sorted_hashes)[-1][0]
+
+def generate_trip_fingerprint(
+    trip: dict,
+    supplier_id: str,
+    vehicle_id: str,
+    vehicle_type: str,
+    simplify_tolerance_m: float = None,
+    source_digest: str = None
+) -> str:
+    """
+    Content fingerprint of the source data a trip's audit record is derived from.
+    Two runs over the same pings, date, region and vehicle give the same
+    fingerprint, so the trip does not need to be recomputed, unless the
+    quality scoring (QUALITY_MODEL_VERSION) or the track simplification
+    tolerance changed. Emission factor changes are handled separately, by
+    re-pricing the stored distances.
+
+    source_digest is a hash of the trip's raw source bytes (see
+    ingest.source_digest), which covers its pings, date and region without
+    re-serializing them. Without it, columnar trips hash their column
+    bytes and JSON trips are serialized.
+    """
+    if source_digest is None:
+        if "gps_pings" in trip:
+            serialized = json.dumps([trip["gps_pings"], trip.get("date"), trip.get("region")], sort_keys=True, default=str)
+            source_digest = hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+        else:
+            source_digest = trip_columns_digest(trip)
+    parts = [source_digest, supplier_id, vehicle_id, vehicle_type, QUALITY_MODEL_VERSION]
+    if simplify_tolerance_m is not None:
+        parts.append(simplify_tolerance_m)
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 def generate_data_hash(audit_data: dict) -> str:
     """
@@ -3,34 +3,33 @@
 import { useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Loader2, CheckCircle2, AlertCircle } from 'lucide-react';
+import { runProcessingJob, type ProcessingJob } from '@/lib/processing-job';
 
 interface DataProcessorProps {
   onSuccess: () => void;
 }
 
+function describeProgress(job: ProcessingJob) {
+  const total = job.trips_total_estimate ? ` of ~${job.trips_total_estimate}` : '';
+  const rate = job.trips_per_second ? ` at ${job.trips_per_second} trips/s` : '';
+  const eta = job.eta_seconds !== null ? `, about ${Math.ceil(job.eta_seconds)}s left` : '';
+  return `${job.trips_processed}${total} trips processed${rate}${eta}`;
+}
+
 export default function DataProcessor({ onSuccess }: DataProcessorProps) {
   const [loading, setLoading] = useState(false);
   const [status, setStatus] = useState<'idle' | 'success' | 'error'>('idle');
   const [message, setMessage] = useState('');
+  const [job, setJob] = useState<ProcessingJob | null>(null);
 
   const handleProcessData = async () => {
     setLoading(true);
     setStatus('idle');
     setMessage('');
+    setJob(null);
 
     try {
-      const response = await fetch('http://localhost:8001/automation/process-all-data', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-
-      const data = await response.json();
+      const data = await runProcessingJob(setJob);
       setStatus('success');
       setMessage(
         `${data.message} - ${data.suppliers_processed} suppliers processed, ${data.trips_audited} trips audited`
@@ -45,6 +44,7 @@ export default function DataProcessor({ onSuccess }: DataProcessorProps) {
       );
     } finally {
       setLoading(false);
+      setJob(null);
     }
   };
 
@@ -60,6 +60,8 @@ export default function DataProcessor({ onSuccess }: DataProcessorProps) {
         {loading ? 'Processing Data...' : 'Process All Data'}
       </Button>
 
+      {loading && job && <p className="text-sm text-gray-600">{describeProgress(job)}</p>}
+
       {status === 'success' && (
         <div className="flex items-start gap-3 rounded-lg bg-green-50 p-4 border border-green-200">
           <CheckCircle2 className="h-5 w-5 text-green-600 mt-0.5 flex-shrink-0" />
@@ -5,6 +5,7 @@ import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/card';
 import { Loader2, RefreshCw, TrendingUp, AlertTriangle, ShieldCheck, Activity } from 'lucide-react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
+import { runProcessingJob } from '@/lib/processing-job';
 
 interface DashboardStats {
     total_co2_kg: number;
@@ -46,7 +47,7 @@ export default function ExecutiveDashboard({ onDataProcessed }: ExecutiveDashboa
     const handleRunAudit = async () => {
         setProcessing(true);
         try {
-            await fetch('http://localhost:8001/automation/process-all-data', { method: 'POST' });
+            await runProcessingJob();
             await fetchStats();
             onDataProcessed(); // Notify parent
         } catch (err) {
@@ -23,25 +23,31 @@ export default function TripAuditViewer() {
   const [auditData, setAuditData] = useState<any>(null);
   const [error, setError] = useState('');
   const [availableTrips, setAvailableTrips] = useState<string[]>([]);
+  const [tripsCursor, setTripsCursor] = useState<string | null>(null);
 
   // Chaos Engineering State
   const [showTamper, setShowTamper] = useState(false);
   const [tamperField, setTamperField] = useState('total_trip_emissions_kg_co2e');
   const [tamperValue, setTamperValue] = useState('');
 
+  // Fetch one page of trip IDs; pass the previous next_cursor to append the next page
+  const fetchTrips = async (cursor?: string) => {
+    try {
+      const params = new URLSearchParams({ limit: '20' });
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`http://localhost:8001/audit/list-trips?${params}`);
+      if (response.ok) {
+        const data = await response.json();
+        setAvailableTrips(prev => (cursor ? [...prev, ...(data.trips || [])] : data.trips || []));
+        setTripsCursor(data.next_cursor ?? null);
+      }
+    } catch (err) {
+      console.error("Failed to fetch trip list", err);
+    }
+  };
+
   useEffect(() => {
     // Fetch available trips when component mounts
-    const fetchTrips = async () => {
-      try {
-        const response = await fetch('http://localhost:8001/audit/list-trips');
-        if (response.ok) {
-          const data = await response.json();
-          setAvailableTrips(data.trips || []);
-        }
-      } catch (err) {
-        console.error("Failed to fetch trip list", err);
-      }
-    };
     fetchTrips();
   }, []);
 
@@ -55,7 +61,7 @@ export default function TripAuditViewer() {
     setTripId(targetId);
 
     try {
-      const response = await fetch(`http://localhost:8001/audit/trip-report/${targetId}`);
+      const response = await fetch(`http://localhost:8001/audit/trip-report/${targetId}?expand_references=true`);
       if (!response.ok) {
         throw new Error('Audit record not found');
       }
@@ -279,6 +285,11 @@ export default function TripAuditViewer() {
               {id}
             </Button>
           ))}
+          {tripsCursor && (
+            <Button variant="ghost" size="sm" onClick={() => fetchTrips(tripsCursor)}>
+              More…
+            </Button>
+          )}
         </div>
       )}
 
@@ -0,0 +1,57 @@
+const API_BASE = 'http://localhost:8001';
+const POLL_INTERVAL_MS = 500;
+
+export interface ProcessingResult {
+  message: string;
+  suppliers_processed: number;
+  trips_audited: number;
+  trips_recomputed: number;
+  trips_unchanged: number;
+  trips_repriced: number;
+  trips_removed: number;
+  merkle_root: string | null;
+}
+
+export interface ProcessingJob {
+  job_id: string;
+  status: 'running' | 'completed' | 'failed';
+  trips_total_estimate: number | null;
+  trips_processed: number;
+  trips_per_second: number | null;
+  eta_seconds: number | null;
+  elapsed_seconds: number;
+  result: ProcessingResult | null;
+  error: string | null;
+}
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Starts a background processing run and polls it until it finishes,
+// reporting each status update. Resolves with the run's summary.
+export async function runProcessingJob(
+  onProgress?: (job: ProcessingJob) => void
+): Promise<ProcessingResult> {
+  const response = await fetch(`${API_BASE}/automation/process-all-data?background=true`, {
+    method: 'POST',
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  let job: ProcessingJob = await response.json();
+
+  while (job.status === 'running') {
+    onProgress?.(job);
+    await sleep(POLL_INTERVAL_MS);
+    const poll = await fetch(`${API_BASE}/automation/jobs/${job.job_id}`);
+    if (!poll.ok) {
+      throw new Error(`HTTP error! status: ${poll.status}`);
+    }
+    job = await poll.json();
+  }
+
+  onProgress?.(job);
+  if (job.status === 'failed' || !job.result) {
+    throw new Error(job.error ?? 'Processing failed.');
+  }
+  return job.result;
+}
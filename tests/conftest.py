@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.storage import MemoryAuditStore, SQLiteAuditStore
+
+
+def write_fleet(path, suppliers: list):
+    """Writes suppliers in the synthetic_data.json layout."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"suppliers": suppliers}, f)
+
+
+def make_trip(trip_id: str, start_minute: int = 0, pings: int = 5, lat: float = 51.5, lon: float = -0.1) -> dict:
+    """A trip heading north-east with one ping a minute on 2024-03-01."""
+    return {
+        "trip_id": trip_id,
+        "date": "2024-03-01",
+        "gps_pings": [
+            {
+                "timestamp": f"2024-03-01T08:{start_minute + i:02d}:00Z",
+                "latitude": round(lat + 0.01 * i, 6),
+                "longitude": round(lon + 0.01 * i, 6)
+            }
+            for i in range(pings)
+        ]
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    """A fresh store of each kind, installed as the API's store."""
+    if request.param == "sqlite":
+        audit_store = SQLiteAuditStore(str(tmp_path / "audit.db"))
+    else:
+        audit_store = MemoryAuditStore()
+    monkeypatch.setattr(main, "store", audit_store)
+    monkeypatch.setattr(main, "_scenario_fleet", None)
+    monkeypatch.setattr(main, "_pending_tamper_events", {})
+    monkeypatch.setattr(main, "_live_trips", {})
+    # Keyed by trip revision, which a fresh memory store numbers from 1 again
+    monkeypatch.setattr(main, "_verification_cache", {})
+    monkeypatch.setattr(main, "_columnar_dataset", None)
+    monkeypatch.setattr(main, "COLUMNAR_DATA_DIR", None)
+    return audit_store
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def fleet_path(tmp_path, monkeypatch):
+    """A two-supplier fleet file, installed as the API's data source."""
+    path = tmp_path / "fleet.json"
+    write_fleet(path, [
+        {
+            "supplier_id": "SUPPLIER_001",
+            "name": "Supplier One",
+            "vehicles": [
+                {"vehicle_id": "VAN_1", "type": "Light-Duty Van", "trips": [make_trip("TRIP_1"), make_trip("TRIP_2", 10, 7)]},
+                {"vehicle_id": "TRUCK_1", "type": "Heavy-Duty Truck", "trips": [make_trip("TRIP_3", 30, 4, lat=48.8, lon=2.3)]}
+            ]
+        },
+        {
+            "supplier_id": "SUPPLIER_002",
+            "name": "Supplier Two",
+            "vehicles": [
+                {"vehicle_id": "SHIP_1", "type": "Cargo Ship", "trips": [make_trip("TRIP_4", 0, 6, lat=1.3, lon=103.8)]}
+            ]
+        }
+    ])
+    monkeypatch.setattr(main, "DATA_FILE_PATH", str(path))
+    return path
+
+
+@pytest.fixture
+def processed(client, fleet_path):
+    """The API after one processing run over fleet_path."""
+    response = client.post("/automation/process-all-data")
+    assert response.status_code == 200
+    return client
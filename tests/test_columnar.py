@@ -0,0 +1,51 @@
+import pytest
+
+from app import main
+from app.columnar import convert_json_to_columnar, to_epoch_us, to_epoch_us_array
+
+from .conftest import make_trip, write_fleet
+
+
+def _fleet(trips: list) -> list:
+    return [{
+        "supplier_id": "SUPPLIER_001",
+        "name": "Supplier One",
+        "vehicles": [{"vehicle_id": "VAN_1", "type": "Light-Duty Van", "trips": trips}]
+    }]
+
+
+def test_reconversion_leaves_stored_trips_unchanged(client, tmp_path, monkeypatch):
+    source = tmp_path / "fleet.json"
+    columnar_dir = tmp_path / "columnar"
+    trips = [make_trip("TRIP_1", 0, 5), make_trip("TRIP_2", 20, 8, lat=40.7, lon=-74.0)]
+    write_fleet(source, _fleet(trips))
+    convert_json_to_columnar(str(source), str(columnar_dir))
+    monkeypatch.setattr(main, "DATA_FILE_PATH", str(source))
+    monkeypatch.setattr(main, "COLUMNAR_DATA_DIR", str(columnar_dir))
+
+    assert client.post("/automation/process-all-data").status_code == 200
+    before = {trip_id: client.get(f"/audit/trip-report/{trip_id}").json() for trip_id in ("TRIP_1", "TRIP_2")}
+
+    # Same trips in the other order and with a new one first, so every row moves
+    write_fleet(source, _fleet([make_trip("TRIP_0", 40, 12, lat=1.3, lon=103.8)] + trips[::-1]))
+    convert_json_to_columnar(str(source), str(columnar_dir))
+
+    for trip_id, report in before.items():
+        after = client.get(f"/audit/trip-report/{trip_id}").json()
+        assert after["integrity_status"] == "VERIFIED"
+        assert after["segments"] == report["segments"]
+        assert after["total_trip_distance_km"] == report["total_trip_distance_km"]
+
+    summary = client.post("/automation/process-all-data").json()
+    assert summary["trips_unchanged"] == 2
+    assert client.get("/audit/trip-report/TRIP_0").json()["integrity_status"] == "VERIFIED"
+
+
+def test_vectorized_timestamps_match_per_timestamp_parsing():
+    utc = ["2024-02-29T23:59:59Z", "1970-01-01T00:00:00Z", "0001-01-01T00:00:00Z", "2100-12-31T12:30:05Z"]
+    mixed = utc + ["2024-03-01T08:00:00+01:00", "2024-03-01T08:00:00.250Z", "2024-03-01T08:00:00"]
+    for timestamps in (utc, mixed):
+        assert to_epoch_us_array(timestamps).tolist() == [to_epoch_us(timestamp) for timestamp in timestamps]
+
+    with pytest.raises(ValueError):
+        to_epoch_us_array(["2023-02-29T00:00:00Z"])
@@ -0,0 +1,123 @@
+import pytest
+
+from app import main, processing
+from app.factors import FactorRegistry, FactorSet
+
+
+def _factor_set(version: str, valid_from: str, valid_to: str, region: str = "GLOBAL", scale: float = 1.0) -> FactorSet:
+    return FactorSet({
+        "version": version,
+        "region": region,
+        "valid_from": valid_from,
+        "valid_to": valid_to,
+        "factors": {"default": 0.8 * scale, "Light-Duty Van": 0.3 * scale, "Heavy-Duty Truck": 1.2 * scale, "Cargo Ship": 0.02 * scale}
+    })
+
+
+@pytest.fixture
+def registry():
+    # GLOBAL has a gap in July 2024; EU only covers 2024
+    return FactorRegistry([
+        _factor_set("G-2024b", "2024-08-01", "2024-12-31"),
+        _factor_set("G-2023", "2023-01-01", "2023-12-31"),
+        _factor_set("G-2024a", "2024-01-01", "2024-06-30"),
+        _factor_set("EU-2024", "2024-01-01", "2024-12-31", region="EU")
+    ])
+
+
+@pytest.mark.parametrize("trip_date, region, expected", [
+    ("2023-05-01", None, "G-2023"),
+    ("2024-01-01", None, "G-2024a"),
+    ("2024-06-30T23:59:00Z", None, "G-2024a"),
+    # In the gap: the most recent set that had started
+    ("2024-07-15", None, "G-2024a"),
+    ("2024-08-01", None, "G-2024b"),
+    # Past the last period, and before the first
+    ("2026-02-01", None, "G-2024b"),
+    ("2019-01-01", None, "G-2023"),
+    # Undated trips get the latest set
+    (None, None, "G-2024b"),
+    ("2024-03-01", "EU", "EU-2024"),
+    ("2023-03-01", "EU", "EU-2024"),
+    # Regions without sets of their own fall back to GLOBAL
+    ("2024-03-01", "APAC", "G-2024a"),
+    (None, "APAC", "G-2024b")
+])
+def test_resolve_by_date_and_region(registry, trip_date, region, expected):
+    assert registry.resolve(trip_date, region).version == expected
+
+
+def test_registry_lookups(registry):
+    assert registry.latest.version == "G-2024b"
+    assert registry.get("EU-2024").region == "EU"
+    assert registry.get("missing") is None
+    assert registry.get("G-2023").factor_for("Cargo Plane") == registry.get("G-2023").factors["default"]
+    assert registry.metadata_by_version()["G-2023"]["validity_period"] == "2023-01-01 to 2023-12-31"
+
+
+@pytest.mark.parametrize("factor_sets, message", [
+    ([_factor_set("A", "2024-01-01", "2024-06-30"), _factor_set("B", "2024-06-30", "2024-12-31")], "overlap"),
+    ([_factor_set("A", "2024-01-01", "2024-06-30"), _factor_set("A", "2025-01-01", "2025-06-30")], "Duplicate"),
+    ([_factor_set("EU", "2024-01-01", "2024-06-30", region="EU")], "No emission factor set for the GLOBAL region")
+])
+def test_inconsistent_registries_are_rejected(factor_sets, message):
+    with pytest.raises(ValueError, match=message):
+        FactorRegistry(factor_sets)
+
+
+def test_a_factor_set_needs_a_default():
+    with pytest.raises(ValueError, match="no 'default' factor"):
+        FactorSet({"version": "X", "valid_from": "2024-01-01", "valid_to": "2024-12-31", "factors": {"Cargo Ship": 0.02}})
+
+
+def _reports(client) -> dict:
+    return {trip_id: client.get(f"/audit/trip-report/{trip_id}").json() for trip_id in ("TRIP_1", "TRIP_2", "TRIP_3", "TRIP_4")}
+
+
+def test_repricing_keeps_distances_and_changes_emissions_and_hashes(processed, store, monkeypatch):
+    client = processed
+    before = _reports(client)
+    root_before = client.get("/audit/trip-proof/TRIP_1").json()["merkle_root"]
+    total_before = client.get("/intelligence/dashboard-stats").json()["total_co2_kg"]
+
+    # The fleet's trips are all dated 2024-03-01, now priced at twice the factors
+    registry = FactorRegistry([
+        _factor_set("2024.1", "2024-01-01", "2024-02-29"),
+        _factor_set("2024.2", "2024-03-01", "2024-12-31", scale=2.0)
+    ])
+    monkeypatch.setattr(main, "FACTOR_REGISTRY", registry)
+    monkeypatch.setattr(processing, "FACTOR_REGISTRY", registry)
+    summary = client.post("/automation/reprice-trips").json()
+    assert summary["trips_repriced"] == 4
+    assert summary["trips_skipped_tampered"] == []
+
+    after = _reports(client)
+    for trip_id, report in after.items():
+        old = before[trip_id]
+        assert report["integrity_status"] == "VERIFIED"
+        assert report["emission_factor_source_version"] == "2024.2"
+        assert report["audit_id"] == old["audit_id"]
+        assert report["total_trip_distance_km"] == old["total_trip_distance_km"]
+        assert report["emission_factor_per_km"] == pytest.approx(2 * old["emission_factor_per_km"])
+        # Both sides are rounded to 0.01 kg
+        assert report["total_trip_emissions_kg_co2e"] == pytest.approx(2 * old["total_trip_emissions_kg_co2e"], abs=0.02)
+        assert report["data_hash"] != old["data_hash"]
+        assert store.get_trip_index(trip_id)["distance_km"] == pytest.approx(old["total_trip_distance_km"], abs=0.01)
+    assert summary["merkle_root"] == client.get("/audit/trip-proof/TRIP_1").json()["merkle_root"] != root_before
+    assert client.get("/intelligence/dashboard-stats").json()["total_co2_kg"] == pytest.approx(2 * total_before, abs=0.05)
+
+    # Nothing left to re-price, and a processing run agrees
+    assert client.post("/automation/reprice-trips").json()["trips_repriced"] == 0
+    run = client.post("/automation/process-all-data").json()
+    assert run["trips_unchanged"] == 4
+    assert run["trips_repriced"] == 0
+
+
+def test_repricing_skips_tampered_trips(processed, monkeypatch):
+    client = processed
+    client.post("/simulation/tamper-data", params={"trip_id": "TRIP_2", "field": "total_trip_distance_km", "new_value": 1.0})
+
+    summary = client.post("/automation/reprice-trips", params={"force": True}).json()
+    assert summary["trips_repriced"] == 3
+    assert summary["trips_skipped_tampered"] == ["TRIP_2"]
+    assert client.get("/audit/trip-report/TRIP_2").json()["integrity_status"] == "COMPROMISED"
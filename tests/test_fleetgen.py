@@ -0,0 +1,57 @@
+from app import main
+from app.benchmark import compare_results, run_benchmark
+from app.fleetgen import generate_fleet
+from app.ingest import iter_suppliers
+
+TINY_FLEET = {"suppliers": 2, "vehicles_per_supplier": 2, "trips_per_vehicle": 3, "pings_per_trip": 10, "seed": 1}
+
+
+def _counted(path) -> dict:
+    counts = {"suppliers": 0, "vehicles": 0, "trips": 0, "pings": 0}
+    for supplier in iter_suppliers(str(path)):
+        counts["suppliers"] += 1
+        for vehicle in supplier["vehicles"]:
+            counts["vehicles"] += 1
+            for trip in vehicle["trips"]:
+                counts["trips"] += 1
+                counts["pings"] += len(trip["gps_pings"])
+    return counts
+
+
+def test_a_generated_fleet_reads_back_as_reported(tmp_path):
+    summary = generate_fleet(str(tmp_path / "fleet.json"), **TINY_FLEET)
+
+    assert summary["trips"] == 2 * 2 * 3
+    assert _counted(tmp_path / "fleet.json") == summary
+
+    generate_fleet(str(tmp_path / "again.json"), **TINY_FLEET)
+    assert (tmp_path / "fleet.json").read_bytes() == (tmp_path / "again.json").read_bytes()
+
+
+def test_a_generated_fleet_processes_and_verifies(client, store, tmp_path, monkeypatch):
+    path = tmp_path / "fleet.json"
+    summary = generate_fleet(str(path), **TINY_FLEET)
+    monkeypatch.setattr(main, "DATA_FILE_PATH", str(path))
+
+    response = client.post("/automation/process-all-data")
+    assert response.status_code == 200
+    assert response.json()["trips_audited"] == summary["trips"]
+    trip_id = next(trip_id for trip_id, _ in store.iter_trip_index())
+    assert client.get(f"/audit/trip-report/{trip_id}").json()["integrity_status"] == "VERIFIED"
+
+
+def test_the_benchmark_runs_on_a_tiny_fleet(client, store, tmp_path, monkeypatch):
+    path = tmp_path / "fleet.json"
+    fleet = generate_fleet(str(path), **TINY_FLEET)
+    # run_benchmark points the API at path itself; restore it afterwards
+    monkeypatch.setattr(main, "DATA_FILE_PATH", main.DATA_FILE_PATH)
+
+    results = run_benchmark(str(path), fleet, runs=1, requests=2)
+    assert results["processing"]["samples"] == 1
+    assert results["trip_report"]["samples"] == 2
+    assert results["processing"]["trips_per_second"] > 0
+
+    report = {"results": results}
+    assert not any(regressed for *_, regressed in compare_results(report, report))
+    slower = {"results": {**results, "trip_report": {**results["trip_report"], "p99_ms": results["trip_report"]["p99_ms"] * 2}}}
+    assert ("trip_report.p99_ms", True) in [(metric, regressed) for metric, *_, regressed in compare_results(report, slower)]
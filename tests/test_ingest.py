@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from app.ingest import iter_suppliers, read_trip_at
+
+from .conftest import make_trip
+
+
+def _write(path, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _late_keys_source(path):
+    """Supplier name after vehicles and vehicle type after trips, with non-ASCII text before them."""
+    trips = [make_trip("TRIP_1"), make_trip("TRIP_2", 10, 7)]
+    _write(path, (
+        '{"suppliers": ['
+        '{"supplier_id": "S1", "vehicles": ['
+        '{"vehicle_id": "V1", "trips": ' + _dumps(trips) + ', "type": "Cargo Ship", "note": "Hafen Müller"}, '
+        '{"vehicle_id": "V2", "trips": [' + _dumps(make_trip("TRIP_3")) + ']}'
+        '], "name": "Spedition Größe"}, '
+        '{"name": "Second", "supplier_id": "S2", "vehicles": [{"type": "Cargo Plane", "vehicle_id": "V3", "trips": []}]}'
+        '], "generated_by": "test"}'
+    ))
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_keys_after_nested_arrays_are_read(tmp_path, chunk_size):
+    path = tmp_path / "fleet.json"
+    _late_keys_source(path)
+
+    seen = []
+    for supplier in iter_suppliers(str(path), chunk_size=chunk_size, locate=True):
+        name = supplier["name"]
+        for vehicle in supplier["vehicles"]:
+            vehicle_type = vehicle.get("type", "default")
+            for trip, (offset, length, digest) in vehicle["trips"]:
+                assert read_trip_at(str(path), offset, length, with_digest=True) == (trip, digest)
+                seen.append((name, vehicle["vehicle_id"], vehicle_type, trip["trip_id"]))
+        assert "note" not in supplier
+
+    assert seen == [
+        ("Spedition Größe", "V1", "Cargo Ship", "TRIP_1"),
+        ("Spedition Größe", "V1", "Cargo Ship", "TRIP_2"),
+        ("Spedition Größe", "V2", "default", "TRIP_3")
+    ]
+
+
+def test_keys_after_nested_arrays_when_read_last(tmp_path):
+    path = tmp_path / "fleet.json"
+    _late_keys_source(path)
+
+    seen = []
+    for supplier in iter_suppliers(str(path)):
+        for vehicle in supplier["vehicles"]:
+            trip_ids = [trip["trip_id"] for trip in vehicle["trips"]]
+            seen.append((vehicle["vehicle_id"], trip_ids, vehicle.get("type"), vehicle.get("note")))
+        seen.append(supplier["name"])
+
+    assert seen == [
+        ("V1", ["TRIP_1", "TRIP_2"], "Cargo Ship", "Hafen Müller"),
+        ("V2", ["TRIP_3"], None, None),
+        "Spedition Größe",
+        ("V3", [], "Cargo Plane", None),
+        "Second"
+    ]
+
+
+def test_missing_key_still_raises(tmp_path):
+    path = tmp_path / "fleet.json"
+    _write(path, '{"suppliers": [{"supplier_id": "S1", "vehicles": []}]}')
+    supplier = next(iter_suppliers(str(path)))
+    with pytest.raises(KeyError):
+        supplier["name"]
+
+
+def test_processing_prices_trips_with_a_late_vehicle_type(client, tmp_path, monkeypatch):
+    from app import main
+
+    path = tmp_path / "fleet.json"
+    _late_keys_source(path)
+    monkeypatch.setattr(main, "DATA_FILE_PATH", str(path))
+
+    assert client.post("/automation/process-all-data").status_code == 200
+    report = client.get("/audit/trip-report/TRIP_1").json()
+    assert report["vehicle_type"] == "Cargo Ship"
+    leaderboard = client.get("/intelligence/supplier-leaderboard").json()["leaderboard"]
+    assert [entry["name"] for entry in leaderboard if entry["supplier_id"] == "S1"] == ["Spedition Größe"]
@@ -0,0 +1,52 @@
+import time
+
+from app import integrity
+from app.integrity import find_integrity_violations, sweep_integrity
+
+
+def _run_sweep(client) -> dict:
+    assert client.post("/authority/integrity-sweep").status_code == 200
+    deadline = time.monotonic() + 30
+    while True:
+        status = client.get("/authority/integrity-sweep").json()
+        if status["status"] != "running" or time.monotonic() > deadline:
+            return status
+        time.sleep(0.01)
+
+
+def test_a_sweep_over_clean_records_finds_nothing(processed):
+    status = _run_sweep(processed)
+    assert status["status"] == "completed"
+    assert status["records_checked"] == status["records_total"] == 4
+    assert status["violations_found"] == status["events_logged"] == 0
+    assert processed.get("/authority/integrity-events").json()["event_count"] == 0
+
+
+def test_a_sweep_logs_a_tampered_record_once(processed):
+    client = processed
+    client.post("/simulation/tamper-data", params={"trip_id": "TRIP_3", "field": "total_trip_distance_km", "new_value": 1.0})
+
+    status = _run_sweep(client)
+    assert status["status"] == "completed"
+    assert status["records_checked"] == 4
+    assert status["violations_found"] == status["events_logged"] == 1
+    events = client.get("/authority/integrity-events").json()["events"]
+    assert [(event["trip_id"], event["field"]) for event in events] == [("TRIP_3", "total_trip_distance_km")]
+
+    # Found again by the next sweep, but already in the log
+    status = _run_sweep(client)
+    assert status["violations_found"] == 1
+    assert status["events_logged"] == 0
+
+
+def test_sweep_yields_chunks_in_input_order(processed, store, monkeypatch):
+    monkeypatch.setattr(integrity, "SWEEP_CHUNK_SIZE", 3)
+    records = list(store.iter_trips())
+    tampered = dict(records[3][1], confidence_score=0.01)
+    records[3] = (records[3][0], tampered)
+
+    chunks = list(sweep_integrity(iter(records)))
+    assert [checked for checked, _ in chunks] == [3, 1]
+    assert chunks[0][1] == []
+    assert [violation["field"] for violation in chunks[1][1]] == ["confidence_score"]
+    assert find_integrity_violations(*records[2]) == []
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from .conftest import make_trip, write_fleet
+
+METRICS = ("emissions", "distance", "intensity")
+
+
+def _supplier(supplier_id: str, vehicle_type: str = "Light-Duty Van", trips: int = 1, pings: int = 5) -> dict:
+    return {
+        "supplier_id": supplier_id,
+        "name": f"Supplier {supplier_id}",
+        "vehicles": [{
+            "vehicle_id": f"{supplier_id}_V",
+            "type": vehicle_type,
+            "trips": [make_trip(f"{supplier_id}_{i}", 10 * i, pings) for i in range(trips)]
+        }]
+    }
+
+
+@pytest.fixture
+def ranked(client, tmp_path, monkeypatch):
+    """Suppliers S1, S3 and S5 tie on every metric; S2 runs a truck, S4 has not moved."""
+    from app import main
+
+    path = tmp_path / "fleet.json"
+    write_fleet(path, [
+        _supplier("S3"), _supplier("S1"), _supplier("S4", pings=1), _supplier("S2", "Heavy-Duty Truck"), _supplier("S5"),
+        _supplier("S6", trips=2)
+    ])
+    monkeypatch.setattr(main, "DATA_FILE_PATH", str(path))
+    assert client.post("/automation/process-all-data").status_code == 200
+    return client
+
+
+def _ids(client, **params) -> list:
+    response = client.get("/intelligence/supplier-leaderboard", params=params)
+    assert response.status_code == 200
+    return [entry["supplier_id"] for entry in response.json()["leaderboard"]]
+
+
+def test_ties_are_ordered_by_supplier_id(ranked):
+    assert _ids(ranked) == ["S4", "S1", "S3", "S5", "S6", "S2"]
+    assert _ids(ranked, sort_by="distance") == ["S4", "S1", "S2", "S3", "S5", "S6"]
+    # S4 has no distance and ranks as zero intensity
+    assert _ids(ranked, sort_by="intensity") == ["S4", "S1", "S3", "S5", "S6", "S2"]
+
+
+@pytest.mark.parametrize("sort_by", METRICS)
+def test_descending_is_the_exact_reverse(ranked, sort_by):
+    assert _ids(ranked, sort_by=sort_by, order="desc") == _ids(ranked, sort_by=sort_by)[::-1]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("sort_by", METRICS)
+def test_pages_cover_the_ranking_once(ranked, sort_by, order):
+    full = _ids(ranked, sort_by=sort_by, order=order)
+    pages = [_ids(ranked, sort_by=sort_by, order=order, offset=offset, limit=4) for offset in range(0, 8, 4)]
+    assert [len(page) for page in pages] == [4, 2]
+    assert sum(pages, []) == full
+    # Overlapping windows agree on the suppliers they share
+    assert _ids(ranked, sort_by=sort_by, order=order, offset=1, limit=3) == full[1:4]
+    assert _ids(ranked, sort_by=sort_by, order=order, offset=6, limit=4) == []
+
+
+def test_a_page_reflects_new_totals_and_keeps_the_recommendation(ranked):
+    client = ranked
+    response = client.get("/intelligence/supplier-leaderboard", params={"order": "desc", "offset": 2, "limit": 2}).json()
+    assert response["total_suppliers"] == 6
+    assert (response["offset"], response["limit"]) == (2, 2)
+    assert response["recommendation"] == "Based on our analysis, 'Supplier S4' is the most carbon-efficient supplier."
+
+    # A second S1 trip breaks its tie with S3 and S5, and moves it past them
+    trip = make_trip("S1_9", 30)
+    line = {"supplier_id": "S1", "vehicle_id": "S1_V", "vehicle_type": "Light-Duty Van", **trip}
+    assert client.post("/ingest/trips", content=json.dumps(line)).json()["trips_ingested"] == 1
+    assert _ids(client) == ["S4", "S3", "S5", "S1", "S6", "S2"]
+    assert _ids(client, offset=3, limit=2) == ["S1", "S6"]
+
+
+@pytest.mark.parametrize("params", [
+    {"sort_by": "name"}, {"order": "up"}, {"limit": 0}, {"offset": -1}
+])
+def test_invalid_parameters_are_rejected(ranked, params):
+    assert ranked.get("/intelligence/supplier-leaderboard", params=params).status_code == 422
+
+
+def test_no_data_is_a_404(client):
+    assert client.get("/intelligence/supplier-leaderboard").status_code == 404
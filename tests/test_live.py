@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import main
+from app.integrity import find_integrity_violations
+from app.live import LIVE_REORDER_BUFFER_PINGS, LiveTrip
+from app.processing import process_trip
+
+START = datetime(2024, 3, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def _ping(i: int) -> tuple:
+    """Ping i of a trip heading north-east, one every 30 seconds."""
+    timestamp = (START + timedelta(seconds=30 * i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return timestamp, round(51.5 + 0.002 * i, 6), round(-0.1 + 0.002 * i, 6)
+
+
+def _batch_record(pings: list):
+    trip = {
+        "trip_id": "LIVE_1",
+        "date": "2024-03-01",
+        "gps_pings": [{"timestamp": t, "latitude": lat, "longitude": lon} for t, lat, lon in pings]
+    }
+    return process_trip(trip, "SUPPLIER_LIVE", "VAN_L", "Light-Duty Van")
+
+
+def test_pings_out_of_order_within_the_window_are_reordered():
+    live = LiveTrip("LIVE_1", "SUPPLIER_LIVE", "VAN_L", "Light-Duty Van", reorder_window=4)
+    pings = [_ping(i) for i in range(12)]
+    # Each ping at most 3 positions from its place
+    shuffled = [pings[i] for i in (2, 0, 3, 1, 6, 4, 5, 7, 10, 8, 11, 9)]
+
+    assert live.append(shuffled[:6]) == 6
+    assert (live.pings_committed, live.pings_buffered) == (2, 4)
+    assert live.append(shuffled[6:]) == 6
+    live.flush()
+
+    assert live.pings_committed == 12
+    assert live.late_pings_dropped == live.duplicate_pings_dropped == 0
+    _, record, distance = _batch_record(pings)
+    assert live.distance_km == pytest.approx(distance)
+    assert live.audit_record()["segments"].distances_km.tolist() == pytest.approx(record["segments"].distances_km.tolist())
+    assert live.audit_record()["confidence_score"] == record["confidence_score"]
+
+
+def test_pings_older_than_the_window_and_repeats_are_dropped():
+    live = LiveTrip("LIVE_1", "SUPPLIER_LIVE", "VAN_L", "Light-Duty Van")
+    pings = [_ping(i) for i in range(LIVE_REORDER_BUFFER_PINGS + 10)]
+    live.append(pings[1:])
+    assert live.pings_committed == 9
+
+    # Pings 0 and 5 are older than the last committed one (ping 9); ping 20 is buffered
+    assert live.append([pings[0], pings[5], pings[20]]) == 0
+    assert live.late_pings_dropped == 2
+    assert live.duplicate_pings_dropped == 1
+    # A repeat of the last committed ping is a duplicate too
+    assert live.append([pings[9]]) == 0
+    assert live.duplicate_pings_dropped == 2
+    live.flush()
+    assert live.pings_committed == len(pings) - 1
+
+
+def test_the_provisional_record_is_signed_and_follows_new_pings():
+    live = LiveTrip("LIVE_1", "SUPPLIER_LIVE", "VAN_L", "Light-Duty Van", reorder_window=2)
+    live.append([_ping(i) for i in range(6)])
+
+    record = live.audit_record()
+    assert find_integrity_violations("LIVE_1", record) == []
+    assert len(record["segments"]) == 3
+    assert live.audit_record() is record
+
+    live.append([_ping(6)])
+    grown = live.audit_record()
+    assert grown is not record
+    assert find_integrity_violations("LIVE_1", grown) == []
+    assert len(grown["segments"]) == 4
+    assert grown["total_trip_distance_km"] > record["total_trip_distance_km"]
+    assert grown["data_hash"] != record["data_hash"]
+
+
+def _post_pings(client, pings: list, **identity):
+    payload = {"pings": [{"timestamp": t, "latitude": lat, "longitude": lon} for t, lat, lon in pings], **identity}
+    return client.post("/live/trips/LIVE_1/pings", json=payload)
+
+
+def test_a_closed_trip_is_stored_like_a_processed_one(processed, store):
+    client = processed
+    pings = [_ping(i) for i in range(40)]
+    assert _post_pings(client, pings[:1]).status_code == 422
+
+    identity = {"supplier_id": "SUPPLIER_LIVE", "supplier_name": "Live Logistics", "vehicle_id": "VAN_L", "vehicle_type": "Light-Duty Van"}
+    opened = _post_pings(client, pings[:20], **identity).json()
+    assert opened["pings_accepted"] == 20
+    assert opened["status"] == "open"
+    assert _post_pings(client, pings[20:], vehicle_id="TRUCK_9").status_code == 409
+    status = _post_pings(client, pings[20:]).json()
+    assert status["pings_committed"] == 40 - LIVE_REORDER_BUFFER_PINGS
+    assert status["pings_buffered"] == LIVE_REORDER_BUFFER_PINGS
+    assert client.get("/audit/trip-report/LIVE_1").status_code == 404
+
+    closed = client.post("/live/trips/LIVE_1/close").json()
+    assert closed["pings_committed"] == 40
+    _, record, distance = _batch_record(pings)
+    assert closed["total_trip_distance_km"] == record["total_trip_distance_km"]
+    assert closed["total_trip_emissions_kg_co2e"] == record["total_trip_emissions_kg_co2e"]
+
+    report = client.get("/audit/trip-report/LIVE_1").json()
+    assert report["integrity_status"] == "VERIFIED"
+    assert report["audit_id"] == closed["audit_id"]
+    assert closed["merkle_root"] == client.get("/audit/trip-proof/LIVE_1").json()["merkle_root"]
+    assert dict(store.iter_suppliers())["SUPPLIER_LIVE"]["total_distance_km"] == pytest.approx(distance)
+
+    assert client.get("/live/trips/LIVE_1").status_code == 404
+    assert client.post("/live/trips/LIVE_1/close").status_code == 404
+    assert _post_pings(client, pings[:1], **identity).status_code == 409
+    # Kept by the next file-based run
+    assert client.post("/automation/process-all-data").json()["trips_removed"] == 0
+    assert client.get("/audit/trip-report/LIVE_1").json()["integrity_status"] == "VERIFIED"
+
+
+def test_closing_during_a_processing_run_leaves_the_trip_open(processed):
+    client = processed
+    _post_pings(client, [_ping(i) for i in range(5)], supplier_id="SUPPLIER_LIVE", vehicle_id="VAN_L")
+
+    assert main._processing_run_lock.acquire(blocking=False)
+    try:
+        assert client.post("/live/trips/LIVE_1/close").status_code == 409
+    finally:
+        main._processing_run_lock.release()
+    assert client.get("/live/trips/LIVE_1").json()["pings_buffered"] == 5
+
+    assert client.post("/live/trips/LIVE_1/close").json()["pings_committed"] == 5
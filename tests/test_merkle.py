@@ -0,0 +1,82 @@
+import random
+
+from app.merkle import get_merkle_root, get_trip_inclusion_proof, update_merkle_tree
+from app.utils import build_merkle_levels, generate_merkle_proof, verify_merkle_proof
+
+from .conftest import make_trip, write_fleet
+
+
+def _rebuilt_levels(store, leaf_hashes: dict) -> tuple:
+    """The tree over leaf_hashes rebuilt from scratch, in the leaf positions the store assigned."""
+    positions = {trip_id: store.get_merkle_position(trip_id) for trip_id in leaf_hashes}
+    assert store.merkle_leaf_count() == len(leaf_hashes)
+    assert sorted(positions.values()) == list(range(len(leaf_hashes)))
+    leaves = [None] * len(leaf_hashes)
+    for trip_id, position in positions.items():
+        leaves[position] = leaf_hashes[trip_id]
+    return positions, build_merkle_levels(leaves)
+
+
+def _assert_matches_rebuild(store, leaf_hashes: dict):
+    positions, levels = _rebuilt_levels(store, leaf_hashes)
+    if not leaf_hashes:
+        assert get_merkle_root(store) is None
+        return
+    root = levels[-1][0]
+    assert get_merkle_root(store) == root
+    for trip_id, position in positions.items():
+        inclusion = get_trip_inclusion_proof(store, trip_id)
+        assert inclusion["merkle_root"] == root
+        assert inclusion["proof"] == generate_merkle_proof(lambda level, i: levels[level][i], len(leaf_hashes), position)
+        assert verify_merkle_proof(leaf_hashes[trip_id], inclusion["proof"], root)
+
+
+def test_incremental_tree_matches_a_full_rebuild(store):
+    rng = random.Random(13)
+    leaf_hashes = {}
+    for step in range(60):
+        changed = {f"TRIP_{rng.randrange(40)}": f"{rng.getrandbits(256):064x}" for _ in range(rng.randrange(4))}
+        removed = [trip_id for trip_id in rng.sample(sorted(leaf_hashes), min(len(leaf_hashes), rng.randrange(3)))
+                   if trip_id not in changed]
+        with store.transaction():
+            update_merkle_tree(store, changed, removed)
+        for trip_id in removed:
+            del leaf_hashes[trip_id]
+        leaf_hashes.update(changed)
+
+        _assert_matches_rebuild(store, leaf_hashes)
+        for trip_id in removed:
+            assert get_trip_inclusion_proof(store, trip_id) is None
+
+
+def _assert_api_matches_rebuild(client, store):
+    leaf_hashes = {trip_id: store.get_trip(trip_id)["data_hash"] for trip_id in store.iter_trip_ids()}
+    positions, levels = _rebuilt_levels(store, leaf_hashes)
+    for trip_id, position in positions.items():
+        inclusion = client.get(f"/audit/trip-proof/{trip_id}").json()
+        assert inclusion["merkle_root"] == levels[-1][0]
+        assert inclusion["leaf_index"] == position
+        assert verify_merkle_proof(leaf_hashes[trip_id], inclusion["proof"], levels[-1][0])
+
+
+def test_processing_keeps_the_tree_equal_to_a_full_rebuild(processed, store, fleet_path):
+    client = processed
+    _assert_api_matches_rebuild(client, store)
+
+    assert client.post("/automation/reprocess-trip/TRIP_2").status_code == 200
+    _assert_api_matches_rebuild(client, store)
+
+    # Drop TRIP_1 and add TRIP_5 to the source
+    write_fleet(fleet_path, [{
+        "supplier_id": "SUPPLIER_001",
+        "name": "Supplier One",
+        "vehicles": [
+            {"vehicle_id": "VAN_1", "type": "Light-Duty Van", "trips": [make_trip("TRIP_2", 10, 7), make_trip("TRIP_5", 20)]},
+            {"vehicle_id": "TRUCK_1", "type": "Heavy-Duty Truck", "trips": [make_trip("TRIP_3", 30, 4, lat=48.8, lon=2.3)]}
+        ]
+    }])
+    summary = client.post("/automation/process-all-data").json()
+    assert summary["trips_removed"] == 2
+    assert client.get("/audit/trip-proof/TRIP_1").status_code == 404
+    _assert_api_matches_rebuild(client, store)
+    assert summary["merkle_root"] == client.get("/audit/trip-proof/TRIP_5").json()["merkle_root"]
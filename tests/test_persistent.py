@@ -0,0 +1,81 @@
+import copy
+import random
+
+import pytest
+
+from app import persistent
+from app.persistent import ChunkedList, LayeredDict, SortedChunkedList
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    """Tiny layers and chunks, so compaction and chunk splits happen within a few writes."""
+    monkeypatch.setattr(persistent, "LAYER_COMPACT_MIN_KEYS", 8)
+    monkeypatch.setattr(persistent, "LIST_CHUNK_SIZE", 4)
+
+
+def test_layered_dict_behaves_like_a_dict_and_copies_are_isolated():
+    rng = random.Random(3)
+    layered, reference = LayeredDict(), {}
+    snapshots = []
+    for step in range(2000):
+        if step % 25 == 0:
+            snapshots.append((layered, dict(reference)))
+            layered = copy.copy(layered)
+        key = rng.randrange(40)
+        if rng.random() < 0.6:
+            layered[key] = reference[key] = step
+        elif key in reference:
+            del layered[key]
+            del reference[key]
+        assert list(layered.items()) == list(reference.items())
+        assert len(layered) == len(reference)
+        assert (key in layered) == (key in reference) and layered.get(key) == reference.get(key)
+
+    for snapshot, expected in snapshots:
+        assert list(snapshot.items()) == list(expected.items())
+    assert copy.deepcopy(layered) == reference
+
+
+def test_chunked_lists_behave_like_lists_and_copies_are_isolated():
+    rng = random.Random(5)
+    items, items_reference = ChunkedList(), []
+    ordered, ordered_reference = SortedChunkedList(), []
+    snapshots = []
+    for step in range(2000):
+        if step % 25 == 0:
+            snapshots.append((items, list(items_reference), ordered, list(ordered_reference)))
+            items, ordered = copy.copy(items), copy.copy(ordered)
+
+        action = rng.random()
+        if action < 0.4:
+            items.append(step)
+            items_reference.append(step)
+        elif action < 0.55 and items_reference:
+            assert items.pop() == items_reference.pop()
+        elif action < 0.65:
+            size = rng.randrange(len(items_reference) + 1)
+            items.truncate(size)
+            del items_reference[size:]
+        elif items_reference:
+            index = rng.randrange(len(items_reference))
+            items[index] = items_reference[index] = -step
+
+        value = rng.randrange(50)
+        if rng.random() < 0.6:
+            ordered.add(value)
+            ordered_reference.append(value)
+            ordered_reference.sort()
+        else:
+            ordered.discard(value)
+            if value in ordered_reference:
+                ordered_reference.remove(value)
+
+        start, stop = rng.randrange(-3, 40), rng.randrange(-3, 40)
+        assert list(items) == items_reference and items[start:stop] == items_reference[start:stop]
+        assert list(ordered) == ordered_reference and ordered[start:stop] == ordered_reference[start:stop]
+        assert list(ordered.iter_from(value)) == [item for item in ordered_reference if item >= value]
+        assert list(ordered.iter_from(value, inclusive=False)) == [item for item in ordered_reference if item > value]
+
+    for items, items_expected, ordered, ordered_expected in snapshots:
+        assert items == items_expected and ordered == ordered_expected
@@ -0,0 +1,96 @@
+import pytest
+
+from app import main, processing
+from app.columnar import convert_json_to_columnar
+from app.processing import process_trip, process_trip_batch, process_trips
+
+from .conftest import make_trip
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_reprocessed_trip_keeps_its_fingerprint(client, fleet_path, tmp_path, monkeypatch, columnar):
+    if columnar:
+        convert_json_to_columnar(str(fleet_path), str(tmp_path / "columnar"))
+        monkeypatch.setattr(main, "COLUMNAR_DATA_DIR", str(tmp_path / "columnar"))
+
+    assert client.post("/automation/process-all-data").json()["trips_recomputed"] == 4
+    assert client.post("/automation/reprocess-trip/TRIP_2").status_code == 200
+
+    summary = client.post("/automation/process-all-data").json()
+    assert summary["trips_unchanged"] == 4
+    assert summary["trips_recomputed"] == 0
+
+
+def test_changed_trip_is_recomputed(client, fleet_path):
+    client.post("/automation/process-all-data")
+    text = fleet_path.read_text(encoding="utf-8")
+    fleet_path.write_text(text.replace('"2024-03-01T08:12:00Z"', '"2024-03-01T08:12:30Z"'), encoding="utf-8")
+
+    summary = client.post("/automation/process-all-data").json()
+    assert summary["trips_recomputed"] == 1
+    assert summary["trips_unchanged"] == 3
+
+
+def _comparable(result):
+    trip_id, record, distance = result
+    record = dict(record)
+    segments = record.pop("segments")
+    for key in ("audit_id", "calculated_at", "ingested_at", "field_hashes", "data_hash"):
+        record.pop(key)
+    return trip_id, distance, record, segments.timestamps.tolist(), segments.distances_km.tolist()
+
+
+def test_batch_matches_single_trips():
+    shuffled = make_trip("SHUFFLED", pings=6)
+    shuffled["gps_pings"].reverse()
+    instant = make_trip("INSTANT", pings=3)
+    instant["gps_pings"][1]["timestamp"] = instant["gps_pings"][0]["timestamp"]
+    gap = make_trip("GAP", lat=10.0)
+    gap["gps_pings"][-1]["timestamp"] = "2024-03-01T09:30:00Z"
+    jobs = [
+        (make_trip("PLAIN"), "S1", "V1", "Light-Duty Van"),
+        ({"trip_id": "EMPTY", "gps_pings": []}, "S1", "V1", "Light-Duty Van"),
+        (make_trip("ONE", pings=1), "S1", "V2", "Cargo Ship"),
+        (shuffled, "S2", "V3", "Heavy-Duty Truck"),
+        (instant, "S2", "V3", "Unknown"),
+        (gap, "S2", "V4", "Cargo Ship")
+    ]
+
+    batch = process_trip_batch(jobs)
+    assert [_comparable(result) for result in batch] == [_comparable(process_trip(*job)) for job in jobs]
+
+
+def test_workers_yield_the_same_records_in_input_order(monkeypatch):
+    # Small batches, so several are in flight at once and may finish out of order
+    monkeypatch.setattr(processing, "TRIP_BATCH_SIZE", 3)
+    vehicle_types = ["Light-Duty Van", "Heavy-Duty Truck", "Cargo Ship"]
+    jobs = [
+        (make_trip(f"TRIP_{i}", i % 20, pings=2 + (7 * i) % 30 if i % 5 else 40), f"S{i % 4}", f"V{i % 6}", vehicle_types[i % 3])
+        for i in range(25)
+    ]
+
+    single = [_comparable(result) for result in process_trips(iter(jobs), workers=1)]
+    sharded = [_comparable(result) for result in process_trips(iter(jobs), workers=2)]
+    assert [trip_id for trip_id, *_ in single] == [f"TRIP_{i}" for i in range(25)]
+    assert sharded == single
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_reprocessing_without_the_source_is_a_conflict(client, fleet_path, tmp_path, monkeypatch, columnar):
+    if columnar:
+        convert_json_to_columnar(str(fleet_path), str(tmp_path / "columnar"))
+        monkeypatch.setattr(main, "COLUMNAR_DATA_DIR", str(tmp_path / "columnar"))
+    assert client.post("/automation/process-all-data").status_code == 200
+
+    if columnar:
+        for path in (tmp_path / "columnar").iterdir():
+            path.unlink()
+        # As in a fresh worker process, which opens the dataset on first use
+        monkeypatch.setattr(main, "_columnar_dataset", None)
+    else:
+        fleet_path.unlink()
+
+    for response in (client.post("/automation/reprocess-trip/TRIP_2"), client.post("/simulation/reset-data", params={"trip_id": "TRIP_2"})):
+        assert response.status_code == 409
+        assert "is missing" in response.json()["detail"]
+    assert client.get("/audit/trip-report/TRIP_2").json()["integrity_status"] == "VERIFIED"
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.utils import TripQuality
+
+MINUTE_US = 60 * 1_000_000
+
+
+def _track(minutes: list, distances_km: list, vehicle_type: str = "Light-Duty Van") -> TripQuality:
+    """Quality of one trip with pings at the given minutes and the given distance between each pair."""
+    timestamps = np.asarray(minutes, dtype=np.int64) * MINUTE_US
+    quality, = TripQuality.for_trips([vehicle_type], np.diff(timestamps) / 1_000_000, distances_km, [0, len(distances_km)])
+    return quality
+
+
+def test_a_steady_track_scores_full_confidence():
+    quality = _track([0, 1, 2, 3, 4], [1.2, 1.3, 1.2, 1.1])
+    assert quality.confidence_score(5) == 1.0
+    assert quality.flags(5, 4.8, 4.7) == []
+    assert quality.max_implied_speed_kmh == pytest.approx(78.0)
+
+
+def test_few_pings_lower_confidence():
+    quality = _track([0, 1, 2], [1.0, 1.0])
+    assert quality.confidence_score(3) == 0.9
+    assert quality.confidence_score(0) == 0.0
+
+
+def test_a_data_gap_costs_its_share_of_the_duration():
+    quality = _track([0, 1, 31, 32, 33], [1.0, 20.0, 1.0, 1.0])
+    assert quality.gap_count == 1
+    assert quality.gap_seconds == 30 * 60
+    assert quality.confidence_score(5) == pytest.approx(1 - 0.4 * 30 / 33, abs=1e-4)
+    assert quality.flags(5, 23.0, 22.0) == ["data_gap"]
+
+
+def test_teleports_and_speeding_are_flagged_separately():
+    # 4 km in a minute is 240 km/h for a van; 500 km in a minute is a jump
+    quality = _track([0, 1, 2, 3, 4], [1.0, 4.0, 500.0, 1.0])
+    assert quality.speeding_segments == 1
+    assert quality.teleport_segments == 1
+    assert quality.max_implied_speed_kmh == pytest.approx(240.0)
+    assert quality.confidence_score(5) == 0.6
+    assert quality.flags(5, 506.0, 505.0) == ["implausible_speed", "teleport_jump"]
+
+
+def test_plane_speeds_are_plausible_for_planes_only():
+    minutes, distances = [0, 10, 20, 30, 40], [140.0, 140.0, 140.0, 140.0]
+    assert _track(minutes, distances, "Cargo Plane").speeding_segments == 0
+    assert _track(minutes, distances, "Heavy-Duty Truck").speeding_segments == 4
+
+
+def test_standing_still_is_idle_time_and_short_hops_are_not_judged():
+    # 0.05 km per minute is too short to judge speed from, and slower than idling
+    quality = _track(list(range(0, 45, 5)), [0.0, 0.05, 0.0, 0.0, 0.0, 0.0, 0.05, 0.0])
+    assert quality.idle_seconds == 40 * 60
+    assert quality.max_implied_speed_kmh == 0.0
+    assert quality.flags(9, 0.1, 0.0) == ["excessive_idle_time", "route_deviation"]
+
+
+def test_segments_added_in_parts_match_one_pass():
+    rng = np.random.default_rng(23)
+    minutes = np.cumsum(rng.integers(0, 25, size=40))
+    distances = rng.exponential(2.0, size=39)
+    distances[[5, 17]] = [900.0, 0.0]
+
+    whole = _track(minutes, distances, "Heavy-Duty Truck")
+    parts = TripQuality("Heavy-Duty Truck")
+    timestamps = minutes * MINUTE_US
+    for start, end in [(0, 1), (1, 12), (12, 12), (12, 39)]:
+        parts.add_segments(timestamps[start:end + 1], distances[start:end])
+
+    assert parts.metrics() == whole.metrics()
+    assert parts.confidence_score(40) == whole.confidence_score(40)
+    assert parts.flags(40, 100.0, 50.0) == whole.flags(40, 100.0, 50.0)
+
+
+def test_many_trips_score_like_one_at_a_time():
+    tracks = [([0, 1, 2], [1.0, 3.0]), ([0], []), ([0, 30, 31], [5.0, 600.0])]
+    seconds, distances, offsets = [], [], [0]
+    for minutes, track_distances in tracks:
+        seconds.extend(np.diff(minutes) * 60.0)
+        distances.extend(track_distances)
+        offsets.append(len(distances))
+
+    qualities = TripQuality.for_trips(["Light-Duty Van"] * 3, seconds, distances, offsets)
+    assert [quality.metrics() for quality in qualities] == [_track(*track).metrics() for track in tracks]
+
+
+def test_processed_trips_carry_their_scores(processed):
+    client = processed
+    assert client.get("/audit/trip-report/TRIP_1").json()["confidence_score"] == 1.0
+    # Four pings: sparse
+    assert client.get("/audit/trip-report/TRIP_3").json()["confidence_score"] == 0.9
+
+
+def test_a_move_without_time_passing_is_speeding_without_an_infinite_speed():
+    quality = _track([0, 1, 1, 2], [1.0, 0.5, 1.0])
+    assert quality.speeding_segments == 1
+    assert quality.teleport_segments == 0
+    assert quality.max_implied_speed_kmh == pytest.approx(60.0)
@@ -0,0 +1,32 @@
+import pytest
+
+
+def test_an_empty_scenario_matches_the_stored_fleet(processed):
+    client = processed
+    result = client.post("/intelligence/scenario", json={}).json()
+    dashboard = client.get("/intelligence/dashboard-stats").json()
+
+    assert result["trips_evaluated"] == 4
+    assert result["fleet"]["baseline_emissions_kg_co2e"] == result["fleet"]["scenario_emissions_kg_co2e"]
+    assert result["fleet"]["baseline_emissions_kg_co2e"] == pytest.approx(dashboard["total_co2_kg"], abs=0.01)
+    assert all(entry["rank_change"] == 0 for entry in result["leaderboard"])
+
+
+def test_a_vehicle_swap_moves_only_the_swapped_trips(processed):
+    client = processed
+    result = client.post("/intelligence/scenario", json={
+        "factor_overrides": {"Light-Duty Van": 0.0},
+        "vehicle_swaps": [{"from_vehicle_type": "Heavy-Duty Truck", "to_vehicle_type": "Light-Duty Van", "supplier_id": "SUPPLIER_001"}]
+    }).json()
+
+    assert result["trips_swapped"] == [1]
+    by_supplier = {entry["supplier_id"]: entry for entry in result["leaderboard"]}
+    assert by_supplier["SUPPLIER_001"]["scenario_emissions_kg_co2e"] == 0
+    assert by_supplier["SUPPLIER_002"]["delta_kg_co2e"] == 0
+
+
+@pytest.mark.parametrize("factor", ["NaN", "Infinity", "-Infinity", "-0.5"])
+def test_invalid_factor_overrides_are_rejected(processed, factor):
+    body = '{"factor_overrides": {"Cargo Ship": %s}}' % factor
+    response = processed.post("/intelligence/scenario", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
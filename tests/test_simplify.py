@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.processing import process_trip
+from app.simplify import simplify_track
+from app.utils import EARTH_RADIUS_KM, calculate_segment_distances_km
+
+SECOND_US = 1_000_000
+
+
+def _degrees(metres: float) -> float:
+    """Metres along the equator (or a meridian) as degrees."""
+    return math.degrees(metres / (EARTH_RADIUS_KM * 1000))
+
+
+def _track(points_m: list, seconds: list = None):
+    """(timestamps, latitudes, longitudes) for (east, north) offsets in metres from 0, 0."""
+    seconds = seconds if seconds is not None else list(range(0, 60 * len(points_m), 60))
+    timestamps = np.asarray(seconds, dtype=np.int64) * SECOND_US
+    latitudes = np.array([_degrees(north) for _, north in points_m])
+    longitudes = np.array([_degrees(east) for east, _ in points_m])
+    return timestamps, latitudes, longitudes
+
+
+# Straight east for 1 km with a 30 m bump north halfway
+BUMP = [(0, 0), (250, 0), (500, 30), (750, 0), (1000, 0)]
+
+
+@pytest.mark.parametrize("count", [0, 1, 2])
+def test_tracks_of_two_pings_or_fewer_are_kept(count):
+    kept, summary = simplify_track(*_track(BUMP[:count], [0] * count), tolerance_m=1000)
+    assert kept.tolist() == list(range(count))
+    assert summary["pings_in"] == summary["pings_kept"] == count
+    assert summary["duplicates_removed"] == summary["stationary_removed"] == summary["simplified_removed"] == 0
+    assert summary["max_deviation_m"] == 0.0
+
+
+def test_pings_sharing_a_timestamp_collapse_to_the_first():
+    zigzag = [(0, 0), (250, 100), (250, -100), (500, 0), (750, 100), (750, -100)]
+    kept, summary = simplify_track(*_track(zigzag, [0, 60, 60, 120, 180, 180]), tolerance_m=1)
+    assert kept.tolist() == [0, 1, 3, 4]
+    assert summary["duplicates_removed"] == 2
+    assert summary["simplified_removed"] == 0
+
+
+def test_stationary_jitter_keeps_the_start_and_end_of_the_stop():
+    stop = [(1000, 0), (1003, 2), (998, -3), (1002, 4), (1001, -1)]
+    kept, summary = simplify_track(*_track([(0, 0)] + stop + [(1000, 1000)]), tolerance_m=10)
+
+    # Pings 2-4 jitter around ping 1 and ping 5 is the last one before moving
+    # off; Douglas-Peucker then drops ping 1, 1 m off the line to ping 5
+    assert summary["stationary_removed"] == 3
+    assert summary["simplified_removed"] == 1
+    assert kept.tolist() == [0, 5, 6]
+    assert summary["max_deviation_m"] <= 2 * 10
+
+
+@pytest.mark.parametrize("tolerance_m, expected_kept, expected_deviation_m", [
+    (40, [0, 4], 30.0),
+    # Pings 1 and 3 are 14.97 m from the lines through the bump
+    (20, [0, 2, 4], 14.97),
+    (10, [0, 1, 2, 3, 4], 0.0)
+])
+def test_douglas_peucker_keeps_pings_beyond_the_tolerance(tolerance_m, expected_kept, expected_deviation_m):
+    kept, summary = simplify_track(*_track(BUMP), tolerance_m=tolerance_m)
+    assert kept.tolist() == expected_kept
+    assert summary["simplified_removed"] == 5 - len(expected_kept)
+    assert summary["pings_kept"] == len(expected_kept)
+    assert summary["max_deviation_m"] == pytest.approx(expected_deviation_m, abs=0.01)
+
+
+def _trip(points_m: list) -> dict:
+    timestamps, latitudes, longitudes = _track(points_m)
+    return {
+        "trip_id": "TRIP_S",
+        "date": "2024-03-01",
+        "gps_pings": [
+            {"timestamp": f"2024-03-01T08:{i:02d}:00Z", "latitude": float(lat), "longitude": float(lon)}
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+        ]
+    }
+
+
+def test_distance_removed_is_the_difference_to_the_full_track():
+    _, latitudes, longitudes = _track(BUMP)
+    full_km = float(calculate_segment_distances_km(latitudes, longitudes).sum())
+
+    _, record, distance = process_trip(_trip(BUMP), "S1", "V1", "Light-Duty Van", simplify_tolerance_m=40)
+    assert distance == pytest.approx(1.0, abs=1e-6)
+    simplification = record["track_simplification"]
+    assert simplification["pings_kept"] == 2
+    assert simplification["distance_removed_km"] == round(full_km - distance, 4)
+    assert simplification["distance_removed_km"] > 0
+    # Quality is still judged on every ping
+    assert record["quality_metrics"]["duration_seconds"] == 240.0
+
+
+def test_unsimplified_trips_have_no_simplification_summary():
+    _, record, distance = process_trip(_trip(BUMP), "S1", "V1", "Light-Duty Van", simplify_tolerance_m=None)
+    assert "track_simplification" not in record
+    _, latitudes, longitudes = _track(BUMP)
+    assert distance == pytest.approx(float(calculate_segment_distances_km(latitudes, longitudes).sum()))
+
+    _, record, _ = process_trip(_trip(BUMP), "S1", "V1", "Light-Duty Van", simplify_tolerance_m=1)
+    assert record["track_simplification"]["distance_removed_km"] == 0.0
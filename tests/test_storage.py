@@ -0,0 +1,116 @@
+import copy
+import random
+
+import pytest
+
+from app import storage
+from app.merkle import update_merkle_tree
+from app.storage import MemoryAuditStore, _matches_trip_filters
+
+_STATE_FIELDS = (
+    "suppliers", "trips", "_revisions", "trip_index", "trip_locations", "tamper_log", "_tamper_keys",
+    "fleet_totals", "_rankings", "_ranking_keys", "_trip_seq", "_seq_trips", "_trip_seqs", "_trip_listing_index",
+    "_listing_values",
+    "_merkle_positions", "_merkle_trips", "_merkle_levels"
+)
+
+
+def _index_entry(supplier_id: str, flags=(), trip_date="2024-03-01", confidence=0.9) -> dict:
+    return {
+        "supplier_id": supplier_id,
+        "vehicle_type": "Light-Duty Van",
+        "flags": list(flags),
+        "trip_date": trip_date,
+        "confidence_score": confidence
+    }
+
+
+def _put(store, trip_id: str, supplier_id: str = "S1", **entry):
+    store.upsert_supplier(supplier_id, supplier_id)
+    store.put_trip(trip_id, {"audit_id": f"AUD-{trip_id}"}, _index_entry(supplier_id, **entry))
+    store.add_supplier_totals(supplier_id, 10.0, 2.0)
+    store.add_fleet_totals(10.0, 2.0, 0.9, 1)
+    update_merkle_tree(store, {trip_id: f"{len(trip_id):064x}"})
+
+
+def test_published_snapshots_never_change():
+    store = MemoryAuditStore()
+    with store.transaction():
+        for i in range(5):
+            _put(store, f"TRIP_{i}", f"S{i % 2}", flags=["data_gap"] if i % 2 else [])
+        store.record_tamper_event({"audit_id": "AUD-TRIP_0", "trip_id": "TRIP_0", "field": "x"})
+
+    published = store._state
+    before = {name: copy.deepcopy(getattr(published, name)) for name in _STATE_FIELDS}
+
+    with store.transaction():
+        _put(store, "TRIP_1", "S0", flags=["implausible_speed"])
+        _put(store, "TRIP_9", "S2")
+        store.update_trip_field("TRIP_2", "total_trip_distance_km", 1.0)
+        store.delete_trip("TRIP_3")
+        update_merkle_tree(store, {}, ["TRIP_3"])
+        store.delete_supplier("S1")
+        store.set_trip_location("TRIP_9", {"offset": None, "length": None})
+        store.record_tamper_event({"audit_id": "AUD-TRIP_2", "trip_id": "TRIP_2", "field": "y"})
+
+    assert store._state is not published
+    for name in _STATE_FIELDS:
+        assert getattr(published, name) == before[name], name
+    assert store.get_trip("TRIP_3") is None
+    assert store.tamper_event_count() == 2
+
+
+def _list_all(store, page_size: int, **filters) -> list:
+    listed, after = [], -1
+    while True:
+        page = store.list_trips(after=after, limit=page_size, **filters)
+        listed.extend(trip_id for _, trip_id in page)
+        if len(page) < page_size:
+            return listed
+        after = page[-1][0]
+
+
+@pytest.mark.parametrize("range_max_values", [storage.LISTING_RANGE_MAX_VALUES, 1])
+def test_trip_listing_indexes_match_a_full_scan(monkeypatch, range_max_values):
+    # With a limit of 1, wide ranges take the trip-by-trip path
+    monkeypatch.setattr(storage, "LISTING_RANGE_MAX_VALUES", range_max_values)
+    rng = random.Random(7)
+    store = MemoryAuditStore()
+    for step in range(400):
+        trip_id = f"TRIP_{rng.randrange(60)}"
+        with store.transaction():
+            if rng.random() < 0.3:
+                store.delete_trip(trip_id)
+            else:
+                store.put_trip(trip_id, {"audit_id": f"AUD-{trip_id}"}, _index_entry(
+                    f"S{rng.randrange(3)}",
+                    flags=rng.sample(["data_gap", "implausible_speed"], rng.randrange(3)),
+                    trip_date=rng.choice([None, "2024-02-28", "2024-03-01", "2024-03-02"]),
+                    confidence=rng.choice([0.4, 0.75, 0.9])
+                ))
+
+        state = store._state
+        trip_seq = state._trip_seq
+        in_order = sorted(state.trip_index, key=trip_seq.get)
+        for filters in (
+            {},
+            {"supplier_id": "S1"},
+            {"date_from": "2024-03-01"},
+            {"date_to": "2024-03-01", "flag": "data_gap"},
+            {"date_from": "2024-03-01", "date_to": "2024-03-01"},
+            {"confidence_below": 0.9},
+            {"confidence_below": 0.75, "supplier_id": "S2", "date_from": "2024-02-28"}
+        ):
+            expected = [trip_id for trip_id in in_order if _matches_trip_filters(state.trip_index[trip_id], filters)]
+            assert _list_all(store, 1 + step % 4, **filters) == expected, filters
+
+        # Deleted and re-filed trips leave nothing behind in the indexes
+        live = set(trip_seq.values())
+        assert state._trip_seqs == sorted(live) and set(state._seq_trips) == live
+        assert sum(map(len, state._trip_listing_index.values())) == sum(
+            3 + len(entry["flags"]) + (entry["trip_date"] is not None) for entry in state.trip_index.values()
+        )
+        assert all(state._trip_listing_index.values())
+        for field in ("trip_date", "confidence_score"):
+            values = {entry[field] for entry in state.trip_index.values()} - {None}
+            assert list(state._listing_values[field]) == sorted(values)
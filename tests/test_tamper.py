@@ -0,0 +1,93 @@
+import threading
+import time
+
+from app import main
+from app.integrity import find_integrity_violations
+
+
+def test_rereading_a_tampered_trip_writes_nothing(processed):
+    client = processed
+    client.post("/simulation/tamper-data", params={"trip_id": "TRIP_1", "field": "total_trip_distance_km", "new_value": 1.0})
+
+    # The first read logs the violation
+    assert client.get("/audit/trip-report/TRIP_1").json()["integrity_status"] == "COMPROMISED"
+    assert client.get("/authority/integrity-events").json()["event_count"] == 1
+
+    second = client.get("/audit/trip-report/TRIP_1").json()
+    third = client.get("/audit/trip-report/TRIP_1").json()
+    assert third["integrity_status"] == "COMPROMISED"
+    assert third["generation"] == second["generation"]
+    assert client.get("/authority/integrity-events").json()["event_count"] == 1
+
+
+def test_a_read_during_a_write_queues_its_tamper_event(processed, store):
+    client = processed
+    client.post("/simulation/tamper-data", params={"trip_id": "TRIP_1", "field": "total_trip_distance_km", "new_value": 1.0})
+
+    # Another thread holds the store's writer, as a background run would
+    writing, release = threading.Event(), threading.Event()
+
+    def hold_writer():
+        with store.transaction():
+            writing.set()
+            release.wait(10)
+
+    writer = threading.Thread(target=hold_writer)
+    writer.start()
+    try:
+        assert writing.wait(10)
+        started = time.perf_counter()
+        report = client.get("/audit/trip-report/TRIP_1")
+        assert time.perf_counter() - started < 5
+        assert report.status_code == 200
+        assert report.json()["integrity_status"] == "COMPROMISED"
+        assert client.get("/authority/integrity-events").json()["event_count"] == 0
+    finally:
+        release.set()
+        writer.join()
+
+    # The next flush, here the log read's, writes it once
+    client.get("/audit/trip-report/TRIP_1")
+    events = client.get("/authority/integrity-events").json()
+    assert events["event_count"] == 1
+    assert events["events"][0]["field"] == "total_trip_distance_km"
+
+
+def test_every_write_invalidates_the_verification_cache(processed, store, monkeypatch):
+    client = processed
+    checks = []
+
+    def counting_check(trip_id, audit_record):
+        checks.append(trip_id)
+        return find_integrity_violations(trip_id, audit_record)
+
+    monkeypatch.setattr(main, "find_integrity_violations", counting_check)
+
+    def status() -> str:
+        return client.get("/audit/trip-report/TRIP_1").json()["integrity_status"]
+
+    assert status() == "VERIFIED"
+    assert main._verification_cache["TRIP_1"] == (store.get_trip_revision("TRIP_1"), [])
+    assert status() == "VERIFIED"
+    assert len(checks) == 1
+
+    def tamper():
+        client.post("/simulation/tamper-data", params={"trip_id": "TRIP_1", "field": "confidence_score", "new_value": 0.5})
+
+    writes = [
+        tamper,
+        lambda: client.post("/automation/reprocess-trip/TRIP_1"),
+        tamper,
+        lambda: client.post("/simulation/reset-data", params={"trip_id": "TRIP_1"}),
+        lambda: client.post("/automation/reprice-trips", params={"force": True})
+    ]
+    expected = ["COMPROMISED", "VERIFIED", "COMPROMISED", "VERIFIED", "VERIFIED"]
+    for write, expected_status in zip(writes, expected):
+        checks.clear()
+        write()
+        assert status() == expected_status
+        assert checks[-1:] == ["TRIP_1"]
+        assert main._verification_cache["TRIP_1"][0] == store.get_trip_revision("TRIP_1")
+
+    client.post("/automation/process-all-data", params={"full_refresh": True})
+    assert "TRIP_1" not in main._verification_cache
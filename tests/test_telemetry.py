@@ -0,0 +1,147 @@
+import functools
+import gzip
+import json
+
+from fastapi.testclient import TestClient
+
+from app import main, processing
+from app.storage import MemoryAuditStore
+from app.telemetry import iter_ndjson_lines
+
+from .conftest import make_trip
+
+
+def _line(trip_id: str, supplier_id: str = "PUSH_1", supplier_name: str = None, start_minute: int = 0) -> str:
+    trip = make_trip(trip_id, start_minute)
+    return json.dumps({
+        "supplier_id": supplier_id,
+        "supplier_name": supplier_name,
+        "vehicle_id": "VAN_9",
+        "vehicle_type": "Light-Duty Van",
+        "trip_id": trip_id,
+        "date": trip["date"],
+        "gps_pings": trip["gps_pings"]
+    })
+
+
+def _body(lines: list) -> bytes:
+    return "\n".join(lines).encode()
+
+
+def _stored_hashes(store) -> dict:
+    return {trip_id: store.get_trip(trip_id)["data_hash"] for trip_id in store.iter_trip_ids()}
+
+
+def _stored_results(store) -> dict:
+    """What a trip's record says about it, leaving out its random audit id and the hashes salted with it."""
+    return {
+        trip_id: (
+            record["supplier_id"],
+            record["total_trip_distance_km"],
+            record["total_trip_emissions_kg_co2e"],
+            record["confidence_score"],
+            list(record["segments"].distances_km)
+        )
+        for trip_id, record in ((trip_id, store.get_trip(trip_id)) for trip_id in store.iter_trip_ids())
+    }
+
+
+def test_ndjson_lines_are_stored_and_bad_lines_reported(client, store):
+    body = _body([
+        _line("P1", supplier_name="Pusher One"),
+        "",
+        "not json",
+        json.dumps({"trip_id": "P2"}),
+        _line("P3", start_minute=10),
+        "   "
+    ])
+    summary = client.post("/ingest/trips", content=body).json()
+
+    assert summary["lines_read"] == 4
+    assert summary["trips_ingested"] == 2
+    assert summary["trips_rejected"] == 2
+    assert [error["line"] for error in summary["errors"]] == [3, 4]
+    assert sorted(store.iter_trip_ids()) == ["P1", "P3"]
+    assert client.get("/audit/trip-report/P3").json()["integrity_status"] == "VERIFIED"
+    assert dict(store.iter_suppliers())["PUSH_1"]["name"] == "Pusher One"
+    assert summary["merkle_root"] == client.get("/audit/trip-proof/P1").json()["merkle_root"]
+
+
+def test_gzip_bodies_match_plain_ones(client, store):
+    lines = [_line(f"P{i}", start_minute=i) for i in range(6)]
+    body = _body(lines)
+    # Two concatenated gzip members, as `gzip -c a b` writes
+    compressed = gzip.compress(body[:len(body) // 2]) + gzip.compress(body[len(body) // 2:])
+
+    summary = client.post("/ingest/trips", content=compressed).json()
+    assert summary["trips_ingested"] == 6
+    hashes = _stored_hashes(store)
+
+    repushed = client.post("/ingest/trips", content=body).json()
+    assert repushed["trips_ingested"] == 0
+    assert repushed["trips_unchanged"] == 6
+    assert _stored_hashes(store) == hashes
+
+
+def test_an_oversized_line_stops_the_upload_and_keeps_earlier_batches(client, store, monkeypatch):
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 2)
+    # Processing reads ahead one batch of its own; keep that small too
+    monkeypatch.setattr(processing, "TRIP_BATCH_SIZE", 2)
+    monkeypatch.setattr(main, "iter_ndjson_lines", functools.partial(iter_ndjson_lines, max_line_bytes=4096))
+    lines = [_line(f"P{i}", start_minute=i) for i in range(4)] + ["x" * 8192, _line("P9")]
+
+    response = client.post("/ingest/trips", content=_body(lines))
+    assert response.status_code == 422
+    assert "Line 5 is longer than 4096 bytes" in response.json()["detail"]
+    assert "after 4 trips" in response.json()["detail"]
+    assert sorted(store.iter_trip_ids()) == ["P0", "P1", "P2", "P3"]
+
+
+def test_a_truncated_gzip_body_keeps_earlier_batches(client, store, monkeypatch):
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 2)
+    lines = [_line(f"P{i}", start_minute=i) for i in range(40)]
+    compressed = gzip.compress(_body(lines))
+
+    response = client.post("/ingest/trips", content=compressed[:-20])
+    assert response.status_code == 422
+    assert "Truncated gzip body" in response.json()["detail"]
+    kept = sorted(store.iter_trip_ids(), key=lambda trip_id: int(trip_id[1:]))
+    assert len(kept) % 2 == 0
+    assert kept == [f"P{i}" for i in range(len(kept))]
+    assert client.get("/intelligence/dashboard-stats").json()["total_trips"] == len(kept)
+
+
+def test_processing_errors_are_not_reported_as_a_malformed_body(store, monkeypatch):
+    def failing_process_trips(jobs, workers=1):
+        for _ in jobs:
+            raise ValueError("pricing failed")
+        yield from ()
+
+    monkeypatch.setattr(main, "process_trips", failing_process_trips)
+    client = TestClient(main.app, raise_server_exceptions=False)
+    assert client.post("/ingest/trips", content=_body([_line("P1")])).status_code == 500
+
+
+def test_a_full_last_batch_commits_no_empty_transaction(client, store, monkeypatch):
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 2)
+    generation = store.generation()
+
+    summary = client.post("/ingest/trips", content=_body([_line(f"P{i}", start_minute=i) for i in range(4)])).json()
+    assert summary["batches_committed"] == 2
+    assert summary["generation"] == store.generation() == generation + 2
+
+    assert client.post("/ingest/trips", content=b"").json()["batches_committed"] == 0
+    assert store.generation() == generation + 2
+
+
+def test_workers_store_the_same_records_as_one_worker(client, store, monkeypatch):
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 3)
+    body = _body([_line(f"P{i}", supplier_id=f"PUSH_{i % 3}", start_minute=i) for i in range(10)])
+
+    assert client.post("/ingest/trips", content=body).json()["trips_ingested"] == 10
+    single = _stored_results(store)
+
+    sharded_store = MemoryAuditStore()
+    monkeypatch.setattr(main, "store", sharded_store)
+    assert client.post("/ingest/trips", params={"workers": 2}, content=body).json()["trips_ingested"] == 10
+    assert _stored_results(sharded_store) == single